@@ -0,0 +1,132 @@
+import keras
+import numpy as np
+from typing import Any, Iterator, Optional
+
+from core.src.models import NeuronStats, Topology
+
+
+class RunningStats:
+    """Per-neuron statistics of one layer's outputs, updated batch by batch.
+
+    Mean and variance are merged per batch with Chan's parallel form of
+    Welford's algorithm, in float64. Memory is O(units * bins) however many
+    samples are added. Without a fixed `histogram_range`, the range is taken
+    from the first batch; later values outside it fall into the end bins.
+    """
+
+    def __init__(self, units: int, bins: int = 32, histogram_range: Optional[tuple[float, float]] = None,
+                 zero_threshold: float = 0.0):
+        self.units = units
+        self.bins = bins
+        self.histogram_range = histogram_range
+        self.zero_threshold = zero_threshold
+        self.count = 0
+        self.mean = np.zeros(units)
+        self.m2 = np.zeros(units)
+        self.zeros = np.zeros(units, dtype=np.int64)
+        self.minimum = np.full(units, np.inf)
+        self.maximum = np.full(units, -np.inf)
+        self.histogram = np.zeros((units, bins), dtype=np.int64)
+
+    def update(self, batch: np.ndarray):
+        """Adds a batch of shape (samples, units); extra axes are flattened into units."""
+        batch = np.asarray(batch, dtype=np.float64).reshape(len(batch), -1)
+        samples = len(batch)
+        if not samples:
+            return
+        if batch.shape[1] != self.units:
+            raise ValueError(f"Expected {self.units} units, got {batch.shape[1]}")
+
+        batch_mean = batch.mean(axis=0)
+        batch_m2 = np.square(batch - batch_mean).sum(axis=0)
+        total = self.count + samples
+        delta = batch_mean - self.mean
+        self.mean += delta * (samples / total)
+        self.m2 += batch_m2 + np.square(delta) * (self.count * samples / total)
+        self.count = total
+
+        self.zeros += np.count_nonzero(np.abs(batch) <= self.zero_threshold, axis=0)
+        np.minimum(self.minimum, batch.min(axis=0), out=self.minimum)
+        np.maximum(self.maximum, batch.max(axis=0), out=self.maximum)
+
+        if self.histogram_range is None:
+            low, high = float(batch.min()), float(batch.max())
+            self.histogram_range = (low, high) if high > low else (low - 0.5, low + 0.5)
+        low, high = self.histogram_range
+        bins = ((batch - low) * (self.bins / (high - low))).astype(np.int64)
+        np.clip(bins, 0, self.bins - 1, out=bins)
+        # One bincount over all neurons: bin b of unit u is slot u * bins + b
+        bins += np.arange(self.units) * self.bins
+        self.histogram += np.bincount(bins.ravel(), minlength=self.units * self.bins).reshape(self.units, self.bins)
+
+    @property
+    def variance(self) -> np.ndarray:
+        return self.m2 / self.count if self.count else np.zeros(self.units)
+
+    @property
+    def sparsity(self) -> np.ndarray:
+        return self.zeros / self.count if self.count else np.zeros(self.units)
+
+    def neuron_stats(self) -> list[NeuronStats]:
+        histogram_range = [float(value) for value in self.histogram_range] if self.histogram_range else []
+        columns = zip(self.mean.tolist(), self.variance.tolist(), self.sparsity.tolist(),
+                      self.minimum.tolist(), self.maximum.tolist(), self.histogram.tolist())
+        return [
+            NeuronStats(count=self.count, mean=mean, variance=variance, sparsity=sparsity,
+                        min=minimum, max=maximum, histogram=histogram, histogram_range=histogram_range)
+            for mean, variance, sparsity, minimum, maximum, histogram in columns
+        ]
+
+
+def capture_activations(model: keras.Model, data: Any, batch_size: int = 256, bins: int = 32,
+                        histogram_range: Optional[tuple[float, float]] = None, zero_threshold: float = 0.0,
+                        max_batches: Optional[int] = None) -> dict[int, RunningStats]:
+    """Streams `data` through `model` and accumulates statistics of every layer with units.
+
+    All intermediate outputs come from one forward pass per batch through a
+    model that exposes them as extra outputs. `data` is an array of inputs,
+    an (inputs, targets) tuple of arrays, or an iterable of batches such as
+    a tf.data.Dataset, whose items may be inputs or (inputs, targets, ...)
+    tuples. Returns the statistics keyed by layer index, as used by convert.
+    """
+    captured = [(index, layer) for index, layer in enumerate(model.layers) if hasattr(layer, "units")]
+    extractor = keras.Model(inputs=model.inputs, outputs=[layer.output for _, layer in captured])
+    stats = {index: RunningStats(layer.units, bins, histogram_range, zero_threshold) for index, layer in captured}
+
+    for number, batch in enumerate(_batches(data, batch_size)):
+        if max_batches is not None and number >= max_batches:
+            break
+        outputs = extractor(batch, training=False)
+        if len(captured) == 1:
+            outputs = [outputs]
+        for (index, _), output in zip(captured, outputs):
+            stats[index].update(keras.ops.convert_to_numpy(output))
+    return stats
+
+
+def attach_activation_stats(topology: Topology, stats: dict[int, RunningStats]):
+    """Stores the statistics on the neurons of the matching topology layers."""
+    for index, running in stats.items():
+        layer = topology.get_layer(index)
+        if layer is None:
+            continue
+        for neuron, neuron_stats in zip(layer.neurons, running.neuron_stats()):
+            neuron.stats = neuron_stats
+
+
+def profile_activations(model: keras.Model, topology: Topology, data: Any, **options) -> dict[int, RunningStats]:
+    """Runs capture_activations and attaches the result to `topology`."""
+    stats = capture_activations(model, data, **options)
+    attach_activation_stats(topology, stats)
+    return stats
+
+
+def _batches(data: Any, batch_size: int) -> Iterator[Any]:
+    if isinstance(data, tuple) and data and isinstance(data[0], np.ndarray):
+        data = data[0]
+    if isinstance(data, np.ndarray):
+        for start in range(0, len(data), batch_size):
+            yield data[start:start + batch_size]
+        return
+    for item in data:
+        yield item[0] if isinstance(item, (tuple, list)) else item
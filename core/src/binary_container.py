@@ -0,0 +1,89 @@
+import struct
+import orjson
+import numpy as np
+from typing import Any, Callable, Optional
+
+MAGIC = b"NNVB"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+# magic, format version, header length
+_PREAMBLE = struct.Struct("<4sIQ")
+
+
+def _padding(position: int) -> int:
+    return -position % ALIGNMENT
+
+
+def write_container(file_path: str, meta: Any, arrays: dict[str, np.ndarray],
+                    default: Optional[Callable[[Any], Any]] = None):
+    """Writes a JSON header followed by aligned, little-endian raw array blocks.
+
+    `meta` is encoded with orjson (dataclasses included, `default` handles the
+    rest) and stored in the header next to the dtype, shape and offset of
+    every array.
+    """
+    index = {}
+    offset = 0
+    blocks = []
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        if array.dtype.hasobject:
+            raise TypeError(f"Array '{name}' of dtype {array.dtype} cannot be stored in a binary container")
+        dtype = array.dtype.newbyteorder("<")
+        index[name] = {"dtype": dtype.str, "shape": list(array.shape), "offset": offset}
+        blocks.append((array, dtype))
+        offset += array.nbytes
+        offset += _padding(offset)
+
+    header = orjson.dumps({"meta": meta, "arrays": index}, option=orjson.OPT_SERIALIZE_DATACLASS, default=default)
+    with open(file_path, "wb") as file:
+        file.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        file.write(header)
+        file.write(b"\0" * _padding(_PREAMBLE.size + len(header)))
+        for array, dtype in blocks:
+            np.ascontiguousarray(array, dtype=dtype).tofile(file)
+            file.write(b"\0" * _padding(array.nbytes))
+
+
+class BinaryContainer:
+    """Read access to a file written by `write_container`.
+
+    Arrays are views into a single memory map of the data section, so opening
+    the file only reads the header and each array is paged in when touched.
+    """
+
+    def __init__(self, file_path: str, mmap_mode: str = "r"):
+        with open(file_path, "rb") as file:
+            magic, version, header_length = _PREAMBLE.unpack(file.read(_PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"{file_path} is not a binary container")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported binary container version {version}")
+            header = orjson.loads(file.read(header_length))
+
+        self.file_path = file_path
+        self.meta = header["meta"]
+        self.index = header["arrays"]
+        data_offset = _PREAMBLE.size + header_length
+        data_offset += _padding(data_offset)
+        data_size = max((entry["offset"] + self._nbytes(entry) for entry in self.index.values()), default=0)
+        self._data: Optional[np.memmap] = None
+        if data_size:
+            self._data = np.memmap(file_path, dtype=np.uint8, mode=mmap_mode, offset=data_offset, shape=(data_size,))
+
+    @staticmethod
+    def _nbytes(entry: dict) -> int:
+        return int(np.prod(entry["shape"], dtype=np.int64)) * np.dtype(entry["dtype"]).itemsize
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def array(self, name: str) -> np.ndarray:
+        """Returns a zero-copy view of the named array."""
+        entry = self.index[name]
+        dtype = np.dtype(entry["dtype"])
+        nbytes = self._nbytes(entry)
+        if nbytes == 0:
+            return np.empty(entry["shape"], dtype=dtype)
+        start = entry["offset"]
+        return self._data[start:start + nbytes].view(dtype).reshape(entry["shape"])
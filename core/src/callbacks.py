@@ -0,0 +1,152 @@
+import os
+import queue
+import threading
+import keras
+import numpy as np
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from core.src.checkpoint_store import CheckpointStore
+from core.src.convertor import convert
+from core.src.models import Topology
+
+KINDS = ("topology", "state_tree")
+POLICIES = ("drop", "block")
+
+
+@dataclass
+class Snapshot:
+    """Weights captured during training; `topology` or `state_tree` is filled in by the worker."""
+    epoch: int
+    step: int
+    weights: Any = None
+    topology: Optional[Topology] = None
+    state_tree: Optional[dict] = None
+
+
+class SnapshotCallback(keras.callbacks.Callback):
+    """Takes weight snapshots every N batches and/or epochs while a model trains.
+
+    The training thread only copies the weights out, as NumPy arrays
+    (`layer.get_weights()`, or a copy of every leaf of
+    `model.get_state_tree()`, which would otherwise hold the live variables);
+    conversion and writing happen on a background thread. Snapshots wait in
+    a queue of at most `max_pending` entries. When it is full, "drop"
+    discards the new snapshot and "block" makes training wait for the
+    worker.
+
+    Each finished snapshot is passed to `on_snapshot`. Without one, snapshots
+    are written to `directory`: topologies as binary files and state trees
+    into a CheckpointStore.
+    """
+
+    def __init__(self, directory: Optional[str] = None, kind: str = "topology",
+                 every_n_batches: Optional[int] = None, every_n_epochs: Optional[int] = 1,
+                 max_pending: int = 2, policy: str = "drop",
+                 on_snapshot: Optional[Callable[[Snapshot], None]] = None):
+        super().__init__()
+        if kind not in KINDS:
+            raise ValueError(f"Unknown snapshot kind '{kind}', expected one of {KINDS}")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}', expected one of {POLICIES}")
+        if directory is None and on_snapshot is None:
+            raise ValueError("Either directory or on_snapshot is required")
+        self.directory = directory
+        self.kind = kind
+        self.every_n_batches = every_n_batches
+        self.every_n_epochs = every_n_epochs
+        self.policy = policy
+        self.on_snapshot = on_snapshot
+        self.taken = 0
+        self.dropped = 0
+        self.errors: list[Exception] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._worker: Optional[threading.Thread] = None
+        self._store: Optional[CheckpointStore] = None
+        self._epoch = 0
+        self._step = 0
+        self._captured_step: Optional[int] = None
+
+    def on_train_begin(self, logs=None):
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            if self.kind == "state_tree":
+                self._store = CheckpointStore(self.directory)
+        self._worker = threading.Thread(target=self._work, name="snapshot-writer", daemon=True)
+        self._worker.start()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch = epoch
+
+    def on_train_batch_end(self, batch, logs=None):
+        self._step += 1
+        if self.every_n_batches and self._step % self.every_n_batches == 0:
+            self._capture()
+
+    def on_epoch_end(self, epoch, logs=None):
+        if self.every_n_epochs and (epoch + 1) % self.every_n_epochs == 0:
+            self._capture()
+
+    def on_train_end(self, logs=None):
+        if self._worker is None:
+            return
+        self._queue.put(None)
+        self._worker.join()
+        self._worker = None
+        if self.errors:
+            raise RuntimeError(f"{len(self.errors)} snapshot(s) failed") from self.errors[0]
+
+    def _capture(self):
+        if self._captured_step == self._step:
+            # An epoch ending on a batch snapshot; the weights were already taken
+            return
+        if self.policy == "drop" and self._queue.full():
+            # Skip the copy as well; the worker is behind
+            self.dropped += 1
+            return
+        if self.kind == "topology":
+            weights = [layer.get_weights() for layer in self.model.layers]
+        else:
+            weights = _copy_leaves(self.model.get_state_tree(value_format="numpy_array"))
+        snapshot = Snapshot(epoch=self._epoch, step=self._step, weights=weights)
+        try:
+            self._queue.put(snapshot, block=self.policy == "block")
+        except queue.Full:
+            self.dropped += 1
+            return
+        self.taken += 1
+        self._captured_step = self._step
+
+    def _work(self):
+        while True:
+            snapshot = self._queue.get()
+            if snapshot is None:
+                return
+            try:
+                if self.kind == "topology":
+                    snapshot.topology = convert(self.model, weights=snapshot.weights)
+                else:
+                    snapshot.state_tree = snapshot.weights
+                snapshot.weights = None
+                if self.on_snapshot is not None:
+                    self.on_snapshot(snapshot)
+                else:
+                    self._write(snapshot)
+            except Exception as error:
+                self.errors.append(error)
+
+    def _write(self, snapshot: Snapshot):
+        name = f"epoch{snapshot.epoch:04d}_step{snapshot.step:08d}"
+        if snapshot.topology is not None:
+            snapshot.topology.save_binary(os.path.join(self.directory, f"{name}.nnvb"))
+        else:
+            self._store.save(snapshot.state_tree, name)
+
+
+def _copy_leaves(tree):
+    # The arrays may share memory with the variables training keeps updating
+    if isinstance(tree, dict):
+        return {key: _copy_leaves(value) for key, value in tree.items()}
+    if isinstance(tree, np.ndarray):
+        return np.array(tree, copy=True)
+    return tree
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import numpy as np
+import tensorflow as tf
+from dataclasses import dataclass
+from typing import Optional
+
+from core.src.state_tree_serialization import (
+    _load_binary_entry,
+    _select_entries,
+    flatten_state_tree,
+    serialize_variable,
+    unflatten_state_tree,
+)
+
+DEFAULT_CHUNK_BYTES = 1 << 20
+
+
+@dataclass
+class SnapshotStats:
+    name: str
+    chunks_total: int = 0
+    chunks_written: int = 0
+    bytes_total: int = 0
+    bytes_written: int = 0
+
+
+class CheckpointStore:
+    """Incremental state-tree checkpoints in a directory.
+
+    Tensor bytes are cut into fixed-size chunks stored once under
+    `chunks/`, named by their blake2b hash. Every snapshot is a small JSON
+    manifest under `snapshots/` listing the chunks of each variable, so a
+    snapshot only writes the chunks that changed since earlier ones and any
+    snapshot can be rebuilt exactly.
+    """
+
+    def __init__(self, root: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES):
+        self.root = root
+        self.chunk_bytes = chunk_bytes
+        self._chunks_dir = os.path.join(root, "chunks")
+        self._snapshots_dir = os.path.join(root, "snapshots")
+        os.makedirs(self._chunks_dir, exist_ok=True)
+        os.makedirs(self._snapshots_dir, exist_ok=True)
+        self._known: Optional[set[str]] = None
+
+    def snapshots(self) -> list[str]:
+        return sorted(file[:-len(".json")] for file in os.listdir(self._snapshots_dir) if file.endswith(".json"))
+
+    def save_model(self, model, name: Optional[str] = None) -> SnapshotStats:
+        return self.save(model.get_state_tree(), name)
+
+    def save(self, state_tree, name: Optional[str] = None) -> SnapshotStats:
+        """Writes a snapshot; `name` defaults to one more than the highest numbered snapshot.
+
+        Raises FileExistsError rather than overwrite an existing snapshot.
+        """
+        if name is None:
+            numbers = [int(existing) for existing in self.snapshots() if existing.isdigit()]
+            name = f"{max(numbers, default=-1) + 1:06d}"
+        if os.path.exists(self._snapshot_path(name)):
+            raise FileExistsError(f"Snapshot '{name}' already exists")
+        stats = SnapshotStats(name=name)
+        entries = []
+        for path, value in flatten_state_tree(state_tree):
+            if isinstance(value, dict):
+                # Empty subtree
+                entries.append({"path": list(path), "__type__": "dict"})
+            elif isinstance(value, tf.Variable):
+                entries.append({
+                    "path": list(path),
+                    "__type__": "tf.Variable",
+                    "name": value.name,
+                    "dtype": str(value.dtype.name),
+                    "shape": value.shape.as_list(),
+                    **self._write_array(value.numpy(), stats),
+                })
+            elif isinstance(value, np.ndarray):
+                entries.append({"path": list(path), "__type__": "ndarray", **self._write_array(value, stats)})
+            else:
+                entries.append({"path": list(path), **serialize_variable(value)})
+
+        manifest = {"format": "checkpoint", "chunk_bytes": self.chunk_bytes, "entries": entries}
+        self._write_atomic(self._snapshot_path(name), json.dumps(manifest).encode())
+        return stats
+
+    def load(self, name: str, paths=None, as_variables: bool = True):
+        """Rebuilds a snapshot; `paths` works as in load_state_tree_from_binary."""
+        with open(self._snapshot_path(name), "r") as file:
+            manifest = json.load(file)
+        return unflatten_state_tree(
+            (tuple(entry["path"]), _load_binary_entry(self._read_array, entry, as_variables))
+            for entry in _select_entries(manifest["entries"], paths)
+        )
+
+    def delete(self, name: str):
+        os.remove(self._snapshot_path(name))
+
+    def collect_garbage(self) -> int:
+        """Removes chunks no snapshot refers to; returns how many were removed."""
+        referenced = set()
+        for name in self.snapshots():
+            with open(self._snapshot_path(name), "r") as file:
+                for entry in json.load(file)["entries"]:
+                    referenced.update(entry.get("chunks", ()))
+        removed = 0
+        for digest in self._known_chunks() - referenced:
+            os.remove(self._chunk_path(digest))
+            removed += 1
+        self._known -= self._known - referenced
+        return removed
+
+    def _snapshot_path(self, name: str) -> str:
+        return os.path.join(self._snapshots_dir, f"{name}.json")
+
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self._chunks_dir, digest[:2], digest[2:])
+
+    def _known_chunks(self) -> set[str]:
+        if self._known is None:
+            self._known = {
+                prefix + rest
+                for prefix in os.listdir(self._chunks_dir)
+                for rest in os.listdir(os.path.join(self._chunks_dir, prefix))
+                if not rest.endswith(".tmp")
+            }
+        return self._known
+
+    def _write_array(self, array: np.ndarray, stats: SnapshotStats) -> dict:
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        data = memoryview(array.reshape(-1).view(np.uint8))
+        known = self._known_chunks()
+        chunks = []
+        for start in range(0, len(data), self.chunk_bytes):
+            chunk = data[start:start + self.chunk_bytes]
+            digest = hashlib.blake2b(chunk, digest_size=20).hexdigest()
+            if digest not in known:
+                os.makedirs(os.path.dirname(self._chunk_path(digest)), exist_ok=True)
+                self._write_atomic(self._chunk_path(digest), chunk)
+                known.add(digest)
+                stats.chunks_written += 1
+                stats.bytes_written += len(chunk)
+            chunks.append(digest)
+        stats.chunks_total += len(chunks)
+        stats.bytes_total += len(data)
+        return {"array_dtype": array.dtype.str, "array_shape": list(array.shape), "chunks": chunks}
+
+    def _read_array(self, entry: dict) -> np.ndarray:
+        dtype = np.dtype(entry["array_dtype"])
+        buffer = np.empty(int(np.prod(entry["array_shape"], dtype=np.int64)) * dtype.itemsize, dtype=np.uint8)
+        position = 0
+        for digest in entry["chunks"]:
+            with open(self._chunk_path(digest), "rb") as file:
+                position += file.readinto(memoryview(buffer)[position:])
+        if position != len(buffer):
+            raise ValueError(f"Chunks of '{'/'.join(entry['path'])}' hold {position} bytes, expected {len(buffer)}")
+        return buffer.view(dtype).reshape(entry["array_shape"])
+
+    @staticmethod
+    def _write_atomic(file_path: str, data):
+        # Readers never see a partially written chunk or manifest
+        temporary = file_path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, file_path)
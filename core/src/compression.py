@@ -0,0 +1,58 @@
+import gzip
+import io
+import os
+from typing import IO, Optional
+
+CODECS = ("gzip", "zstd", "lz4")
+EXTENSIONS = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zstd": "zstd", ".lz4": "lz4"}
+
+
+def codec_for(file_path: str, compression: Optional[str] = "auto") -> Optional[str]:
+    """Resolves the codec of a file: "auto" picks it by extension, None disables compression."""
+    if compression == "auto":
+        return EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+    if compression is not None and compression not in CODECS:
+        raise ValueError(f"Unknown compression '{compression}', expected one of {CODECS}")
+    return compression
+
+
+def open_stream(file_path: str, mode: str = "rb", compression: Optional[str] = "auto",
+                level: Optional[int] = None, threads: int = -1) -> IO:
+    """Opens a file for streaming reads or writes, (de)compressing on the fly.
+
+    `mode` is one of "r", "w", "rb" or "wb"; text modes use UTF-8. zstd
+    compresses on `threads` worker threads (-1: one per CPU); gzip and lz4
+    are single-threaded. zstd and lz4 need the optional `zstandard` and
+    `lz4` packages, listed in requirements.txt; without them, opening such a
+    stream raises an ImportError naming the package.
+    """
+    if mode not in ("r", "w", "rb", "wb"):
+        raise ValueError(f"Unsupported mode '{mode}'")
+    writing = mode.startswith("w")
+    codec = codec_for(file_path, compression)
+
+    if codec is None:
+        stream = open(file_path, "wb" if writing else "rb")
+    elif codec == "gzip":
+        stream = gzip.open(file_path, "wb" if writing else "rb", compresslevel=6 if level is None else level)
+    elif codec == "zstd":
+        try:
+            import zstandard
+        except ImportError as error:
+            raise ImportError("zstd compression requires the optional 'zstandard' package "
+                              "(pip install zstandard)") from error
+        if writing:
+            compressor = zstandard.ZstdCompressor(level=3 if level is None else level, threads=threads)
+            stream = compressor.stream_writer(open(file_path, "wb"), closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(open(file_path, "rb"), closefd=True)
+    else:
+        try:
+            import lz4.frame
+        except ImportError as error:
+            raise ImportError("lz4 compression requires the optional 'lz4' package (pip install lz4)") from error
+        stream = lz4.frame.open(file_path, "wb" if writing else "rb", compression_level=0 if level is None else level)
+
+    if mode in ("r", "w"):
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return stream
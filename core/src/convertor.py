@@ -1,12 +1,24 @@
 import keras
-from core.src.models import Topology, Layer, Neuron, Connection
+import numpy as np
+from typing import Optional
+from core.src.models import Topology, Layer, Neuron, WeightBlock
+from core.src.sparsify import select_edges
 
 
-def convert(model: keras.Sequential) -> Topology:
+def convert(model: keras.Sequential, edge_budget: Optional[int] = None, strategy: Optional[str] = None,
+            threshold: Optional[float] = None, seed: int = 0,
+            weights: Optional[list[list[np.ndarray]]] = None) -> Topology:
+    """Builds a Topology from a Sequential model.
+
+    Passing `edge_budget` or `threshold` keeps only a subset of the edges
+    between layers; see core.src.sparsify.select_edges. Without a `strategy`,
+    a `threshold` alone selects "threshold" and otherwise "topk" is used.
+    `weights` replaces the model's current weights with a copy taken earlier,
+    one `layer.get_weights()` list per layer.
+    """
     nn = Topology()
     # Build network structure based on the model
     for layer_index, l in enumerate(model.layers):
-        neuron_counter = 0  # Counter for unique neuron identifiers
         model_type = type(l).__name__
         layer = Layer(
             index=layer_index,
@@ -21,32 +33,65 @@ def convert(model: keras.Sequential) -> Topology:
         if model_type == 'Flatten':
             continue
 
-        for u in range(l.units):
-            weights, biases = l.get_weights()
+        # Read the weights once per layer; kernel has shape (fan_in, units)
+        layer_weights = weights[layer_index] if weights is not None else l.get_weights()
+        kernel = layer_weights[0]
+        biases = layer_weights[1] if len(layer_weights) > 1 else None
+
+        for neuron_counter in range(l.units):
             neuron = Neuron(
                 id=f"{layer.type}_{layer.index}_{neuron_counter}",
                 layer_index=layer_index,
-                weight=weights[u],
-                bias=biases[u],
+                weight=kernel[neuron_counter],
+                bias=biases[neuron_counter] if biases is not None else None,
                 activation_function=l.activation.__name__,
             )
             layer.neurons.append(neuron)
-        
-            if hasattr(l, 'weights') and layer_index >= 2:
-                prev_layer_neurons = nn.layers[layer_index - 2].neurons
-                for from_neuron_index, from_neuron in enumerate(prev_layer_neurons):
-                    weight = weights[from_neuron_index][neuron_counter]
-                    bias = float(biases[neuron_counter]) if biases is not None else None
-                    new_connection = Connection(
-                        start=from_neuron.id,
-                        end=neuron.id,
-                        weight=float(weight),
-                        bias=bias,
-                    )
-
-                    #print(new_connection)
-                    nn.add_connection(new_connection)
-            neuron_counter += 1
+
+        # Connections to the previous layer are served as views over the kernel
+        previous_layer = nn.layers[-1] if nn.layers else None
+        nn.add_weights(WeightBlock(
+            start_layer=previous_layer.index if previous_layer is not None else None,
+            end_layer=layer_index,
+            kernel=kernel,
+            bias=biases,
+        ))
 
         nn.add_layer(layer)
+
+    if edge_budget is not None or threshold is not None:
+        sparsify(nn, edge_budget=edge_budget, strategy=strategy, threshold=threshold, seed=seed)
     return nn
+
+
+def sparsify(nn: Topology, edge_budget: Optional[int] = None, strategy: Optional[str] = None,
+             threshold: Optional[float] = None, seed: int = 0):
+    """Masks the weight blocks of a topology and records what was dropped in its metadata."""
+    if strategy is None:
+        strategy = "threshold" if threshold is not None and edge_budget is None else "topk"
+    blocks = [block for block in nn.weights if block.start_layer is not None]
+    masks = select_edges([block.kernel for block in blocks], strategy=strategy,
+                         budget=edge_budget, threshold=threshold, seed=seed)
+
+    layers = {}
+    for block, mask in zip(blocks, masks):
+        block.mask = mask
+        kept = block.edge_count()
+        layers[str(block.end_layer)] = {
+            "edges_total": block.kernel.size,
+            "edges_kept": kept,
+            "edges_dropped": block.kernel.size - kept,
+        }
+
+    edges_total = sum(entry["edges_total"] for entry in layers.values())
+    edges_kept = sum(entry["edges_kept"] for entry in layers.values())
+    nn.metadata["sparsification"] = {
+        "strategy": strategy,
+        "edge_budget": edge_budget,
+        "threshold": threshold,
+        "seed": seed,
+        "edges_total": edges_total,
+        "edges_kept": edges_kept,
+        "edges_dropped": edges_total - edges_kept,
+        "layers": layers,
+    }
@@ -0,0 +1,126 @@
+import io
+import orjson
+from itertools import groupby, islice
+from typing import Any, Callable, Iterable, Optional
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+class JsonStreamWriter:
+    """Buffers encoded JSON fragments and flushes them in chunks.
+
+    The target may be a binary or text file-like object (anything with
+    `write`) or a socket (anything with `sendall`).
+    """
+
+    def __init__(self, target: Any, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if hasattr(target, "sendall"):
+            self._sink = target.sendall
+        elif isinstance(target, io.TextIOBase):
+            self._sink = lambda data: target.write(data.decode())
+        else:
+            self._sink = target.write
+        self.chunk_size = chunk_size
+        self._buffer = bytearray()
+
+    def write(self, data: bytes):
+        self._buffer += data
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._sink(bytes(self._buffer))
+            self._buffer.clear()
+
+
+def _reindent(encoded: bytes, indent: bytes) -> bytes:
+    return indent + encoded.replace(b"\n", b"\n" + indent)
+
+
+class StreamedObject:
+    """A JSON object whose last member, `key`, is an iterable written as a streamed array.
+
+    Lets arrays of large records (e.g. layers with their neurons) be written
+    without encoding a whole record at once.
+    """
+
+    def __init__(self, head: dict, key: str, items: Iterable):
+        self.head = head
+        self.key = key
+        self.items = items
+
+
+def write_json_array(writer: JsonStreamWriter, items: Iterable, compact: bool = False,
+                     default: Optional[Callable[[Any], Any]] = None, level: int = 1, batch_size: int = 4096):
+    """Streams an iterable as a JSON array, encoding a batch of items at a time.
+
+    The first batch holds one item; later ones are sized so that each encodes
+    to about the writer's chunk size, up to `batch_size` items. StreamedObject items
+    are written member by member. In indented mode the output matches
+    orjson's OPT_INDENT_2 layout for an array nested `level` deep.
+    """
+    option = orjson.OPT_SERIALIZE_DATACLASS | (0 if compact else orjson.OPT_INDENT_2)
+    iterator = iter(items)
+    first = True
+    size = 1
+    writer.write(b"[")
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            break
+        for streamed, run in groupby(batch, key=lambda item: isinstance(item, StreamedObject)):
+            if streamed:
+                for item in run:
+                    writer.write(b"" if first else b",")
+                    writer.write(b"" if compact else b"\n")
+                    _write_streamed_object(writer, item, compact, default, level + 1, batch_size)
+                    first = False
+                continue
+            run = list(run)
+            encoded = orjson.dumps(run, option=option, default=default)
+            if compact:
+                writer.write((b"" if first else b",") + encoded[1:-1])
+            else:
+                # Strip "[\n" and "\n]" and shift the items to this nesting level
+                inner = _reindent(encoded[2:-2], b"  " * level)
+                writer.write((b"\n" if first else b",\n") + inner)
+            first = False
+            size = max(1, min(batch_size, len(run) * writer.chunk_size // len(encoded)))
+    if not first and not compact:
+        writer.write(b"\n" + b"  " * level)
+    writer.write(b"]")
+
+
+def _write_streamed_object(writer: JsonStreamWriter, item: StreamedObject, compact: bool,
+                           default: Optional[Callable[[Any], Any]], level: int, batch_size: int):
+    """Writes a StreamedObject whose opening brace is indented `level` deep."""
+    option = orjson.OPT_SERIALIZE_DATACLASS | (0 if compact else orjson.OPT_INDENT_2)
+    # Encoded with an empty array as its last member, which ends in "[]}" or "[]\n}"
+    encoded = orjson.dumps({**item.head, item.key: []}, option=option, default=default)
+    if compact:
+        writer.write(encoded[:-3])
+        write_json_array(writer, item.items, compact=True, default=default, batch_size=batch_size)
+        writer.write(b"}")
+        return
+    indent = b"  " * level
+    writer.write(_reindent(encoded[:-4], indent))
+    write_json_array(writer, item.items, default=default, level=level + 1, batch_size=batch_size)
+    writer.write(b"\n" + indent + b"}")
+
+
+def write_json_document(writer: JsonStreamWriter, document: dict, compact: bool = False,
+                        default: Optional[Callable[[Any], Any]] = None, batch_size: int = 4096):
+    """Streams a top-level JSON object; list and iterator values are written in batches."""
+    option = orjson.OPT_SERIALIZE_DATACLASS | (0 if compact else orjson.OPT_INDENT_2)
+    writer.write(b"{")
+    for position, (key, value) in enumerate(document.items()):
+        separator = b"," if position else b""
+        writer.write(separator + (orjson.dumps(key) + b":" if compact else b"\n  " + orjson.dumps(key) + b": "))
+        if isinstance(value, (dict, str, bytes)) or not isinstance(value, Iterable):
+            encoded = orjson.dumps(value, option=option, default=default)
+            writer.write(encoded if compact else encoded.replace(b"\n", b"\n  "))
+        else:
+            write_json_array(writer, value, compact=compact, default=default, batch_size=batch_size)
+    writer.write(b"}" if compact or not document else b"\n}")
+    writer.flush()
@@ -0,0 +1,89 @@
+import numpy as np
+from dataclasses import dataclass
+
+from core.src.models import Serializable, Topology
+
+ORDERS = ("index", "barycenter")
+
+
+@dataclass
+class Layout(Serializable):
+    """Node coordinates for every neuron, in topology layer order.
+
+    Neurons of `layers[k]` occupy positions offsets[k]:offsets[k + 1] of
+    `ids`, `x` and `y`.
+    """
+    ids: list[str]
+    x: np.ndarray
+    y: np.ndarray
+    offsets: np.ndarray
+
+
+def get_layout(topology: Topology, order: str = "index", layer_spacing: float = 1.0,
+               node_spacing: float = 1.0, sweeps: int = 2) -> Layout:
+    """Returns the layout of a topology, computing it only when what it depends on changed.
+
+    Index order depends only on the layers and neuron ids, so it survives
+    weight updates; barycenter order depends on the weights as well, and
+    checking it hashes all weights.
+    """
+    fingerprint = topology.fingerprint() if order == "barycenter" else topology.structure_fingerprint()
+    return topology.cached(("layout", order, layer_spacing, node_spacing, sweeps), fingerprint,
+                           lambda: compute_layout(topology, order, layer_spacing, node_spacing, sweeps))
+
+
+def compute_layout(topology: Topology, order: str = "index", layer_spacing: float = 1.0,
+                   node_spacing: float = 1.0, sweeps: int = 2) -> Layout:
+    """Places each layer on a vertical line, neurons centred around y = 0.
+
+    With order="barycenter", neurons are reordered by the |weight|-weighted
+    mean position of their neighbours, alternating forward and backward
+    sweeps, to reduce edge crossings.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"Unknown layout order '{order}', expected one of {ORDERS}")
+
+    sizes = [len(layer.neurons) for layer in topology.layers]
+    ranks = [np.arange(size, dtype=np.float64) for size in sizes]
+    if order == "barycenter":
+        positions = {layer.index: k for k, layer in enumerate(topology.layers)}
+        adjacency = _layer_adjacency(topology, positions, sizes)
+        for sweep in range(sweeps):
+            forward = sweep % 2 == 0
+            sequence = range(1, len(sizes)) if forward else range(len(sizes) - 2, -1, -1)
+            for k in sequence:
+                neighbour = k - 1 if forward else k + 1
+                weights = adjacency.get((neighbour, k)) if forward else adjacency.get((k, neighbour))
+                if weights is None:
+                    continue
+                if not forward:
+                    weights = weights.T
+                # weights: (neighbour neurons, neurons of layer k)
+                totals = weights.sum(axis=0)
+                barycenters = np.divide(weights.T @ ranks[neighbour], totals,
+                                        out=ranks[k].copy(), where=totals > 0)
+                ranks[k] = np.argsort(np.argsort(barycenters, kind="stable"), kind="stable").astype(np.float64)
+
+    x = np.concatenate([np.full(size, k * layer_spacing) for k, size in enumerate(sizes)]) if sizes else np.empty(0)
+    y = np.concatenate([(rank - (size - 1) / 2) * node_spacing for rank, size in zip(ranks, sizes)]) if sizes else np.empty(0)
+    return Layout(
+        ids=[neuron.id for layer in topology.layers for neuron in layer.neurons],
+        x=x,
+        y=y,
+        offsets=np.cumsum([0] + sizes),
+    )
+
+
+def _layer_adjacency(topology: Topology, positions: dict[int, int], sizes: list[int]) -> dict[tuple[int, int], np.ndarray]:
+    """|weight| matrices between consecutive layers, keyed by layer positions."""
+    adjacency = {}
+    for block in topology.weights:
+        start = positions.get(block.start_layer)
+        end = positions.get(block.end_layer)
+        if start is None or end is None or end != start + 1:
+            continue
+        weights = np.abs(np.asarray(block.kernel[:sizes[start], :sizes[end]], dtype=np.float64))
+        if block.mask is not None:
+            weights = weights * block.mask[:sizes[start], :sizes[end]]
+        adjacency[(start, end)] = weights
+    return adjacency
@@ -0,0 +1,89 @@
+import numpy as np
+
+from core.src.models import LodEdges, LodLayer, LodLevel, Pyramid, Topology
+
+METHODS = ("contiguous", "similarity")
+
+
+def build_pyramid(topology: Topology, method: str = "contiguous", factor: int = 4,
+                  max_groups: int = 16, seed: int = 0) -> Pyramid:
+    """Builds a level-of-detail pyramid and stores it on the topology.
+
+    `contiguous` groups neurons by index. `similarity` first orders each
+    layer's neurons along the main direction of their incoming weight
+    vectors, so neighbouring neurons (and therefore groups) have similar
+    inputs. Levels are added until the coarsest one has at most `max_groups`
+    groups per layer.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown pyramid method '{method}', expected one of {METHODS}")
+    if factor < 2:
+        raise ValueError("factor must be at least 2")
+
+    rng = np.random.default_rng(seed)
+    orders = {}
+    for layer in topology.layers:
+        units = len(layer.neurons)
+        block = topology.get_weights(layer.index)
+        if method == "similarity" and block is not None and units > 1:
+            orders[layer.index] = _similarity_order(np.asarray(block.kernel[:, :units]).T, rng)
+        else:
+            orders[layer.index] = np.arange(units)
+
+    largest = max((len(order) for order in orders.values()), default=0)
+    depth = 0
+    while -(-largest // factor ** depth) > max_groups:
+        depth += 1
+
+    pyramid = Pyramid(
+        method=method,
+        factor=factor,
+        layers=[LodLayer(layer_index=index, order=order) for index, order in orders.items()],
+    )
+    for level in range(depth):
+        group_size = factor ** (depth - level)
+        pyramid.levels.append(LodLevel(
+            group_size=group_size,
+            groups=[-(-len(order) // group_size) for order in orders.values()],
+            edges=_aggregate_edges(topology, orders, group_size),
+        ))
+    topology.pyramid = pyramid
+    return pyramid
+
+
+def _similarity_order(vectors: np.ndarray, rng: np.random.Generator, iterations: int = 20) -> np.ndarray:
+    """Sorts rows by their projection on the first principal component (power iteration)."""
+    centered = vectors - vectors.mean(axis=0)
+    direction = rng.standard_normal(centered.shape[1]).astype(centered.dtype)
+    for _ in range(iterations):
+        direction = centered.T @ (centered @ direction)
+        norm = np.linalg.norm(direction)
+        if norm == 0:
+            return np.arange(len(vectors))
+        direction /= norm
+    return np.argsort(centered @ direction, kind="stable")
+
+
+def _aggregate_edges(topology: Topology, orders: dict[int, np.ndarray], group_size: int) -> list[LodEdges]:
+    edges = []
+    for block in topology.weights:
+        if block.start_layer not in orders or block.end_layer not in orders:
+            continue
+        order_in, order_out = orders[block.start_layer], orders[block.end_layer]
+        if not len(order_in) or not len(order_out):
+            continue
+        kernel = np.asarray(block.kernel, dtype=np.float64)[np.ix_(order_in, order_out)]
+        rows = np.arange(0, len(order_in), group_size)
+        columns = np.arange(0, len(order_out), group_size)
+        counts = np.outer(np.diff(np.r_[rows, len(order_in)]), np.diff(np.r_[columns, len(order_out)]))
+
+        def group_sum(matrix):
+            return np.add.reduceat(np.add.reduceat(matrix, rows, axis=0), columns, axis=1)
+
+        edges.append(LodEdges(
+            start_layer=block.start_layer,
+            end_layer=block.end_layer,
+            mean_weight=(group_sum(kernel) / counts).astype(np.float32),
+            mean_abs_weight=(group_sum(np.abs(kernel)) / counts).astype(np.float32),
+        ))
+    return edges
@@ -1,15 +1,31 @@
+import base64
+import hashlib
 import orjson
 import numpy as np
-from dataclasses import dataclass, asdict, is_dataclass, field
-from typing import Any, Type, TypeVar, Union
+from array import array
+from collections import defaultdict
+from functools import lru_cache
+from itertools import islice
+from dataclasses import dataclass, asdict, is_dataclass, field, fields, replace, MISSING
+from typing import Any, Callable, Iterator, Optional, Type, TypeVar, Union
+
+from core.src.binary_container import BinaryContainer, write_container
+from core.src.json_stream import DEFAULT_CHUNK_SIZE, JsonStreamWriter, StreamedObject, write_json_document
+from core.src.quantization import QuantizedArray, quantize
 
 T = TypeVar("T", bound="Serializable")
 
 
 class Serializable:
+    __slots__ = ()
+
     def to_json(self) -> str:
         """Serializes the dataclass to JSON."""
-        return orjson.dumps(self, option=orjson.OPT_SERIALIZE_DATACLASS | orjson.OPT_INDENT_2, default=self._convert_numpy).decode()
+        return orjson.dumps(self._json_payload(), option=orjson.OPT_SERIALIZE_DATACLASS | orjson.OPT_INDENT_2, default=self._convert_numpy).decode()
+
+    def _json_payload(self) -> Any:
+        """Returns the object handed to the JSON encoder."""
+        return self
     
     @classmethod
     def from_json(cls: Type[T], json_data: str) -> T:
@@ -20,32 +36,82 @@ class Serializable:
     @classmethod
     def _deserialize_data(cls, target_cls: Type[T], data: dict) -> T:
         """Recursively reconstructs dataclass instances from dictionaries."""
-        if not is_dataclass(target_cls):
-            raise TypeError("from_json method can only be used with dataclass types")
-
-        # Prepare the arguments dictionary for the target dataclass
         kwargs = {}
-        for field in target_cls.__dataclass_fields__:
-            field_type = target_cls.__dataclass_fields__[field].type
-            field_value = data.get(field)
-
-            # Handle nested dataclasses
-            if is_dataclass(field_type) and isinstance(field_value, dict):
-                kwargs[field] = cls._deserialize_data(field_type, field_value)
-            # Handle lists of dataclasses (e.g., list[Neuron] in Layer)
-            elif hasattr(field_type, "__origin__") and field_type.__origin__ == list:
-                sub_type = field_type.__args__[0]
-                if is_dataclass(sub_type) and isinstance(field_value, list):
-                    kwargs[field] = [cls._deserialize_data(sub_type, item) for item in field_value]
-                else:
-                    kwargs[field] = field_value
-            # Handle numpy types
-            elif isinstance(field_value, float):
-                kwargs[field] = np.float32(field_value)
+        for field_plan in _decoder_plan(target_cls):
+            name = field_plan.name
+            if name not in data:
+                # Leave fields that are absent from the document to their defaults
+                if not field_plan.has_default:
+                    kwargs[name] = None
+                continue
+            kwargs[name] = cls._decode_value(field_plan, data[name])
+        return target_cls(**kwargs)
+
+    @classmethod
+    def _deserialize_many(cls, target_cls: Type[T], items: list) -> list[T]:
+        """Reconstructs a list of dataclass instances, column by column when possible."""
+        columns = cls._decode_columns(target_cls, items)
+        if columns is None:
+            return [cls._deserialize_data(target_cls, item) for item in items]
+        return [target_cls(*row) for row in zip(*columns.values())]
+
+    @classmethod
+    def _decode_columns(cls, target_cls: Type[T], items: list) -> Optional[dict[str, Any]]:
+        """Decodes a homogeneous list of records into one column per field.
+
+        Float fields become np.float32 arrays. Returns None when the records do
+        not all carry the same keys, in which case callers decode item by item.
+        """
+        plan = _decoder_plan(target_cls)
+        if not all(field_plan.init for field_plan in plan):
+            return None
+        if not items or not isinstance(items[0], dict):
+            return None
+        # Trailing fields with defaults may be absent from every record (e.g.
+        # documents written before the field existed); they keep their defaults
+        count = len(plan)
+        while count and plan[count - 1].has_default and plan[count - 1].name not in items[0]:
+            count -= 1
+        plan = plan[:count]
+        if not all(isinstance(item, dict) and len(item) == count for item in items):
+            return None
+
+        columns = {}
+        for field_plan in plan:
+            try:
+                column = [item[field_plan.name] for item in items]
+            except KeyError:
+                return None
+            if field_plan.kind == _FLOAT64:
+                columns[field_plan.name] = [cls._decode_value(field_plan, value) for value in column]
+            elif set(map(type, column)) == {float}:
+                columns[field_plan.name] = np.fromiter(column, dtype=np.float32, count=len(column))
+            elif field_plan.kind == _VALUE and not any(isinstance(value, float) for value in column):
+                columns[field_plan.name] = column
             else:
-                kwargs[field] = field_value
+                columns[field_plan.name] = [cls._decode_value(field_plan, value) for value in column]
+        return columns
 
-        return target_cls(**kwargs)
+    @classmethod
+    def _decode_value(cls, field_plan: "_FieldPlan", value: Any) -> Any:
+        # Handle nested dataclasses
+        if field_plan.kind == _DATACLASS and isinstance(value, dict):
+            return cls._deserialize_data(field_plan.sub_type, value)
+        # Handle lists of dataclasses (e.g., list[Neuron] in Layer)
+        if field_plan.kind == _DATACLASS_LIST:
+            if isinstance(value, list):
+                return cls._deserialize_many(field_plan.sub_type, value)
+            return value
+        if field_plan.kind == _LIST:
+            return value
+        if field_plan.kind == _ARRAY and isinstance(value, list):
+            return np.asarray(value)
+        if field_plan.kind == _FLOAT64 and isinstance(value, (int, float)):
+            return np.float64(value)
+        # Handle numpy types
+        if isinstance(value, float):
+            return np.float32(value)
+        return value
 
     @staticmethod
     def _convert_numpy(obj: Any):
@@ -60,6 +126,123 @@ class Serializable:
             raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
 
+_VALUE, _DATACLASS, _DATACLASS_LIST, _LIST, _ARRAY, _FLOAT64 = range(6)
+
+
+@dataclass(frozen=True)
+class _FieldPlan:
+    name: str
+    kind: int
+    sub_type: Optional[type]
+    has_default: bool
+    init: bool
+
+
+@lru_cache(maxsize=None)
+def _decoder_plan(target_cls: type) -> tuple[_FieldPlan, ...]:
+    """Builds, once per class, the per-field decoding steps used by from_json."""
+    if not is_dataclass(target_cls):
+        raise TypeError("from_json method can only be used with dataclass types")
+
+    plan = []
+    for dataclass_field in fields(target_cls):
+        field_type = dataclass_field.type
+        # Unwrap Optional[X]
+        if getattr(field_type, "__origin__", None) is Union:
+            arguments = [argument for argument in field_type.__args__ if argument is not type(None)]
+            if len(arguments) == 1:
+                field_type = arguments[0]
+        sub_type = None
+        if field_type is np.ndarray:
+            kind = _ARRAY
+        elif field_type is np.float64:
+            kind = _FLOAT64
+        elif is_dataclass(field_type):
+            kind, sub_type = _DATACLASS, field_type
+        elif getattr(field_type, "__origin__", None) == list:
+            sub_type = field_type.__args__[0]
+            kind = _DATACLASS_LIST if is_dataclass(sub_type) else _LIST
+        else:
+            kind = _VALUE
+        plan.append(_FieldPlan(
+            name=dataclass_field.name,
+            kind=kind,
+            sub_type=sub_type,
+            has_default=dataclass_field.default is not MISSING or dataclass_field.default_factory is not MISSING,
+            init=dataclass_field.init,
+        ))
+    return tuple(plan)
+
+
+def _digest(*parts: Any) -> bytes:
+    """blake2b over byte-like parts; anything else is hashed through its JSON form."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(f"{part.dtype.str}{part.shape}".encode())
+            part = np.ascontiguousarray(part).data
+        elif not isinstance(part, (bytes, bytearray, memoryview)):
+            part = orjson.dumps(part, default=Serializable._convert_numpy)
+        digest.update(len(part).to_bytes(8, "little"))
+        digest.update(part)
+    return digest.digest()
+
+
+def _equal_values(a: Any, b: Any) -> bool:
+    """Equality that compares arrays by value instead of element-wise."""
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return a is not None and b is not None and np.array_equal(a, b)
+    return a == b
+
+
+def _fields_equal(self: Any, other: Any) -> bool:
+    """__eq__ for dataclasses with array fields, which the generated one cannot compare."""
+    if other.__class__ is not self.__class__:
+        return NotImplemented
+    return all(_equal_values(getattr(self, item.name), getattr(other, item.name)) for item in fields(self))
+
+
+def _shape(shape: Any) -> Optional[list]:
+    """Normalizes a tuple, list or TensorShape so equal shapes hash alike."""
+    if shape is None:
+        return None
+    return [None if dimension is None else int(dimension) for dimension in shape]
+
+
+class MerkleTree:
+    """Binary hash tree over a list of leaf digests.
+
+    Two trees with the same root hold the same leaves; differing leaves are
+    found by descending only into subtrees whose hashes differ.
+    """
+
+    def __init__(self, leaves: list[bytes]):
+        self.levels = [list(leaves) or [_digest(b"")]]
+        while len(self.levels[-1]) > 1:
+            level = self.levels[-1]
+            self.levels.append([_digest(*level[i:i + 2]) for i in range(0, len(level), 2)])
+
+    @property
+    def root(self) -> bytes:
+        return self.levels[-1][0]
+
+    @property
+    def leaves(self) -> list[bytes]:
+        return self.levels[0]
+
+    def differences(self, other: "MerkleTree") -> list[int]:
+        """Returns the positions of the leaves that differ from `other`."""
+        if len(self.leaves) != len(other.leaves):
+            return [i for i in range(max(len(self.leaves), len(other.leaves)))
+                    if i >= len(self.leaves) or i >= len(other.leaves) or self.leaves[i] != other.leaves[i]]
+        positions = [0] if self.root != other.root else []
+        for depth in range(len(self.levels) - 1, 0, -1):
+            below, other_below = self.levels[depth - 1], other.levels[depth - 1]
+            positions = [child for position in positions for child in (2 * position, 2 * position + 1)
+                         if child < len(below) and below[child] != other_below[child]]
+        return positions
+
+
 class ActivationFunction:
     pass
 
@@ -69,12 +252,33 @@ class LayerType:
 
 
 @dataclass
+class NeuronStats(Serializable):
+    """Summary of a neuron's activations over a dataset, see core.src.activations.
+
+    `sparsity` is the fraction of samples where the activation was (near)
+    zero; `histogram` counts the samples per equal-width bin over
+    `histogram_range`, with values outside it counted in the end bins.
+    """
+    count: int
+    mean: np.float64
+    variance: np.float64
+    sparsity: np.float64
+    min: np.float64
+    max: np.float64
+    histogram: list[int] = field(default_factory=lambda: [])
+    histogram_range: list[float] = field(default_factory=lambda: [])
+
+
+@dataclass(slots=True, eq=False)
 class Neuron(Serializable):
     id: str
     layer_index: int
     weight: np.float32
     bias: float
     activation_function: Union[str, ActivationFunction] = None
+    stats: Optional[NeuronStats] = None
+
+    __eq__ = _fields_equal
 
     def to_dict(self):
         data = asdict(self)
@@ -82,6 +286,15 @@ class Neuron(Serializable):
             data['activation_function'] = str(self.activation_function)
         return data
 
+    def _json_payload(self) -> Any:
+        """Neurons without statistics are written without a `stats` key."""
+        if self.stats is not None:
+            return self
+        return {name: getattr(self, name) for name in _PLAIN_NEURON_FIELDS}
+
+
+_PLAIN_NEURON_FIELDS = tuple(neuron_field.name for neuron_field in fields(Neuron) if neuron_field.name != "stats")
+
 
 @dataclass
 class Layer(Serializable):
@@ -94,8 +307,39 @@ class Layer(Serializable):
     activation_function: Union[str, ActivationFunction]
     neurons: list[Neuron] = field(default_factory=lambda: [])
 
+    def _json_payload(self) -> Any:
+        if all(neuron.stats is not None for neuron in self.neurons):
+            return self
+        payload = {layer_field.name: getattr(self, layer_field.name) for layer_field in fields(self)}
+        payload["neurons"] = [neuron._json_payload() for neuron in self.neurons]
+        return payload
 
-@dataclass
+    def _json_stream(self) -> StreamedObject:
+        """The JSON payload with its neurons produced one at a time, for write_json."""
+        head = {layer_field.name: getattr(self, layer_field.name) for layer_field in fields(self)
+                if layer_field.name != "neurons"}
+        return StreamedObject(head, "neurons", (neuron._json_payload() for neuron in self.neurons))
+
+    def merkle(self) -> MerkleTree:
+        """Hash tree with the layer's own fields as the first leaf and one leaf per neuron.
+
+        Built from the current values on every call, since neurons and their
+        weight arrays can be edited in place.
+        """
+        header = _digest([self.index, str(self.type), self.name, self.units,
+                          _shape(self.input_shape), _shape(self.output_shape), str(self.activation_function)])
+        leaves = [header]
+        for neuron in self.neurons:
+            weight = np.asarray(neuron.weight, dtype=np.float32) if neuron.weight is not None else b""
+            bias = np.float32(neuron.bias).tobytes() if neuron.bias is not None else b""
+            leaves.append(_digest([neuron.id, neuron.layer_index, str(neuron.activation_function)], weight, bias))
+        return MerkleTree(leaves)
+
+    def fingerprint(self) -> str:
+        return self.merkle().root.hex()
+
+
+@dataclass(slots=True)
 class Connection(Serializable):
     start: str
     end: str
@@ -103,17 +347,815 @@ class Connection(Serializable):
     bias: float
 
 
+@dataclass(eq=False)
+class WeightBlock(Serializable):
+    """Dense kernel and bias of one layer, kept as contiguous matrices.
+
+    `kernel` has shape (fan_in, units). `start_layer` is the index of the layer
+    whose neurons feed the kernel, or None when that layer is not part of the
+    topology (e.g. a Flatten input). An optional boolean `mask` of the kernel's
+    shape hides the edges that were dropped by sparsification.
+    """
+    start_layer: Optional[int]
+    end_layer: int
+    kernel: np.ndarray
+    bias: Optional[np.ndarray] = None
+    mask: Optional[np.ndarray] = None
+
+    __eq__ = _fields_equal
+
+    def edge_count(self) -> int:
+        """Returns the number of edges that are kept."""
+        return int(np.count_nonzero(self.mask)) if self.mask is not None else self.kernel.size
+
+    def merkle(self) -> MerkleTree:
+        """Hash tree with leaves for the header, each kernel row, the bias and the mask."""
+        kernel = np.asarray(self.kernel, dtype=np.float32)
+        leaves = [_digest([self.start_layer, self.end_layer, list(kernel.shape)])]
+        leaves.extend(_digest(row) for row in kernel)
+        leaves.append(_digest(np.asarray(self.bias, dtype=np.float32)) if self.bias is not None else _digest(b""))
+        leaves.append(_digest(np.asarray(self.mask, dtype=bool)) if self.mask is not None else _digest(b""))
+        return MerkleTree(leaves)
+
+    def fingerprint(self) -> str:
+        return self.merkle().root.hex()
+
+    def describe_leaf(self, position: int) -> str:
+        """Names the part of the block a leaf of merkle() covers."""
+        rows = self.kernel.shape[0]
+        if position == 0:
+            return "header"
+        if position <= rows:
+            return f"kernel[{position - 1}]"
+        return "bias" if position == rows + 1 else "mask"
+
+
+@dataclass(eq=False)
+class LodLayer(Serializable):
+    """Neuron order of one layer in a level-of-detail pyramid.
+
+    Groups are contiguous runs of `order`, so a group at any level is the
+    union of its children at the next finer level.
+    """
+    layer_index: int
+    order: np.ndarray
+
+    __eq__ = _fields_equal
+
+
+@dataclass(eq=False)
+class LodEdges(Serializable):
+    """Aggregated weights between the groups of two layers at one level."""
+    start_layer: int
+    end_layer: int
+    mean_weight: np.ndarray
+    mean_abs_weight: np.ndarray
+
+    __eq__ = _fields_equal
+
+
+@dataclass
+class LodLevel(Serializable):
+    group_size: int
+    groups: list[int]
+    edges: list[LodEdges] = field(default_factory=lambda: [])
+
+
+@dataclass
+class Pyramid(Serializable):
+    """Level-of-detail pyramid, coarsest level first.
+
+    Level k groups `factor` groups of level k + 1; the finest level groups
+    `factor` neurons, and the topology itself is the full-detail level.
+    """
+    method: str
+    factor: int
+    layers: list[LodLayer] = field(default_factory=lambda: [])
+    levels: list[LodLevel] = field(default_factory=lambda: [])
+
+    def _layer_position(self, layer_index: int) -> int:
+        for position, layer in enumerate(self.layers):
+            if layer.layer_index == layer_index:
+                return position
+        raise KeyError(f"Layer {layer_index} is not part of the pyramid")
+
+    def members(self, level: int, layer_index: int, group: int) -> np.ndarray:
+        """Returns the neuron units that make up a group."""
+        size = self.levels[level].group_size
+        return np.asarray(self.layers[self._layer_position(layer_index)].order)[group * size:(group + 1) * size]
+
+    def children(self, level: int, layer_index: int, group: int) -> list[int]:
+        """Returns the groups of the next finer level covered by a group, or its
+        neuron units when `level` is the finest stored level."""
+        if level + 1 == len(self.levels):
+            return self.members(level, layer_index, group).tolist()
+        count = self.levels[level + 1].groups[self._layer_position(layer_index)]
+        return list(range(group * self.factor, min((group + 1) * self.factor, count)))
+
+    def edges(self, level: int, start_layer: int, end_layer: int) -> Optional[LodEdges]:
+        for edges in self.levels[level].edges:
+            if edges.start_layer == start_layer and edges.end_layer == end_layer:
+                return edges
+        return None
+
+
+class NeuronTable:
+    """Interns neuron ids as integer numbers, keeping each string id once.
+
+    Neurons first seen through a connection have no layer (-1) until the
+    layer that owns them is added.
+    """
+
+    def __init__(self):
+        self.ids: list[str] = []
+        self.layers = array("q")
+        self.units = array("q")
+        self._numbers: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def intern(self, neuron_id: str, layer_index: int = -1, unit: int = -1) -> int:
+        number = self._numbers.get(neuron_id)
+        if number is None:
+            number = len(self.ids)
+            self._numbers[neuron_id] = number
+            self.ids.append(neuron_id)
+            self.layers.append(layer_index)
+            self.units.append(unit)
+        elif layer_index != -1:
+            self.layers[number] = layer_index
+            self.units[number] = unit
+        return number
+
+    def number(self, neuron_id: str) -> Optional[int]:
+        return self._numbers.get(neuron_id)
+
+    def numbers(self, neuron_ids: list[str], missing: Optional[int] = None) -> np.ndarray:
+        """Returns the numbers of neuron ids; unknown ids raise KeyError, or map
+        to `missing` when it is given."""
+        lookup = self._numbers.__getitem__ if missing is None else lambda neuron_id: self._numbers.get(neuron_id, missing)
+        return np.fromiter(map(lookup, neuron_ids), dtype=np.int64, count=len(neuron_ids))
+
+    def location(self, number: int) -> Optional[tuple[int, int]]:
+        """Returns (layer index, unit) of a neuron, or None if it has no layer."""
+        if self.layers[number] == -1:
+            return None
+        return self.layers[number], self.units[number]
+
+
+class ConnectionTable:
+    """Struct-of-arrays store for explicit connections.
+
+    Endpoints are neuron numbers from a NeuronTable and weights are float32;
+    a NaN bias stands for a connection without bias. Indexing and iteration
+    produce Connection views with the string ids filled in.
+    """
+
+    def __init__(self, neurons: NeuronTable, capacity: int = 16):
+        self.neurons = neurons
+        self._size = 0
+        self._start = np.empty(capacity, dtype=np.int32)
+        self._end = np.empty(capacity, dtype=np.int32)
+        self._weight = np.empty(capacity, dtype=np.float32)
+        self._bias = np.empty(capacity, dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, size: int):
+        capacity = len(self._start)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        for name in ("_start", "_end", "_weight", "_bias"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def append(self, start: int, end: int, weight: float, bias: Optional[float]) -> int:
+        position = self._size
+        self._reserve(position + 1)
+        self._start[position] = start
+        self._end[position] = end
+        self._weight[position] = weight
+        self._bias[position] = np.nan if bias is None else bias
+        self._size += 1
+        return position
+
+    def columns(self) -> dict[str, np.ndarray]:
+        """Returns views of the start, end, weight and bias arrays."""
+        size = self._size
+        return {"start": self._start[:size], "end": self._end[:size],
+                "weight": self._weight[:size], "bias": self._bias[:size]}
+
+    def __getitem__(self, position: int) -> Connection:
+        if position < 0:
+            position += self._size
+        if not 0 <= position < self._size:
+            raise IndexError("connection index out of range")
+        bias = float(self._bias[position])
+        return Connection(
+            start=self.neurons.ids[self._start[position]],
+            end=self.neurons.ids[self._end[position]],
+            weight=float(self._weight[position]),
+            bias=None if bias != bias else bias,
+        )
+
+    def __iter__(self) -> Iterator[Connection]:
+        ids = self.neurons.ids
+        for offset in range(0, self._size, 4096):
+            stop = min(offset + 4096, self._size)
+            rows = zip(self._start[offset:stop].tolist(), self._end[offset:stop].tolist(),
+                       self._weight[offset:stop].tolist(), self._bias[offset:stop].tolist())
+            for start, end, weight, bias in rows:
+                yield Connection(start=ids[start], end=ids[end], weight=weight,
+                                 bias=None if bias != bias else bias)
+
+    def __eq__(self, other: object) -> bool:
+        """Compares the connections with another table or a list of Connection."""
+        if not isinstance(other, (ConnectionTable, list)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+
+# Connections that may wait in the per-neuron buffers before the adjacency is rebuilt
+ADJACENCY_SLACK = 1024
+
+
 @dataclass
 class Topology(Serializable):
     layers: list[Layer] = field(default_factory=lambda: [])
     connections: list[Connection] = field(default_factory=lambda: [])
+    weights: list[WeightBlock] = field(default_factory=lambda: [])
+    metadata: dict[str, Any] = field(default_factory=dict)
+    pyramid: Optional[Pyramid] = None
+
+    def __post_init__(self):
+        # Lookup indexes; they are not dataclass fields so they stay out of
+        # comparisons and serialization. Explicit connections are kept in a
+        # ConnectionTable that refers to neurons by their interned number.
+        self.neurons = NeuronTable()
+        self._layer_index: dict[int, Layer] = {}
+        # CSR adjacency (offsets, positions) by start and by end neuron over the
+        # first `_indexed` explicit connections; later ones are appended to
+        # per-neuron buffers until there are enough of them to rebuild. The
+        # start positions are sorted by `start << 32 | end`, and `_edge_keys`
+        # holds those sorted keys for duplicate checks; `_pending_keys` holds
+        # the keys of the buffered connections only.
+        self._indexed = 0
+        self._edge_keys = np.empty(0, dtype=np.int64)
+        self._adjacency: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._pending: dict[str, dict[int, list[int]]] = {"start": {}, "end": {}}
+        self._pending_keys: set[int] = set()
+        self._blocks_by_end: dict[int, WeightBlock] = {}
+        self._blocks_by_start: dict[int, list[WeightBlock]] = defaultdict(list)
+        # Derived data such as layouts, with the fingerprint they were computed for
+        self._cache: dict[Any, tuple[str, Any]] = {}
+
+        layers, connections, weights = self.layers, self.connections, self.weights
+        self.layers, self.weights = [], []
+        self.connections = ConnectionTable(self.neurons)
+        for layer in layers:
+            self.add_layer(layer)
+        for block in weights:
+            self.add_weights(block)
+        for connection in connections:
+            self.add_connection(connection)
+
+    def to_json(self, precision: Optional[str] = None) -> str:
+        """Serializes the topology to JSON.
+
+        With `precision` ("float16" or "int8"), weight blocks are written
+        quantized to a "weights" section instead of as one connection per
+        edge; from_json dequantizes them.
+        """
+        return orjson.dumps(self._json_payload(precision), option=orjson.OPT_SERIALIZE_DATACLASS | orjson.OPT_INDENT_2, default=self._convert_numpy).decode()
+
+    @classmethod
+    def from_json(cls, json_data: str) -> "Topology":
+        """Deserializes a topology, folding dense runs of connections back into weight blocks."""
+        data = orjson.loads(json_data)
+        connections = data.pop("connections", None) or []
+        weights = data.pop("weights", None) or []
+        topology = cls._deserialize_data(cls, data)
+        topology._load_quantized_weights(weights)
+        topology._load_connections(connections)
+        return topology
+
+    def _load_quantized_weights(self, entries: list):
+        for entry in entries:
+            kernel = QuantizedArray.decode(entry["kernel"], entry["shape"], entry["quantization"]).dequantize()
+            mask = None
+            if entry.get("mask") is not None:
+                bits = np.frombuffer(base64.b64decode(entry["mask"]), dtype=np.uint8)
+                mask = np.unpackbits(bits, count=kernel.size).reshape(kernel.shape).astype(bool)
+            self.add_weights(WeightBlock(
+                start_layer=entry["start_layer"],
+                end_layer=entry["end_layer"],
+                kernel=kernel,
+                bias=np.asarray(entry["bias"], dtype=np.float32) if entry.get("bias") is not None else None,
+                mask=mask,
+            ))
+            if entry.get("kernel_rows"):
+                for unit, neuron in enumerate(self._layer_index[entry["end_layer"]].neurons):
+                    neuron.weight = kernel[unit]
+
+    def _load_connections(self, items: list):
+        columns = self._decode_columns(Connection, items)
+        if columns is None:
+            for connection in self._deserialize_many(Connection, items):
+                self.add_connection(connection)
+            return
+        explicit, blocks = self._fold_blocks(columns)
+        rows = zip(*columns.values())
+        for start, end, weight, bias in islice(rows, explicit):
+            self._add_edge(start, end, weight, bias)
+        for block in blocks:
+            self.add_weights(block)
+
+    def _fold_blocks(self, columns: dict[str, Any]) -> tuple[int, list[WeightBlock]]:
+        """Rebuilds weight blocks from the trailing runs of connections that form
+        complete, canonically ordered layer-to-layer kernels, as written by
+        to_json. Returns how many leading connections stay explicit, and the blocks."""
+        count = len(columns["start"])
+        weights, biases = columns["weight"], columns["bias"]
+        if not isinstance(weights, np.ndarray):
+            return count, []
+        if not isinstance(biases, np.ndarray):
+            # Missing biases become NaN so runs without bias can still be folded
+            try:
+                biases = np.array([np.nan if bias is None else bias for bias in biases], dtype=np.float32)
+            except (TypeError, ValueError):
+                return count, []
+
+        # Endpoints of no layer are not interned yet; they map to -1, which
+        # indexes the trailing -1 appended to the layer and unit tables, and
+        # only stop the runs they are part of from being folded
+        starts = self.neurons.numbers(columns["start"], missing=-1)
+        ends = self.neurons.numbers(columns["end"], missing=-1)
+        layer_of = np.append(np.frombuffer(self.neurons.layers, dtype=np.int64), -1)
+        unit_of = np.append(np.frombuffer(self.neurons.units, dtype=np.int64), -1)
+        start_layers, end_layers = layer_of[starts], layer_of[ends]
+
+        boundaries = np.flatnonzero((np.diff(start_layers) != 0) | (np.diff(end_layers) != 0)) + 1
+        runs = list(zip(np.r_[0, boundaries].tolist(), np.r_[boundaries, count].tolist()))
+        blocks = []
+        # Walk backwards so a run that cannot be folded ends the block suffix
+        for a, b in reversed(runs):
+            block = self._fold_run(a, b, start_layers, end_layers, starts, ends, unit_of, weights, biases)
+            if block is None or any(other.end_layer == block.end_layer for other in blocks):
+                return b, blocks[::-1]
+            blocks.append(block)
+        return 0, blocks[::-1]
+
+    def _fold_run(self, a, b, start_layers, end_layers, starts, ends, unit_of, weights, biases) -> Optional[WeightBlock]:
+        start_layer, end_layer = int(start_layers[a]), int(end_layers[a])
+        if start_layer == -1 or end_layer == -1 or end_layer in self._blocks_by_end:
+            return None
+        fan_in = len(self._layer_index[start_layer].neurons)
+        units = len(self._layer_index[end_layer].neurons)
+        if b - a != fan_in * units:
+            return None
+        if not (np.array_equal(unit_of[starts[a:b]], np.tile(np.arange(fan_in), units))
+                and np.array_equal(unit_of[ends[a:b]], np.repeat(np.arange(units), fan_in))):
+            return None
+        bias = None
+        bias_matrix = biases[a:b].reshape(units, fan_in)
+        missing = np.isnan(bias_matrix)
+        if missing.any():
+            if not missing.all():
+                return None
+        elif (bias_matrix == bias_matrix[:, :1]).all():
+            bias = bias_matrix[:, 0].copy()
+        else:
+            return None
+        kernel = np.ascontiguousarray(weights[a:b].reshape(units, fan_in).T)
+        return WeightBlock(start_layer=start_layer, end_layer=end_layer, kernel=kernel, bias=bias)
+
+    def save_binary(self, file_path: str, precision: Optional[str] = None):
+        """Writes the topology as a JSON header plus raw little-endian weight blocks.
+
+        With `precision` ("float16" or "int8") the kernels are stored quantized
+        and load_binary dequantizes them.
+        """
+        arrays = {}
+        blocks = []
+        quantized = {}
+        for position, block in enumerate(self.weights):
+            entry = {"start_layer": block.start_layer, "end_layer": block.end_layer,
+                     "kernel": f"kernel_{position}", "bias": None, "mask": None}
+            if precision is not None:
+                quantized[block.end_layer] = quantize(block.kernel, precision)
+                entry["quantization"] = quantized[block.end_layer].params()
+                arrays[entry["kernel"]] = quantized[block.end_layer].codes
+            else:
+                arrays[entry["kernel"]] = block.kernel
+            if block.bias is not None:
+                entry["bias"] = f"bias_{position}"
+                arrays[entry["bias"]] = block.bias
+            if block.mask is not None:
+                entry["mask"] = f"mask_{position}"
+                arrays[entry["mask"]] = block.mask
+            blocks.append(entry)
+        for name, column in self.connections.columns().items():
+            arrays[f"connection_{name}"] = column
+
+        layers = [{"layer": layer._json_payload(), "kernel_rows": kernel_rows}
+                  for layer, kernel_rows in self._kernel_row_layers()]
+        meta = {
+            "layers": layers,
+            "neuron_ids": self.neurons.ids,
+            "weights": blocks,
+            "metadata": self._quantization_metadata(precision, quantized),
+            "pyramid": self.pyramid,
+        }
+        write_container(file_path, meta, arrays, default=self._convert_numpy)
+
+    def _kernel_row_layers(self) -> list[tuple[Layer, bool]]:
+        """Returns each layer with a flag telling whether its neuron weights are
+        the rows of its weight block; those weights are left out of the copy
+        and restored from the block on load."""
+        layers = []
+        for layer in self.layers:
+            block = self._blocks_by_end.get(layer.index)
+            kernel_rows = block is not None and all(
+                isinstance(neuron.weight, np.ndarray) and unit < block.kernel.shape[0]
+                and np.array_equal(neuron.weight, block.kernel[unit])
+                for unit, neuron in enumerate(layer.neurons)
+            )
+            if kernel_rows:
+                layer = replace(layer, neurons=[replace(neuron, weight=None) for neuron in layer.neurons])
+            layers.append((layer, kernel_rows))
+        return layers
+
+    def _quantization_metadata(self, precision: Optional[str], quantized: dict[int, QuantizedArray]) -> dict:
+        """Returns the metadata to export, with the quantization error per layer when quantized."""
+        if precision is None:
+            return self.metadata
+        errors = {str(end_layer): array.max_error for end_layer, array in quantized.items()}
+        return {**self.metadata, "quantization": {
+            "precision": precision,
+            "max_error": max(errors.values(), default=0.0),
+            "layers": errors,
+        }}
+
+    @classmethod
+    def load_binary(cls, file_path: str, mmap_mode: str = "r") -> "Topology":
+        """Opens a topology written by save_binary; weight blocks are memory-mapped views."""
+        container = BinaryContainer(file_path, mmap_mode=mmap_mode)
+        meta = container.meta
+        weights = [
+            WeightBlock(
+                start_layer=entry["start_layer"],
+                end_layer=entry["end_layer"],
+                kernel=(QuantizedArray.from_params(container.array(entry["kernel"]), entry["quantization"]).dequantize()
+                        if entry.get("quantization") else container.array(entry["kernel"])),
+                bias=container.array(entry["bias"]) if entry["bias"] is not None else None,
+                mask=container.array(entry["mask"]) if entry.get("mask") is not None else None,
+            )
+            for entry in meta["weights"]
+        ]
+        kernels = {block.end_layer: block.kernel for block in weights}
+
+        layers = []
+        for entry in meta["layers"]:
+            layer = cls._deserialize_data(Layer, entry["layer"])
+            if entry["kernel_rows"]:
+                for unit, neuron in enumerate(layer.neurons):
+                    neuron.weight = kernels[layer.index][unit]
+            layers.append(layer)
+
+        pyramid = cls._deserialize_data(Pyramid, meta["pyramid"]) if meta.get("pyramid") else None
+        topology = cls(layers=layers, weights=weights, metadata=meta.get("metadata", {}), pyramid=pyramid)
+        ids = meta["neuron_ids"]
+        columns = [container.array(f"connection_{name}").tolist() for name in ("start", "end", "weight", "bias")]
+        for start, end, weight, bias in zip(*columns):
+            topology._add_edge(ids[start], ids[end], weight, None if bias != bias else bias)
+        return topology
 
     def add_layer(self, layer: Layer):
-        if layer in self.layers:
+        """Adds a layer and indexes its neurons; neurons must be appended beforehand."""
+        if layer.index in self._layer_index:
             raise ValueError("Layer already exists in layers")
+        self._layer_index[layer.index] = layer
+        for unit, neuron in enumerate(layer.neurons):
+            self.neurons.intern(neuron.id, layer.index, unit)
         self.layers.append(layer)
 
     def add_connection(self, connection: Connection):
-        if connection in self.connections:
+        self._add_edge(connection.start, connection.end, connection.weight, connection.bias)
+
+    def _add_edge(self, start_id: str, end_id: str, weight: float, bias: Optional[float]):
+        start = self.neurons.intern(start_id)
+        end = self.neurons.intern(end_id)
+        if self._edge_position(start, end) is not None or self._block_position(start, end) is not None:
             raise ValueError("Connection already exists in connections")
-        self.connections.append(connection)
\ No newline at end of file
+        position = self.connections.append(start, end, weight, bias)
+        self._pending_keys.add(start << 32 | end)
+        self._pending["start"].setdefault(start, []).append(position)
+        self._pending["end"].setdefault(end, []).append(position)
+        if position + 1 - self._indexed > max(ADJACENCY_SLACK, self._indexed // 8):
+            self._build_adjacency()
+
+    def add_weights(self, block: WeightBlock):
+        if block.end_layer in self._blocks_by_end:
+            raise ValueError("Weights already exist for layer")
+        self._blocks_by_end[block.end_layer] = block
+        if block.start_layer is not None:
+            self._blocks_by_start[block.start_layer].append(block)
+        self.weights.append(block)
+
+    def merkle(self) -> MerkleTree:
+        """Hash tree whose leaves are the roots of the layers and weight blocks,
+        followed by digests of the explicit connections and the metadata.
+
+        Hashes are not cached, because neurons and weight arrays can be edited
+        in place; each call costs one pass over all weights. The pyramid is
+        derived data and not part of it.
+        """
+        return self._merkle_parts()[0]
+
+    def _merkle_parts(self) -> tuple[MerkleTree, list[MerkleTree]]:
+        """Returns merkle() and the trees of the layers and weight blocks it was built from."""
+        parts = [layer.merkle() for layer in self.layers] + [block.merkle() for block in self.weights]
+        ids = self.neurons.ids
+        columns = self.connections.columns()
+        endpoints = "\0".join(f"{ids[start]}>{ids[end]}" for start, end in
+                               zip(columns["start"].tolist(), columns["end"].tolist()))
+        leaves = [part.root for part in parts]
+        leaves += [_digest(endpoints.encode(), columns["weight"], columns["bias"]), _digest(self.metadata)]
+        return MerkleTree(leaves), parts
+
+    def fingerprint(self) -> str:
+        """Hex digest that is equal for topologies with equal content.
+
+        Weight blocks fed from outside the topology count, although to_json
+        does not write them; compare documents, not fingerprints, to check a
+        JSON round trip.
+        """
+        return self.merkle().root.hex()
+
+    def structure_fingerprint(self) -> str:
+        """Hex digest of the layers, neuron ids and weight block shapes, ignoring all values."""
+        digest = hashlib.blake2b(digest_size=16)
+        for layer in self.layers:
+            digest.update(f"L{layer.index}:{len(layer.neurons)};".encode())
+            digest.update("\0".join(neuron.id for neuron in layer.neurons).encode())
+        for block in self.weights:
+            digest.update(f"W{block.start_layer}>{block.end_layer}:{tuple(block.kernel.shape)};".encode())
+        return digest.hexdigest()
+
+    def cached(self, key: Any, fingerprint: str, compute: Callable[[], Any]) -> Any:
+        """Returns the derived data stored under `key` for `fingerprint`, computing and storing it if missing.
+
+        `fingerprint` identifies what the data depends on, e.g. fingerprint()
+        or structure_fingerprint(); data stored for another one is replaced.
+        """
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] == fingerprint:
+            return entry[1]
+        value = compute()
+        self._cache[key] = (fingerprint, value)
+        return value
+
+    def differences(self, other: "Topology") -> list[str]:
+        """Locates where two topologies differ, descending only into parts whose hashes differ.
+
+        Returns paths such as "layers[1].neurons[3]", "weights[0].kernel[12]"
+        or "connections".
+        """
+        (mine, my_parts), (theirs, their_parts) = self._merkle_parts(), other._merkle_parts()
+        if mine.root == theirs.root:
+            return []
+        if len(self.layers) != len(other.layers) or len(self.weights) != len(other.weights):
+            return ["layers" if len(self.layers) != len(other.layers) else "weights"]
+
+        paths = []
+        layer_count, block_count = len(self.layers), len(self.weights)
+        for position in mine.differences(theirs):
+            if position < layer_count:
+                for leaf in my_parts[position].differences(their_parts[position]):
+                    paths.append(f"layers[{position}]" + ("" if leaf == 0 else f".neurons[{leaf - 1}]"))
+            elif position < layer_count + block_count:
+                block = self.weights[position - layer_count]
+                for leaf in my_parts[position].differences(their_parts[position]):
+                    paths.append(f"weights[{position - layer_count}].{block.describe_leaf(leaf)}")
+            else:
+                paths.append("connections" if position == layer_count + block_count else "metadata")
+        return paths
+
+    def get_layer(self, index: int) -> Optional[Layer]:
+        """Returns the layer with the given model index, if present."""
+        return self._layer_index.get(index)
+
+    def get_weights(self, index: int) -> Optional[WeightBlock]:
+        """Returns the weight block feeding the layer with the given model index."""
+        return self._blocks_by_end.get(index)
+
+    def has_connection(self, start: str, end: str) -> bool:
+        return self.get_connection(start, end) is not None
+
+    def get_connection(self, start: str, end: str) -> Optional[Connection]:
+        """Returns the connection between two neurons, if present."""
+        start_number, end_number = self.neurons.number(start), self.neurons.number(end)
+        if start_number is None or end_number is None:
+            return None
+        position = self._edge_position(start_number, end_number)
+        if position is not None:
+            return self.connections[position]
+        block_position = self._block_position(start_number, end_number)
+        if block_position is None:
+            return None
+        block, i, j = block_position
+        return self._block_connection(block, i, j)
+
+    def incoming(self, neuron_id: str) -> list[Connection]:
+        """Returns all connections ending in the given neuron."""
+        number = self.neurons.number(neuron_id)
+        if number is None:
+            return []
+        result = [self.connections[p] for p in self._adjacent_positions("end", number)]
+        location = self.neurons.location(number)
+        if location is None:
+            return result
+        layer_index, j = location
+        block = self._blocks_by_end.get(layer_index)
+        if block is not None and block.start_layer in self._layer_index:
+            rows = np.arange(min(block.kernel.shape[0], len(self._layer_index[block.start_layer].neurons)))
+            if block.mask is not None:
+                rows = rows[block.mask[rows, j]]
+            result.extend(self._block_connection(block, i, j) for i in rows.tolist())
+        return result
+
+    def outgoing(self, neuron_id: str) -> list[Connection]:
+        """Returns all connections starting in the given neuron."""
+        number = self.neurons.number(neuron_id)
+        if number is None:
+            return []
+        result = [self.connections[p] for p in self._adjacent_positions("start", number)]
+        location = self.neurons.location(number)
+        if location is None:
+            return result
+        layer_index, i = location
+        for block in self._blocks_by_start.get(layer_index, ()):
+            end_layer = self._layer_index.get(block.end_layer)
+            if end_layer is None or i >= block.kernel.shape[0]:
+                continue
+            columns = np.arange(min(block.kernel.shape[1], len(end_layer.neurons)))
+            if block.mask is not None:
+                columns = columns[block.mask[i, columns]]
+            result.extend(self._block_connection(block, i, j) for j in columns.tolist())
+        return result
+
+    def _adjacent_positions(self, column: str, number: int) -> list[int]:
+        """Positions of explicit connections whose `column` endpoint is the given neuron.
+
+        A lookup reads the neuron's CSR slice and its buffer, so it costs
+        O(degree). The CSR index is rebuilt in O(n log n) once the buffered
+        connections outnumber an eighth of the indexed ones, which makes an
+        insert cost amortized O(log n).
+        """
+        positions = self._pending[column].get(number, [])
+        if column not in self._adjacency:
+            return list(positions)
+        offsets, order = self._adjacency[column]
+        indexed = order[offsets[number]:offsets[number + 1]].tolist() if number + 1 < len(offsets) else []
+        return indexed + positions
+
+    def _edge_position(self, start: int, end: int) -> Optional[int]:
+        """Position of the explicit connection between two neuron numbers, if any."""
+        key = start << 32 | end
+        if key in self._pending_keys:
+            ends = self.connections.columns()["end"]
+            return next(position for position in self._pending["start"][start] if ends[position] == end)
+        index = self._edge_keys.searchsorted(key)
+        if index < len(self._edge_keys) and self._edge_keys[index] == key:
+            return int(self._adjacency["start"][1][index])
+        return None
+
+    def _build_adjacency(self):
+        """Indexes every explicit connection in the CSR arrays and empties the buffers."""
+        columns = self.connections.columns()
+        starts, ends = columns["start"], columns["end"]
+        bounds = np.arange(len(self.neurons) + 1)
+        keys = starts.astype(np.int64) << 32 | ends
+        # Sorting by key also sorts by start, so one order serves both lookups
+        order = np.argsort(keys).astype(np.int32)
+        self._edge_keys = keys[order]
+        self._adjacency["start"] = (np.searchsorted(starts[order], bounds), order)
+        order = np.argsort(ends, kind="stable").astype(np.int32)
+        self._adjacency["end"] = (np.searchsorted(ends[order], bounds), order)
+        self._indexed = len(keys)
+        self._pending = {"start": {}, "end": {}}
+        self._pending_keys = set()
+
+    def _block_position(self, start: int, end: int) -> Optional[tuple[WeightBlock, int, int]]:
+        """Locates the weight block entry backing the edge between two neuron numbers."""
+        start_location = self.neurons.location(start)
+        end_location = self.neurons.location(end)
+        if start_location is None or end_location is None:
+            return None
+        block = self._blocks_by_end.get(end_location[0])
+        if block is None or block.start_layer != start_location[0]:
+            return None
+        i, j = start_location[1], end_location[1]
+        if i >= block.kernel.shape[0] or j >= block.kernel.shape[1]:
+            return None
+        if block.mask is not None and not block.mask[i, j]:
+            return None
+        return block, i, j
+
+    def _block_connection(self, block: WeightBlock, i: int, j: int) -> Connection:
+        return Connection(
+            start=self._layer_index[block.start_layer].neurons[i].id,
+            end=self._layer_index[block.end_layer].neurons[j].id,
+            weight=float(block.kernel[i, j]),
+            bias=float(block.bias[j]) if block.bias is not None else None,
+        )
+
+    def iter_connections(self) -> Iterator[Connection]:
+        """Yields explicit connections followed by views over the weight blocks."""
+        yield from self.connections
+        for block in self.weights:
+            yield from self._block_connections(block)
+
+    def _block_connections(self, block: WeightBlock) -> Iterator[Connection]:
+        if block.start_layer is None:
+            return
+        start_layer = self.get_layer(block.start_layer)
+        end_layer = self.get_layer(block.end_layer)
+        if start_layer is None or end_layer is None:
+            return
+        starts = start_layer.neurons
+        for j, end in enumerate(end_layer.neurons):
+            bias = float(block.bias[j]) if block.bias is not None else None
+            if block.mask is None:
+                for start, weight in zip(starts, block.kernel[:, j].tolist()):
+                    yield Connection(start=start.id, end=end.id, weight=weight, bias=bias)
+                continue
+            rows = np.flatnonzero(block.mask[:len(starts), j])
+            for i, weight in zip(rows.tolist(), block.kernel[rows, j].tolist()):
+                yield Connection(start=starts[i].id, end=end.id, weight=weight, bias=bias)
+
+    def _json_document(self, precision: Optional[str] = None) -> dict:
+        """Builds the JSON document with Layer objects and connections as a lazy iterator.
+
+        Quantized documents list only the explicit connections and carry the
+        weight blocks in a "weights" section.
+        """
+        if precision is None:
+            layers, weights, metadata = self.layers, None, self.metadata
+            connections = self.iter_connections()
+        else:
+            layers, weights, metadata = self._quantized_weights(precision)
+            connections = iter(self.connections)
+        document = {"metadata": metadata} if metadata else {}
+        document["layers"] = layers
+        document["connections"] = connections
+        if weights is not None:
+            document["weights"] = weights
+        if self.pyramid is not None:
+            document["pyramid"] = self.pyramid
+        return document
+
+    def _quantized_weights(self, precision: str) -> tuple[list[Layer], list[dict], dict]:
+        layers, weights, quantized = [], [], {}
+        kernel_rows = {}
+        for layer, rows in self._kernel_row_layers():
+            layers.append(layer)
+            kernel_rows[layer.index] = rows
+        for block in self.weights:
+            quantized[block.end_layer] = quantize(block.kernel, precision)
+            weights.append({
+                "start_layer": block.start_layer,
+                "end_layer": block.end_layer,
+                "shape": list(block.kernel.shape),
+                "quantization": quantized[block.end_layer].params(),
+                "kernel": quantized[block.end_layer].encode(),
+                "bias": block.bias,
+                "mask": base64.b64encode(np.packbits(block.mask)).decode() if block.mask is not None else None,
+                "kernel_rows": kernel_rows.get(block.end_layer, False),
+            })
+        return layers, weights, self._quantization_metadata(precision, quantized)
+
+    def _json_payload(self, precision: Optional[str] = None) -> dict:
+        document = self._json_document(precision)
+        document["layers"] = [layer._json_payload() for layer in document["layers"]]
+        document["connections"] = list(document["connections"])
+        return document
+
+    def write_json(self, target: Any, compact: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   precision: Optional[str] = None):
+        """Streams the JSON document to a file-like object or socket.
+
+        Neurons and connections are encoded in batches of about `chunk_size`
+        bytes as they are produced, so peak memory does not grow with the size
+        of the layers or the number of edges. The indented output is identical
+        to to_json(precision=precision).
+        """
+        writer = JsonStreamWriter(target, chunk_size=chunk_size)
+        document = self._json_document(precision)
+        document["layers"] = (layer._json_stream() for layer in document["layers"])
+        write_json_document(writer, document, compact=compact, default=self._convert_numpy)
@@ -0,0 +1,76 @@
+import base64
+import numpy as np
+from dataclasses import dataclass
+from typing import Any
+
+PRECISIONS = ("float16", "int8")
+CODE_DTYPES = {"float16": np.dtype("<f2"), "int8": np.dtype("i1")}
+
+
+@dataclass
+class QuantizedArray:
+    """Reduced-precision copy of a float array.
+
+    float16 stores the values themselves. int8 uses an affine mapping,
+    value = (code - zero_point) * scale, over the range of the array
+    (widened to include 0, so zeros stay exact). `max_error` is the largest
+    absolute difference between the original values and what dequantize()
+    returns.
+    """
+    precision: str
+    codes: np.ndarray
+    scale: float = 1.0
+    zero_point: int = 0
+    max_error: float = 0.0
+
+    def dequantize(self, dtype: Any = np.float32) -> np.ndarray:
+        if self.precision == "float16":
+            return self.codes.astype(dtype)
+        values = (self.codes.astype(np.float32) - np.float32(self.zero_point)) * np.float32(self.scale)
+        return values.astype(dtype, copy=False)
+
+    def params(self) -> dict:
+        """Everything but the codes, as stored next to them."""
+        return {"precision": self.precision, "scale": self.scale,
+                "zero_point": self.zero_point, "max_error": self.max_error}
+
+    def encode(self) -> str:
+        """The codes as base64 of their little-endian bytes."""
+        return base64.b64encode(np.ascontiguousarray(self.codes).tobytes()).decode()
+
+    @classmethod
+    def from_params(cls, codes: np.ndarray, params: dict) -> "QuantizedArray":
+        """Rebuilds a quantized array from stored codes and params()."""
+        return cls(precision=params["precision"], codes=np.asarray(codes, dtype=CODE_DTYPES[params["precision"]]),
+                   scale=params["scale"], zero_point=params["zero_point"], max_error=params["max_error"])
+
+    @classmethod
+    def decode(cls, text: str, shape: list[int], params: dict) -> "QuantizedArray":
+        codes = np.frombuffer(base64.b64decode(text), dtype=CODE_DTYPES[params["precision"]])
+        return cls.from_params(codes.reshape(shape), params)
+
+
+def quantize(array: np.ndarray, precision: str) -> QuantizedArray:
+    """Quantizes a float array to float16 or to int8 with a scale and zero point."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+    array = np.asarray(array)
+    if not np.isfinite(array).all():
+        raise ValueError("Only finite values can be quantized")
+
+    if precision == "float16":
+        if array.size and np.abs(array).max() > np.finfo(np.float16).max:
+            raise ValueError("Values exceed the float16 range")
+        quantized = QuantizedArray(precision=precision, codes=array.astype(np.float16))
+    else:
+        low = min(float(array.min()), 0.0) if array.size else 0.0
+        high = max(float(array.max()), 0.0) if array.size else 0.0
+        scale = (high - low) / 255 or 1.0
+        zero_point = int(np.clip(round(-128 - low / scale), -128, 127))
+        codes = np.clip(np.rint(array / scale) + zero_point, -128, 127).astype(np.int8)
+        quantized = QuantizedArray(precision=precision, codes=codes, scale=scale, zero_point=zero_point)
+
+    if array.size:
+        error = np.abs(quantized.dequantize(np.float64) - array.astype(np.float64))
+        quantized.max_error = float(error.max())
+    return quantized
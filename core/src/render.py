@@ -0,0 +1,145 @@
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.src.layout import Layout, get_layout
+from core.src.models import Topology
+
+DECIMATION = ("magnitude", "random")
+
+
+@dataclass
+class EdgeTrace:
+    """All edges whose weight falls into one colour bin.
+
+    `x` and `y` hold three entries per edge: start, end and a NaN separator,
+    which Plotly treats like None and leaves as a gap.
+    """
+    x: np.ndarray
+    y: np.ndarray
+    color: str
+    low: float
+    high: float
+    count: int
+
+
+@dataclass
+class Traces:
+    node_x: np.ndarray
+    node_y: np.ndarray
+    node_ids: list[str]
+    edges: list[EdgeTrace] = field(default_factory=lambda: [])
+    edges_total: int = 0
+
+    def to_plotly(self, node_size: int = 4, edge_width: float = 0.5) -> list:
+        """Returns Scattergl traces: one per colour bin plus one for the nodes."""
+        import plotly.graph_objects as go
+
+        traces = [
+            go.Scattergl(x=edge.x, y=edge.y, mode="lines", hoverinfo="skip", showlegend=False,
+                         line=dict(color=edge.color, width=edge_width),
+                         name=f"{edge.low:.3g} .. {edge.high:.3g}")
+            for edge in self.edges
+        ]
+        traces.append(go.Scattergl(x=self.node_x, y=self.node_y, mode="markers", text=self.node_ids,
+                                   hoverinfo="text", showlegend=False, marker=dict(size=node_size)))
+        return traces
+
+
+def build_traces(topology: Topology, layout: Optional[Layout] = None, bins: int = 8,
+                 max_edges: Optional[int] = None, decimate: str = "magnitude", seed: int = 0) -> Traces:
+    """Turns a topology into a few flat coordinate arrays, grouped by weight bin.
+
+    Edges come straight from the weight blocks (respecting their masks) and
+    the explicit connection table. Blocks fed from outside the topology, such
+    as the one after a Flatten input, have no start nodes and are not drawn,
+    just as to_json does not write them. With `max_edges`, only that many
+    edges are drawn: the largest by |weight|, or a seeded random sample.
+    """
+    if decimate not in DECIMATION:
+        raise ValueError(f"Unknown decimation '{decimate}', expected one of {DECIMATION}")
+    if layout is None:
+        layout = get_layout(topology)
+
+    starts, ends, weights = _collect_edges(topology, layout)
+    edges_total = len(weights)
+    if max_edges is not None and edges_total > max_edges:
+        if decimate == "magnitude":
+            keep = np.argpartition(np.abs(weights), edges_total - max_edges)[edges_total - max_edges:]
+        else:
+            keep = np.random.default_rng(seed).choice(edges_total, size=max_edges, replace=False)
+        keep.sort()
+        starts, ends, weights = starts[keep], ends[keep], weights[keep]
+
+    traces = Traces(node_x=layout.x, node_y=layout.y, node_ids=layout.ids, edges_total=edges_total)
+    if not len(weights):
+        return traces
+
+    limit = float(np.abs(weights).max()) or 1.0
+    edges = np.linspace(-limit, limit, bins + 1)
+    assignment = np.clip(np.searchsorted(edges, weights, side="right") - 1, 0, bins - 1)
+    order = np.argsort(assignment, kind="stable")
+    boundaries = np.searchsorted(assignment[order], np.arange(bins + 1))
+    for b in range(bins):
+        selected = order[boundaries[b]:boundaries[b + 1]]
+        if not len(selected):
+            continue
+        traces.edges.append(EdgeTrace(
+            x=_segments(layout.x[starts[selected]], layout.x[ends[selected]]),
+            y=_segments(layout.y[starts[selected]], layout.y[ends[selected]]),
+            color=_diverging_color((edges[b] + edges[b + 1]) / 2 / limit),
+            low=float(edges[b]),
+            high=float(edges[b + 1]),
+            count=len(selected),
+        ))
+    return traces
+
+
+def _collect_edges(topology: Topology, layout: Layout) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns layout positions of edge endpoints and the edge weights."""
+    offsets = {layer.index: int(offset) for layer, offset in zip(topology.layers, layout.offsets)}
+    sizes = {layer.index: len(layer.neurons) for layer in topology.layers}
+    starts, ends, weights = [], [], []
+    for block in topology.weights:
+        if block.start_layer not in offsets or block.end_layer not in offsets:
+            continue
+        rows, columns = sizes[block.start_layer], sizes[block.end_layer]
+        kernel = np.asarray(block.kernel[:rows, :columns])
+        if not kernel.size:
+            continue
+        if block.mask is not None:
+            i, j = np.nonzero(block.mask[:rows, :columns])
+        else:
+            i, j = np.divmod(np.arange(kernel.size), columns)
+        starts.append(i + offsets[block.start_layer])
+        ends.append(j + offsets[block.end_layer])
+        weights.append(kernel[i, j].astype(np.float64))
+
+    if len(topology.connections):
+        positions = {neuron_id: position for position, neuron_id in enumerate(layout.ids)}
+        lookup = np.array([positions.get(neuron_id, -1) for neuron_id in topology.neurons.ids], dtype=np.int64)
+        columns = topology.connections.columns()
+        start, end = lookup[columns["start"]], lookup[columns["end"]]
+        placed = (start >= 0) & (end >= 0)
+        starts.append(start[placed])
+        ends.append(end[placed])
+        weights.append(columns["weight"][placed].astype(np.float64))
+
+    if not weights:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    return np.concatenate(starts), np.concatenate(ends), np.concatenate(weights)
+
+
+def _segments(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    coordinates = np.full(3 * len(start), np.nan)
+    coordinates[0::3] = start
+    coordinates[1::3] = end
+    return coordinates
+
+
+def _diverging_color(value: float) -> str:
+    """Maps -1..1 to blue..light grey..red."""
+    value = min(max(value, -1.0), 1.0)
+    base, target = np.array([220, 220, 220]), np.array([178, 24, 43] if value >= 0 else [33, 102, 172])
+    red, green, blue = (base + (target - base) * abs(value)).round().astype(int)
+    return f"rgb({red},{green},{blue})"
@@ -0,0 +1,67 @@
+import numpy as np
+from typing import Optional
+
+STRATEGIES = ("topk", "per_neuron_topk", "threshold", "sample")
+
+
+def select_edges(kernels: list[np.ndarray], strategy: str = "topk", budget: Optional[int] = None,
+                 threshold: Optional[float] = None, seed: int = 0) -> list[np.ndarray]:
+    """Returns one boolean keep-mask per kernel.
+
+    - `topk`: the `budget` edges with the largest |weight| over all kernels.
+    - `per_neuron_topk`: the same number of largest |weight| inputs for every
+      target neuron, chosen so the total stays within `budget`.
+    - `threshold`: every edge with |weight| >= `threshold`.
+    - `sample`: a seeded uniform sample, stratified per target neuron.
+
+    Apart from `threshold`, at most `budget` edges are kept; when the budget
+    is smaller than the number of target neurons, some neurons keep none.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown sparsification strategy '{strategy}', expected one of {STRATEGIES}")
+    if strategy == "threshold":
+        if threshold is None:
+            raise ValueError("The threshold strategy requires a threshold")
+        return [np.abs(kernel) >= threshold for kernel in kernels]
+    if budget is None:
+        raise ValueError(f"The {strategy} strategy requires an edge budget")
+
+    total = sum(kernel.size for kernel in kernels)
+    if budget >= total:
+        return [np.ones(kernel.shape, dtype=bool) for kernel in kernels]
+    if strategy == "topk":
+        return _global_topk([np.abs(kernel) for kernel in kernels], budget)
+    units = sum(kernel.shape[1] for kernel in kernels)
+    per_neuron = max(budget // units, 1) if units else 0
+    if strategy == "per_neuron_topk":
+        scores = [np.abs(kernel) for kernel in kernels]
+    else:
+        rng = np.random.default_rng(seed)
+        scores = [rng.random(kernel.shape, dtype=np.float32) for kernel in kernels]
+    masks = [_column_topk(score, per_neuron) for score in scores]
+    if sum(int(np.count_nonzero(mask)) for mask in masks) <= budget:
+        return masks
+    # One edge per neuron is already over budget: keep the best scoring of those
+    return _global_topk([np.where(mask, score, -np.inf) for mask, score in zip(masks, scores)], budget)
+
+
+def _global_topk(scores: list[np.ndarray], budget: int) -> list[np.ndarray]:
+    """Keeps the `budget` highest scores over all arrays."""
+    flat = np.concatenate([score.ravel() for score in scores])
+    keep = np.zeros(flat.size, dtype=bool)
+    if budget > 0:
+        keep[np.argpartition(flat, flat.size - budget)[-budget:]] = True
+    offsets = np.cumsum([0] + [score.size for score in scores])
+    return [keep[offsets[i]:offsets[i + 1]].reshape(score.shape) for i, score in enumerate(scores)]
+
+
+def _column_topk(scores: np.ndarray, k: int) -> np.ndarray:
+    """Keeps the `k` highest scoring rows in every column."""
+    rows = scores.shape[0]
+    if k >= rows:
+        return np.ones(scores.shape, dtype=bool)
+    mask = np.zeros(scores.shape, dtype=bool)
+    if k > 0:
+        top = np.argpartition(scores, rows - k, axis=0)[rows - k:]
+        np.put_along_axis(mask, top, True, axis=0)
+    return mask
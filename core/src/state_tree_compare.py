@@ -0,0 +1,218 @@
+import threading
+import numpy as np
+import tensorflow as tf
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+# Elements compared per task; large tensors are split into several tasks
+DEFAULT_CHUNK_ELEMENTS = 1 << 20
+
+
+@dataclass
+class VariableDiff:
+    """Result of comparing one leaf of two state trees.
+
+    `status` is "equal", "values" (elements outside the tolerance), "dtype",
+    "shape", "name", "type", "missing" (only in the second tree) or
+    "unexpected" (only in the first tree). `worst_indices` holds the
+    positions of the largest absolute errors among the mismatching elements.
+    """
+    path: str
+    status: str
+    size: int = 0
+    mismatches: int = 0
+    max_abs_error: float = 0.0
+    max_rel_error: float = 0.0
+    worst_indices: list[tuple[int, ...]] = field(default_factory=lambda: [])
+    detail: Optional[str] = None
+
+    @property
+    def equal(self) -> bool:
+        return self.status == "equal"
+
+    def describe(self) -> str:
+        if self.status == "values" and not self.worst_indices:
+            return f"{self.path}: {self.detail}"
+        if self.status == "values":
+            return (f"{self.path}: {self.mismatches}/{self.size} elements differ, "
+                    f"max abs error {self.max_abs_error:.3g}, max rel error {self.max_rel_error:.3g}, "
+                    f"worst at {self.worst_indices}")
+        return f"{self.path}: {self.status}" + (f" ({self.detail})" if self.detail else "")
+
+
+@dataclass
+class ComparisonReport:
+    variables: list[VariableDiff] = field(default_factory=lambda: [])
+    # False when an early exit left some variables unchecked
+    complete: bool = True
+
+    @property
+    def equal(self) -> bool:
+        return all(variable.equal for variable in self.variables)
+
+    @property
+    def differences(self) -> list[VariableDiff]:
+        return [variable for variable in self.variables if not variable.equal]
+
+    def summary(self) -> str:
+        differences = self.differences
+        lines = [f"{len(self.variables) - len(differences)}/{len(self.variables)} variables match"
+                 + ("" if self.complete else " (stopped at the first difference)")]
+        lines.extend(variable.describe() for variable in differences)
+        return "\n".join(lines)
+
+
+@dataclass
+class _ChunkResult:
+    mismatches: int
+    max_abs_error: float
+    max_rel_error: float
+    # Flat indices and absolute errors of the worst mismatching elements
+    worst: np.ndarray
+    errors: np.ndarray
+
+
+def compare_state_tree_report(tree1, tree2, rtol: float = 1e-05, atol: float = 1e-08, equal_nan: bool = False,
+                              early_exit: bool = False, workers: Optional[int] = None,
+                              chunk_elements: int = DEFAULT_CHUNK_ELEMENTS, top_k: int = 5) -> ComparisonReport:
+    """Compares two state trees leaf by leaf and reports every difference.
+
+    Tensors are compared with the np.allclose criterion
+    (|a - b| <= atol + rtol * |b|), in chunks of `chunk_elements` elements
+    spread over a thread pool. With `early_exit`, pending chunks are
+    abandoned as soon as one difference is found.
+    """
+    leaves1 = dict(_leaves(tree1))
+    leaves2 = dict(_leaves(tree2))
+    results = {}
+    arrays = {}
+    for path in list(leaves1) + [path for path in leaves2 if path not in leaves1]:
+        if path not in leaves2:
+            results[path] = VariableDiff(path=path, status="unexpected")
+        elif path not in leaves1:
+            results[path] = VariableDiff(path=path, status="missing")
+        else:
+            diff = _compare_header(path, leaves1[path], leaves2[path])
+            if diff is not None:
+                results[path] = diff
+            else:
+                arrays[path] = (_as_array(leaves1[path]).reshape(-1), _as_array(leaves2[path]).reshape(-1))
+                results[path] = VariableDiff(path=path, status="equal", size=arrays[path][0].size)
+
+    stop = threading.Event()
+    if early_exit and any(not diff.equal for diff in results.values()):
+        stop.set()
+
+    def compare_chunk(a, b, start):
+        if stop.is_set():
+            return None
+        result = _compare_chunk(a, b, start, rtol, atol, equal_nan, top_k)
+        if early_exit and result.mismatches:
+            stop.set()
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            path: [executor.submit(compare_chunk, a[start:start + chunk_elements], b[start:start + chunk_elements], start)
+                   for start in range(0, a.size, chunk_elements)]
+            for path, (a, b) in arrays.items()
+        }
+        report = ComparisonReport()
+        for path, diff in results.items():
+            if path in futures:
+                chunks = [future.result() for future in futures[path]]
+                if any(chunk is None for chunk in chunks):
+                    report.complete = False
+                    # Keep partially checked variables only if they already differ
+                    chunks = [chunk for chunk in chunks if chunk is not None]
+                    if not any(chunk.mismatches for chunk in chunks):
+                        continue
+                _merge_chunks(diff, chunks, leaves1[path], top_k)
+            report.variables.append(diff)
+    return report
+
+
+def _leaves(tree, path=""):
+    if isinstance(tree, dict) and tree:
+        for key, value in tree.items():
+            yield from _leaves(value, f"{path}/{key}" if path else str(key))
+    elif isinstance(tree, (list, tuple)) and tree:
+        for index, value in enumerate(tree):
+            yield from _leaves(value, f"{path}/{index}" if path else str(index))
+    else:
+        yield path, tree
+
+
+def _is_tensor(value) -> bool:
+    return isinstance(value, (tf.Variable, np.ndarray))
+
+
+def _as_array(value) -> np.ndarray:
+    return value.numpy() if isinstance(value, tf.Variable) else value
+
+
+def _compare_header(path: str, value1: Any, value2: Any) -> Optional[VariableDiff]:
+    """Checks everything but the tensor contents; returns None when those still need comparing."""
+    kind1 = isinstance(value1, tf.Variable), isinstance(value1, np.ndarray)
+    kind2 = isinstance(value2, tf.Variable), isinstance(value2, np.ndarray)
+    if kind1 != kind2:
+        return VariableDiff(path=path, status="type", detail=f"{type(value1).__name__} != {type(value2).__name__}")
+    if not _is_tensor(value1):
+        if value1 != value2:
+            return VariableDiff(path=path, status="values", size=1, mismatches=1, detail=f"{value1!r} != {value2!r}")
+        return VariableDiff(path=path, status="equal", size=1)
+    if value1.dtype != value2.dtype:
+        return VariableDiff(path=path, status="dtype", detail=f"{value1.dtype} != {value2.dtype}")
+    if tuple(value1.shape) != tuple(value2.shape):
+        return VariableDiff(path=path, status="shape", detail=f"{tuple(value1.shape)} != {tuple(value2.shape)}")
+    if isinstance(value1, tf.Variable) and value1.name.split(":")[0] != value2.name.split(":")[0]:
+        return VariableDiff(path=path, status="name", detail=f"{value1.name} != {value2.name}")
+    return None
+
+
+def _compare_chunk(a: np.ndarray, b: np.ndarray, start: int, rtol: float, atol: float,
+                   equal_nan: bool, top_k: int) -> _ChunkResult:
+    if a.dtype.kind in "biu":
+        a, b = a.astype(np.float64), b.astype(np.float64)
+    with np.errstate(invalid="ignore", over="ignore"):
+        # As in np.isclose, equal values (including infinities of the same sign,
+        # whose difference is NaN) have no error, and the tolerance only
+        # applies between finite values
+        exact = a == b
+        errors = np.where(exact, 0.0, np.abs(a - b))
+        scale = np.abs(b)
+        mismatch = ~(exact | (np.isfinite(a) & np.isfinite(b) & (errors <= atol + rtol * scale)))
+        if equal_nan:
+            mismatch &= ~(np.isnan(a) & np.isnan(b))
+        # fmax skips NaNs, which are counted as mismatches but have no error size
+        max_abs_error = np.fmax.reduce(errors) if errors.size else 0.0
+        relative = np.divide(errors, scale, out=np.zeros_like(errors), where=scale > 0)
+        max_rel_error = np.fmax.reduce(relative) if relative.size else 0.0
+
+    candidates = np.flatnonzero(mismatch)
+    if len(candidates) > top_k:
+        # NaN errors sort as the largest
+        keyed = np.nan_to_num(errors[candidates], nan=np.inf)
+        candidates = candidates[np.argpartition(keyed, len(candidates) - top_k)[len(candidates) - top_k:]]
+    return _ChunkResult(
+        mismatches=int(np.count_nonzero(mismatch)),
+        max_abs_error=float(np.nan_to_num(max_abs_error)),
+        max_rel_error=float(np.nan_to_num(max_rel_error)),
+        worst=candidates + start,
+        errors=np.nan_to_num(errors[candidates], nan=np.inf),
+    )
+
+
+def _merge_chunks(diff: VariableDiff, chunks: list[_ChunkResult], value, top_k: int):
+    diff.mismatches = sum(chunk.mismatches for chunk in chunks)
+    diff.max_abs_error = max((chunk.max_abs_error for chunk in chunks), default=0.0)
+    diff.max_rel_error = max((chunk.max_rel_error for chunk in chunks), default=0.0)
+    if not diff.mismatches:
+        return
+    diff.status = "values"
+    worst = np.concatenate([chunk.worst for chunk in chunks])
+    errors = np.concatenate([chunk.errors for chunk in chunks])
+    worst = worst[np.argsort(-errors, kind="stable")[:top_k]]
+    shape = tuple(value.shape)
+    diff.worst_indices = [tuple(int(i) for i in np.unravel_index(index, shape)) for index in worst]
@@ -2,14 +2,25 @@ import json
 import tensorflow as tf
 import numpy as np
 
-def serialize_variable(obj):
+from core.src.binary_container import BinaryContainer, write_container
+from core.src.compression import open_stream
+from core.src.json_stream import DEFAULT_CHUNK_SIZE, JsonStreamWriter
+from core.src.quantization import QuantizedArray, quantize
+from core.src.state_tree_compare import compare_state_tree_report
+
+def serialize_variable(obj, precision=None):
+    """Converts a variable into JSON-ready data.
+
+    With `precision` ("float16" or "int8"), float arrays are stored as base64
+    codes plus the "quantization" parameters needed to restore them.
+    """
     if isinstance(obj, tf.Variable):
         return {
             "__type__": "tf.Variable",
             "name": obj.name,
             "dtype": str(obj.dtype.name),
             "shape": obj.shape.as_list(),
-            "data": serialize_variable(obj.numpy())
+            "data": serialize_variable(obj.numpy(), precision)
         }
     elif isinstance(obj, (np.floating, np.float32, np.float64)):
         return {
@@ -17,6 +28,15 @@ def serialize_variable(obj):
             "dtype": str(obj.dtype),
             "data": float(obj)
         }
+    elif isinstance(obj, np.ndarray) and precision is not None and obj.dtype.kind == "f" and obj.size:
+        quantized = quantize(obj, precision)
+        return {
+            "__type__": "ndarray",
+            "dtype": str(obj.dtype),
+            "shape": obj.shape,
+            "quantization": quantized.params(),
+            "data": quantized.encode()
+        }
     elif isinstance(obj, np.ndarray):
         return {
             "__type__": "ndarray",
@@ -68,6 +88,9 @@ def deserialize_variable(data):
         
         elif obj_type == "ndarray":
             dtype = np.dtype(data["dtype"])
+            if "quantization" in data:
+                quantized = QuantizedArray.decode(data["data"], data["shape"], data["quantization"])
+                return quantized.dequantize(dtype)
             return np.array(data["data"], dtype=dtype).reshape(data["shape"])
         
         elif obj_type == "np.integer":
@@ -90,59 +113,181 @@ def deserialize_variable(data):
         return data
 
 
-def serialize_state_tree(state_tree):
+def serialize_state_tree(state_tree, precision=None):
     if isinstance(state_tree, dict):
-        return {key: serialize_state_tree(value) for key, value in state_tree.items()}
-    return serialize_variable(state_tree)
+        return {key: serialize_state_tree(value, precision) for key, value in state_tree.items()}
+    return serialize_variable(state_tree, precision)
 
 
-def save_state_tree_to_json(model, file_path="state_tree.json"):
+def save_state_tree_to_json(model, file_path="state_tree.json", precision=None, compression="auto"):
     state_tree = model.get_state_tree()
-    serialized_state_tree = serialize_state_tree(state_tree)
+    serialized_state_tree = serialize_state_tree(state_tree, precision)
     
-    with open(file_path, "w") as file:
+    # "auto" compresses by extension (.gz, .zst, .lz4)
+    with open_stream(file_path, "w", compression) as file:
         json.dump(serialized_state_tree, file, indent=4)
     
     return serialized_state_tree
 
 
-def load_state_tree_from_json(file_path="state_tree.json"):
-    with open(file_path, "r") as file:
+def write_state_tree_json(state_tree, target, compact=False, chunk_size=DEFAULT_CHUNK_SIZE, precision=None):
+    """Streams a state tree as JSON to a file-like object or socket, one variable at a time.
+
+    The indented output matches save_state_tree_to_json.
+    """
+    writer = JsonStreamWriter(target, chunk_size=chunk_size)
+    _write_state_tree(writer, state_tree, compact, level=0, precision=precision)
+    writer.flush()
+
+
+def _write_state_tree(writer, node, compact, level, precision=None):
+    if not isinstance(node, dict):
+        if compact:
+            encoded = json.dumps(serialize_variable(node, precision), separators=(",", ":"))
+        else:
+            encoded = json.dumps(serialize_variable(node, precision), indent=4).replace("\n", "\n" + "    " * level)
+        writer.write(encoded.encode())
+        return
+
+    if not node:
+        writer.write(b"{}")
+        return
+    writer.write(b"{")
+    for position, (key, value) in enumerate(node.items()):
+        prefix = "," if position else ""
+        if compact:
+            writer.write(f"{prefix}{json.dumps(key)}:".encode())
+        else:
+            writer.write(f"{prefix}\n{'    ' * (level + 1)}{json.dumps(key)}: ".encode())
+        _write_state_tree(writer, value, compact, level + 1, precision)
+    writer.write(b"}" if compact else f"\n{'    ' * level}}}".encode())
+
+
+def load_state_tree_from_json(file_path="state_tree.json", compression="auto"):
+    with open_stream(file_path, "r", compression) as file:
         loaded_data = json.load(file)
     return deserialize_variable(loaded_data)
 
 
-#verification
-def compare_state_trees(tree1, tree2):
-    if isinstance(tree1, dict) and isinstance(tree2, dict):
-        if tree1.keys() != tree2.keys():
-            print("Difference in keys:", tree1.keys(), tree2.keys())
-            return False
-        return all(compare_state_trees(tree1[key], tree2[key]) for key in tree1)
-
-    elif isinstance(tree1, list) and isinstance(tree2, list):
-        if len(tree1) != len(tree2):
-            print("Difference in list lengths:", len(tree1), len(tree2))
-            return False
-        return all(compare_state_trees(item1, item2) for item1, item2 in zip(tree1, tree2))
-
-    elif isinstance(tree1, tf.Variable) and isinstance(tree2, tf.Variable):
-        if tree1.dtype != tree2.dtype:
-            print("Difference in variable dtype:", tree1.dtype, tree2.dtype)
-            return False
-        if tree1.shape != tree2.shape:
-            print("Difference in variable shape:", tree1.shape, tree2.shape)
-            return False
-        if not np.allclose(tree1.numpy(), tree2.numpy()):
-            print("Difference in variable values:", tree1.numpy(), tree2.numpy())
-            return False
-        if tree1.name.split(":")[0] != tree2.name.split(":")[0]:
-            print("Difference in variable names:", tree1.name, tree2.name)
-            return False
-        return True
+def flatten_state_tree(state_tree, path=()):
+    """Yields (path, leaf) pairs of a nested state tree; paths are tuples of keys.
 
+    Empty subtrees are yielded as leaves so they survive a round trip.
+    """
+    if isinstance(state_tree, dict) and (state_tree or not path):
+        for key, value in state_tree.items():
+            yield from flatten_state_tree(value, path + (key,))
     else:
-        if tree1 != tree2:
-            print("Difference in values:", tree1, tree2)
-            return False
-        return True
+        yield path, state_tree
+
+
+def unflatten_state_tree(items):
+    """Rebuilds a nested state tree from (path, leaf) pairs."""
+    state_tree = {}
+    for path, value in items:
+        if not path:
+            return value
+        node = state_tree
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = value
+    return state_tree
+
+
+def save_state_tree_to_binary(model, file_path="state_tree.nnvb"):
+    """Writes a state tree as a JSON index followed by aligned raw tensor bytes."""
+    save_state_tree_binary(model.get_state_tree(), file_path)
+
+
+def save_state_tree_binary(state_tree, file_path="state_tree.nnvb"):
+    entries = []
+    arrays = {}
+    for path, value in flatten_state_tree(state_tree):
+        if isinstance(value, dict):
+            # Empty subtree
+            entries.append({"path": list(path), "__type__": "dict"})
+        elif isinstance(value, tf.Variable):
+            name = f"tensor_{len(arrays)}"
+            arrays[name] = value.numpy()
+            entries.append({
+                "path": list(path),
+                "__type__": "tf.Variable",
+                "name": value.name,
+                "dtype": str(value.dtype.name),
+                "shape": value.shape.as_list(),
+                "array": name,
+            })
+        elif isinstance(value, np.ndarray):
+            name = f"tensor_{len(arrays)}"
+            arrays[name] = value
+            entries.append({"path": list(path), "__type__": "ndarray", "dtype": str(value.dtype), "array": name})
+        else:
+            entries.append({"path": list(path), **serialize_variable(value)})
+    write_container(file_path, {"format": "state_tree", "entries": entries}, arrays)
+
+
+def _select_entries(entries, paths):
+    """Yields the entries whose "/"-joined path equals or starts with one of `paths` (all when None)."""
+    for entry in entries:
+        path = "/".join(entry["path"])
+        if paths is None or any(path == p or path.startswith(p.rstrip("/") + "/") for p in paths):
+            yield entry
+
+
+def _load_binary_entry(read_array, entry, as_variables):
+    """Rebuilds one entry of a binary index; `read_array(entry)` returns the raw tensor array."""
+    obj_type = entry["__type__"]
+    if obj_type == "dict":
+        return {}
+    if obj_type not in ("tf.Variable", "ndarray"):
+        return deserialize_variable(entry)
+
+    array = read_array(entry)
+    if obj_type == "ndarray":
+        return array
+    dtype = tf.as_dtype(entry["dtype"])
+    if array.dtype.kind == "V":
+        # Types without a NumPy code (e.g. bfloat16) are stored as raw bytes
+        array = array.view(dtype.as_numpy_dtype)
+    if not as_variables:
+        return array
+    return tf.Variable(initial_value=array, dtype=dtype, name=entry["name"], trainable=False)
+
+
+def load_state_tree_from_binary(file_path="state_tree.nnvb", paths=None, as_variables=True):
+    """Loads a state tree written by save_state_tree_to_binary.
+
+    Tensors are memory-mapped; with `as_variables=False` they are returned as
+    zero-copy arrays instead of tf.Variables. `paths` limits loading to the
+    variables whose "/"-joined path equals or starts with one of the given paths.
+    """
+    container = BinaryContainer(file_path)
+    return unflatten_state_tree(
+        (tuple(entry["path"]), _load_binary_entry(_container_array(container), entry, as_variables))
+        for entry in _select_entries(container.meta["entries"], paths)
+    )
+
+
+def load_state_tree_variable(file_path, path, as_variable=False):
+    """Loads a single variable, addressed by its "/"-joined path, from a binary state tree."""
+    container = BinaryContainer(file_path)
+    for entry in container.meta["entries"]:
+        if "/".join(entry["path"]) == path:
+            return _load_binary_entry(_container_array(container), entry, as_variable)
+    raise KeyError(path)
+
+
+def _container_array(container):
+    return lambda entry: container.array(entry["array"])
+
+
+#verification
+def compare_state_trees(tree1, tree2, early_exit=True, **options):
+    """Returns whether two state trees match, printing a summary of the differences.
+
+    See compare_state_tree_report for the options and the structured report.
+    """
+    report = compare_state_tree_report(tree1, tree2, early_exit=early_exit, **options)
+    if not report.equal:
+        print(report.summary())
+    return report.equal
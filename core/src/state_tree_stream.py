@@ -0,0 +1,237 @@
+import json
+import re
+import numpy as np
+import tensorflow as tf
+
+from core.src.compression import open_stream
+from core.src.json_stream import DEFAULT_CHUNK_SIZE
+from core.src.quantization import QuantizedArray
+from core.src.state_tree_serialization import deserialize_variable
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"\s*")
+_NUMBER = re.compile(r"[0-9]|nan|inf", re.IGNORECASE)
+_BRACKET = re.compile(r"[\[\]]")
+_BRACKETS = str.maketrans("[]", "  ")
+_SEPARATORS = " \t\r\n,"
+_DELIMITERS = _SEPARATORS + ":]}"
+_SKIPPED = object()
+# dtypes whose values np.fromstring can parse directly
+_NUMERIC_KINDS = "fiu"
+
+
+class _Reader:
+    """Pull parser over a text stream that keeps only a bounded window in memory."""
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        if self.pos > self.chunk_size:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        chunk = self.file.read(self.chunk_size)
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode()
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos} of the current window")
+        self.pos += 1
+
+    def value(self):
+        """Decodes one complete JSON value, reading more input until it parses."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number cut off by the end of the window ("1." of "1.5") still
+            # decodes, so only accept values followed by a delimiter
+            if (end == len(self.buffer) or self.buffer[end] not in _DELIMITERS) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def numbers(self, out, dtype):
+        """Parses a (nested) array of numbers into the flat buffer `out`.
+
+        With `out` set to None the numbers are only skipped. Returns how many
+        values were parsed.
+        """
+        self.expect("[")
+        depth, filled, pending = 1, 0, ""
+        while True:
+            text = self.buffer[self.pos:]
+            closing = None
+            # The array can only end in this window if it holds enough "]"
+            if text.count("]") >= depth:
+                level = depth
+                for match in _BRACKET.finditer(text):
+                    level += 1 if match.group() == "[" else -1
+                    if level == 0:
+                        closing = match.start()
+                        break
+            if closing is not None:
+                segment, pending = pending + text[:closing], ""
+                self.pos += closing + 1
+            else:
+                depth += text.count("[") - text.count("]")
+                # Keep a possibly incomplete trailing number for the next chunk
+                combined = pending + text
+                cut = combined.rfind(",")
+                segment, pending = ("", combined) if cut < 0 else (combined[:cut], combined[cut + 1:])
+                self.pos = len(self.buffer)
+            if _NUMBER.search(segment):
+                if out is not None:
+                    # A chunk may start right after a separator, leaving a leading comma
+                    flat = segment.translate(_BRACKETS).strip(_SEPARATORS)
+                    values = np.fromstring(flat, dtype=dtype, sep=",")
+                    out[filled:filled + len(values)] = values
+                    filled += len(values)
+            if closing is not None:
+                return filled
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+
+def _selection(path, paths):
+    """Returns "all" when `path` lies inside a selected path, "some" when a
+    selected path lies below it, and None otherwise."""
+    if paths is None:
+        return "all"
+    joined = "/".join(path)
+    partial = False
+    for selected in paths:
+        selected = selected.strip("/")
+        if joined == selected or joined.startswith(selected + "/"):
+            return "all"
+        if selected.startswith(joined + "/"):
+            partial = True
+    return "some" if partial else None
+
+
+def _parse_object(reader, path, paths, keep):
+    """Parses an object whose "{" was consumed; returns the decoded value, or
+    _SKIPPED when `keep` is false."""
+    items = {}
+    first = True
+    while reader.peek() != "}":
+        if not first:
+            reader.expect(",")
+        first = False
+        key = reader.value()
+        reader.expect(":")
+
+        if key == "__type__" or "__type__" in items:
+            # Fields of a typed leaf belong to the leaf, not to the tree path.
+            # Its small header fields are always read, so that skipped
+            # tensors can still be scanned without decoding their data.
+            if key == "data" and items.get("__type__") == "ndarray":
+                items[key] = _parse_ndarray(reader, items, keep)
+            else:
+                items[key] = _parse_value(reader, path, None, keep or key != "data")
+            continue
+
+        selection = _selection(path + (key,), paths) if keep else None
+        value = _parse_value(reader, path + (key,), paths if selection == "some" else None, selection is not None)
+        # Drop subtrees that were skipped or only walked to reach selected paths
+        if selection is None or (selection == "some" and isinstance(value, dict) and not value):
+            continue
+        items[key] = value
+    reader.pos += 1
+
+    if not keep:
+        return _SKIPPED
+    return _finish_leaf(items)
+
+
+def _parse_value(reader, path, paths, keep):
+    if reader.peek() == "{":
+        reader.pos += 1
+        return _parse_object(reader, path, paths, keep)
+    value = reader.value()
+    return value if keep else _SKIPPED
+
+
+def _parse_ndarray(reader, items, keep):
+    if "quantization" in items:
+        # Base64 codes; _finish_leaf dequantizes them
+        data = reader.value()
+        return data if keep else _SKIPPED
+    dtype = np.dtype(items["dtype"])
+    shape = items.get("shape")
+    if reader.peek() != "[" or dtype.kind not in _NUMERIC_KINDS or shape is None:
+        data = reader.value()
+        return np.array(data, dtype=dtype).reshape(shape) if keep else _SKIPPED
+    if not keep:
+        reader.numbers(None, dtype)
+        return _SKIPPED
+    out = np.empty(int(np.prod(shape, dtype=np.int64)), dtype=dtype)
+    parse_dtype = np.int64 if dtype.kind == "i" else np.uint64 if dtype.kind == "u" else np.float64
+    filled = reader.numbers(out, parse_dtype)
+    if filled != out.size:
+        raise ValueError(f"Expected {out.size} values for an array of shape {shape}, got {filled}")
+    return out.reshape(shape)
+
+
+def _finish_leaf(items):
+    obj_type = items.get("__type__")
+    if obj_type == "ndarray":
+        if "quantization" in items:
+            quantized = QuantizedArray.decode(items["data"], items["shape"], items["quantization"])
+            return quantized.dequantize(np.dtype(items["dtype"]))
+        return items["data"]
+    if obj_type == "tf.Variable":
+        dtype_str = items["dtype"]
+        return tf.Variable(
+            initial_value=items["data"],
+            dtype=tf.as_dtype(dtype_str) if dtype_str else None,
+            name=items["name"],
+            trainable=False
+        )
+    if obj_type is not None:
+        return deserialize_variable(items)
+    return items
+
+
+def load_state_tree_from_json_stream(file, paths=None, chunk_size=DEFAULT_CHUNK_SIZE, compression="auto"):
+    """Loads a JSON state tree without materializing tensors as Python lists.
+
+    `file` is a path, decompressed according to `compression` (see
+    core.src.compression.open_stream), or a file-like object. Numbers of each "ndarray" entry
+    are parsed chunk by chunk straight into a preallocated NumPy buffer.
+    `paths` optionally restricts decoding to variables whose "/"-joined path
+    equals or lies under one of the given paths; everything else is skipped.
+    """
+    if isinstance(file, str):
+        with open_stream(file, "r", compression) as handle:
+            return load_state_tree_from_json_stream(handle, paths=paths, chunk_size=chunk_size)
+
+    reader = _Reader(file, chunk_size)
+    if reader.peek() != "{":
+        return deserialize_variable(reader.value())
+    reader.pos += 1
+    return _parse_object(reader, (), paths, True)
@@ -0,0 +1,240 @@
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.src.models import Serializable, Topology, WeightBlock
+
+
+@dataclass
+class LayerDiff(Serializable):
+    """Change of the weight block feeding one layer.
+
+    `status` is "changed", "unchanged", "added", "removed" or "shape" (the
+    kernels differ in shape and are not compared). Edges hidden by a mask
+    count as weight 0.
+    """
+    start_layer: Optional[int]
+    end_layer: int
+    status: str
+    edges: int = 0
+    edges_changed: int = 0
+    mean_abs_delta: float = 0.0
+    max_abs_delta: float = 0.0
+    rms_delta: float = 0.0
+    # ||delta||_F / ||before||_F
+    relative_change: float = 0.0
+    bias_max_abs_delta: float = 0.0
+    mask_flips: int = 0
+
+
+@dataclass
+class EdgeChange(Serializable):
+    """One edge, located by layer and unit; `start` is None for inputs outside the topology."""
+    start_layer: Optional[int]
+    end_layer: int
+    start_unit: int
+    end_unit: int
+    start: Optional[str]
+    end: str
+    before: float
+    after: float
+    delta: float
+
+
+@dataclass
+class NeuronChange(Serializable):
+    """A neuron scored by the L2 norm of the change of its incoming weights and bias."""
+    id: str
+    layer_index: int
+    unit: int
+    score: float
+    bias_delta: float
+
+
+@dataclass
+class TopologyDiff(Serializable):
+    layers: list[LayerDiff] = field(default_factory=lambda: [])
+    edges: list[EdgeChange] = field(default_factory=lambda: [])
+    neurons: list[NeuronChange] = field(default_factory=lambda: [])
+    connections_added: int = 0
+    connections_removed: int = 0
+    connections_changed: int = 0
+
+    def to_overlay(self) -> dict:
+        """Column-oriented summary for the visualizer: per-layer statistics plus
+        the top edges and neurons, without repeating field names per item."""
+        return {
+            "layers": {
+                "end_layer": [layer.end_layer for layer in self.layers],
+                "status": [layer.status for layer in self.layers],
+                "max_abs_delta": [layer.max_abs_delta for layer in self.layers],
+                "relative_change": [layer.relative_change for layer in self.layers],
+            },
+            "edges": {
+                "start": [edge.start for edge in self.edges],
+                "end": [edge.end for edge in self.edges],
+                "start_unit": [edge.start_unit for edge in self.edges],
+                "delta": [edge.delta for edge in self.edges],
+            },
+            "neurons": {
+                "id": [neuron.id for neuron in self.neurons],
+                "score": [neuron.score for neuron in self.neurons],
+            },
+        }
+
+
+def diff_topologies(before: Topology, after: Topology, top_k: int = 20, tolerance: float = 0.0) -> TopologyDiff:
+    """Compares two topologies of the same model, layer by layer.
+
+    Weight blocks are lined up by the layer they feed and compared as whole
+    matrices. The result holds per-layer statistics, and the `top_k` edges
+    and neurons whose weights changed most (by |delta|, over all layers).
+    Changes of at most `tolerance` are not counted and not listed.
+    """
+    result = TopologyDiff()
+    edge_candidates = []
+    neuron_candidates = []
+
+    end_layers = [block.end_layer for block in before.weights]
+    end_layers += [block.end_layer for block in after.weights if before.get_weights(block.end_layer) is None]
+    for end_layer in end_layers:
+        old, new = before.get_weights(end_layer), after.get_weights(end_layer)
+        if old is None or new is None:
+            block = new if old is None else old
+            result.layers.append(LayerDiff(start_layer=block.start_layer, end_layer=end_layer,
+                                           status="added" if old is None else "removed", edges=block.edge_count()))
+            continue
+        if old.kernel.shape != new.kernel.shape or old.start_layer != new.start_layer:
+            result.layers.append(LayerDiff(start_layer=new.start_layer, end_layer=end_layer, status="shape"))
+            continue
+
+        old_kernel, new_kernel = _effective_kernel(old), _effective_kernel(new)
+        delta = new_kernel - old_kernel
+        magnitude = np.abs(delta)
+        bias_delta = _bias(new, delta.shape[1]) - _bias(old, delta.shape[1])
+        norm = float(np.linalg.norm(old_kernel))
+        layer = LayerDiff(
+            start_layer=new.start_layer,
+            end_layer=end_layer,
+            status="unchanged",
+            edges=new.edge_count(),
+            edges_changed=int(np.count_nonzero(magnitude > tolerance)),
+            mean_abs_delta=float(magnitude.mean()) if magnitude.size else 0.0,
+            max_abs_delta=float(magnitude.max()) if magnitude.size else 0.0,
+            rms_delta=float(np.sqrt(np.mean(np.square(delta)))) if delta.size else 0.0,
+            relative_change=float(np.linalg.norm(delta)) / norm if norm else 0.0,
+            bias_max_abs_delta=float(np.abs(bias_delta).max()) if bias_delta.size else 0.0,
+            mask_flips=_mask_flips(old, new),
+        )
+        if layer.edges_changed or layer.bias_max_abs_delta > tolerance or layer.mask_flips:
+            layer.status = "changed"
+        result.layers.append(layer)
+
+        flat = _top_indices(magnitude.ravel(), top_k)
+        rows, columns = np.unravel_index(flat, delta.shape)
+        edge_candidates.extend(
+            (float(magnitude[i, j]), after, new, i, j, float(old_kernel[i, j]), float(new_kernel[i, j]))
+            for i, j in zip(rows.tolist(), columns.tolist()) if magnitude[i, j] > tolerance
+        )
+        scores = np.sqrt(np.square(delta).sum(axis=0) + np.square(bias_delta))
+        neuron_candidates.extend(
+            (float(scores[j]), end_layer, j, float(bias_delta[j]))
+            for j in _top_indices(scores, top_k).tolist() if scores[j] > tolerance
+        )
+
+    _diff_connections(before, after, result, edge_candidates, top_k, tolerance)
+
+    edge_candidates.sort(key=lambda candidate: -candidate[0])
+    for _, topology, block, i, j, old_weight, new_weight in edge_candidates[:top_k]:
+        result.edges.append(_edge_change(topology, block, i, j, old_weight, new_weight))
+    neuron_candidates.sort(key=lambda candidate: -candidate[0])
+    for score, end_layer, j, bias_delta in neuron_candidates[:top_k]:
+        layer = after.get_layer(end_layer)
+        if layer is None or j >= len(layer.neurons):
+            continue
+        result.neurons.append(NeuronChange(id=layer.neurons[j].id, layer_index=end_layer, unit=j,
+                                           score=score, bias_delta=bias_delta))
+    return result
+
+
+def _effective_kernel(block: WeightBlock) -> np.ndarray:
+    kernel = np.asarray(block.kernel, dtype=np.float64)
+    return np.where(block.mask, kernel, 0.0) if block.mask is not None else kernel
+
+
+def _bias(block: WeightBlock, units: int) -> np.ndarray:
+    return np.asarray(block.bias, dtype=np.float64) if block.bias is not None else np.zeros(units)
+
+
+def _mask_flips(old: WeightBlock, new: WeightBlock) -> int:
+    if old.mask is None and new.mask is None:
+        return 0
+    old_mask = old.mask if old.mask is not None else np.ones(old.kernel.shape, dtype=bool)
+    new_mask = new.mask if new.mask is not None else np.ones(new.kernel.shape, dtype=bool)
+    return int(np.count_nonzero(old_mask != new_mask))
+
+
+def _top_indices(values: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the `top_k` largest values, largest first."""
+    if len(values) > top_k:
+        selected = np.argpartition(values, len(values) - top_k)[len(values) - top_k:]
+    else:
+        selected = np.arange(len(values))
+    return selected[np.argsort(-values[selected], kind="stable")]
+
+
+def _edge_change(topology: Topology, block: Optional[WeightBlock], i: int, j: int,
+                 old_weight: float, new_weight: float) -> EdgeChange:
+    if block is None:
+        # Explicit connection; i and j are neuron numbers of `topology`
+        start, end = topology.neurons.ids[i], topology.neurons.ids[j]
+        start_location = topology.neurons.location(i) or (None, -1)
+        end_location = topology.neurons.location(j) or (None, -1)
+        return EdgeChange(start_layer=start_location[0], end_layer=end_location[0],
+                          start_unit=start_location[1], end_unit=end_location[1], start=start, end=end,
+                          before=old_weight, after=new_weight, delta=new_weight - old_weight)
+    start_layer = topology.get_layer(block.start_layer) if block.start_layer is not None else None
+    end_layer = topology.get_layer(block.end_layer)
+    return EdgeChange(
+        start_layer=block.start_layer,
+        end_layer=block.end_layer,
+        start_unit=i,
+        end_unit=j,
+        start=start_layer.neurons[i].id if start_layer is not None and i < len(start_layer.neurons) else None,
+        end=end_layer.neurons[j].id if end_layer is not None and j < len(end_layer.neurons) else str(j),
+        before=old_weight,
+        after=new_weight,
+        delta=new_weight - old_weight,
+    )
+
+
+def _diff_connections(before: Topology, after: Topology, result: TopologyDiff,
+                      edge_candidates: list, top_k: int, tolerance: float):
+    """Matches explicit connections by their endpoint ids."""
+    old, new = before.connections.columns(), after.connections.columns()
+    if not len(old["start"]) and not len(new["start"]):
+        return
+    # Translate the neuron numbers of `after` into those of `before`
+    translate = np.array([-1 if number is None else number
+                          for number in map(before.neurons.number, after.neurons.ids)], dtype=np.int64)
+    old_keys = old["start"].astype(np.int64) << 32 | old["end"].astype(np.int64)
+    starts, ends = translate[new["start"]], translate[new["end"]]
+    new_keys = np.where((starts >= 0) & (ends >= 0), starts << 32 | ends, -1)
+
+    order = np.argsort(old_keys)
+    positions = np.clip(np.searchsorted(old_keys[order], new_keys), 0, max(len(order) - 1, 0))
+    matched = (new_keys >= 0) & (len(order) > 0)
+    if len(order):
+        matched &= old_keys[order][positions] == new_keys
+    old_weights = np.zeros(len(new_keys))
+    old_weights[matched] = old["weight"][order[positions[matched]]]
+
+    result.connections_added = int(np.count_nonzero(~matched))
+    result.connections_removed = len(old_keys) - int(np.count_nonzero(matched))
+    magnitude = np.where(matched, np.abs(new["weight"] - old_weights), 0.0)
+    result.connections_changed = int(np.count_nonzero(magnitude > tolerance))
+    for position in _top_indices(magnitude, top_k).tolist():
+        if magnitude[position] > tolerance:
+            edge_candidates.append((float(magnitude[position]), after, None, int(new["start"][position]),
+                                    int(new["end"][position]), float(old_weights[position]),
+                                    float(new["weight"][position])))
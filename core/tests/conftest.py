@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from core.src.models import Layer, Neuron, Topology, WeightBlock
+
+
+def build_topology(sizes=(6, 5, 4, 3), seed=0, with_input_block=False) -> Topology:
+    """A Dense-only topology shaped like convert's output, without needing Keras.
+
+    Layer 0 stands in for the input layer; the kernel feeding layer k has shape
+    (sizes[k - 1], sizes[k]) and neuron weights are the kernel rows, as in convert.
+    """
+    rng = np.random.default_rng(seed)
+    topology = Topology()
+    previous = None
+    for index, units in enumerate(sizes):
+        fan_in = sizes[index - 1] if index else units
+        kernel = rng.standard_normal((fan_in, units)).astype(np.float32)
+        bias = rng.standard_normal(units).astype(np.float32)
+        layer = Layer(index=index, name=f"dense_{index}", type="Dense", units=units,
+                      input_shape=[None, fan_in], output_shape=[None, units], activation_function="relu")
+        for unit in range(units):
+            layer.neurons.append(Neuron(id=f"Dense_{index}_{unit}", layer_index=index,
+                                        weight=kernel[unit % fan_in], bias=bias[unit], activation_function="relu"))
+        if index or with_input_block:
+            topology.add_weights(WeightBlock(start_layer=previous, end_layer=index, kernel=kernel, bias=bias))
+        topology.add_layer(layer)
+        previous = index
+    return topology
+
+
+@pytest.fixture
+def topology() -> Topology:
+    return build_topology()
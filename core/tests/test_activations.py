@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("keras")
+
+from core.src.activations import RunningStats, attach_activation_stats  # noqa: E402
+from core.tests.conftest import build_topology  # noqa: E402
+
+
+def test_running_stats_match_numpy_over_batches():
+    rng = np.random.default_rng(0)
+    data = rng.normal(loc=2.0, scale=3.0, size=(1000, 4))
+    data[data < 0] = 0.0
+    stats = RunningStats(4, bins=8, histogram_range=(0.0, 10.0))
+    for start in range(0, len(data), 96):
+        stats.update(data[start:start + 96])
+
+    assert stats.count == len(data)
+    np.testing.assert_allclose(stats.mean, data.mean(axis=0))
+    np.testing.assert_allclose(stats.variance, data.var(axis=0))
+    np.testing.assert_allclose(stats.sparsity, (data == 0).mean(axis=0))
+    np.testing.assert_array_equal(stats.minimum, data.min(axis=0))
+    np.testing.assert_array_equal(stats.maximum, data.max(axis=0))
+    for unit in range(4):
+        expected, _ = np.histogram(np.clip(data[:, unit], 0.0, np.nextafter(10.0, 0)), bins=8, range=(0.0, 10.0))
+        np.testing.assert_array_equal(stats.histogram[unit], expected)
+
+
+def test_update_rejects_other_widths():
+    with pytest.raises(ValueError):
+        RunningStats(3).update(np.zeros((2, 4)))
+
+
+def test_attach_stores_stats_on_matching_layers():
+    topology = build_topology()
+    stats = RunningStats(4)
+    stats.update(np.arange(8, dtype=np.float64).reshape(2, 4))
+    attach_activation_stats(topology, {2: stats, 9: RunningStats(1)})
+    assert [neuron.stats.mean for neuron in topology.get_layer(2).neurons] == [2.0, 3.0, 4.0, 5.0]
+    assert all(neuron.stats is None for neuron in topology.get_layer(1).neurons)
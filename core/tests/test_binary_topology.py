@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from core.src.binary_container import ALIGNMENT, BinaryContainer, write_container
+from core.src.models import Connection, Topology
+from core.tests.conftest import build_topology
+
+
+def test_container_round_trip(tmp_path):
+    path = str(tmp_path / "data.nnvb")
+    arrays = {"a": np.arange(5, dtype=np.int16), "b": np.ones((3, 4), dtype=">f8"), "empty": np.zeros(0)}
+    write_container(path, {"note": "x"}, arrays)
+    container = BinaryContainer(path)
+    assert container.meta == {"note": "x"}
+    for name, array in arrays.items():
+        np.testing.assert_array_equal(container.array(name), array)
+    assert all(entry["offset"] % ALIGNMENT == 0 for entry in container.index.values())
+    assert container.array("b").dtype == np.dtype("<f8")
+
+
+def test_container_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"PK\x03\x04" + bytes(32))
+    with pytest.raises(ValueError):
+        BinaryContainer(str(path))
+    with pytest.raises(TypeError):
+        write_container(str(tmp_path / "objects.nnvb"), {}, {"a": np.array([object()])})
+
+
+def test_topology_round_trip(tmp_path):
+    topology = build_topology()
+    topology.get_weights(2).mask = np.abs(topology.get_weights(2).kernel) > 0.3
+    topology.add_connection(Connection(start="Dense_0_0", end="Dense_3_1", weight=0.5, bias=None))
+    topology.metadata["source"] = "test"
+    path = str(tmp_path / "topology.nnvb")
+    topology.save_binary(path)
+
+    loaded = Topology.load_binary(path)
+    assert loaded.fingerprint() == topology.fingerprint()
+    assert loaded.metadata == {"source": "test"}
+    assert loaded.get_connection("Dense_0_0", "Dense_3_1").weight == 0.5
+    kernel = loaded.get_weights(1).kernel
+    assert isinstance(kernel, np.memmap) or isinstance(kernel.base, np.memmap)
+    # Neuron weights are rows of the mapped kernel rather than copies
+    assert np.shares_memory(loaded.get_layer(1).neurons[2].weight, kernel)
+
+
+def test_quantized_round_trip(tmp_path):
+    topology = build_topology()
+    path = str(tmp_path / "topology.nnvb")
+    topology.save_binary(path, precision="int8")
+    loaded = Topology.load_binary(path)
+    error = loaded.metadata["quantization"]["max_error"]
+    for block, other in zip(topology.weights, loaded.weights):
+        assert np.max(np.abs(other.kernel - block.kernel)) <= error + 1e-6
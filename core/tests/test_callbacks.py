@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("keras")
+
+from core.src.callbacks import SnapshotCallback  # noqa: E402
+
+
+class _LiveStateModel:
+    """Returns its live arrays from get_state_tree, as backends may do without copying."""
+
+    def __init__(self):
+        self.kernel = np.zeros((3, 2), dtype=np.float32)
+        self.formats = []
+
+    def get_state_tree(self, value_format="backend_tensor"):
+        self.formats.append(value_format)
+        return {"trainable_variables": {"dense": {"kernel": self.kernel}}, "optimizer_variables": {}}
+
+
+def _train(callback, model, epochs=2, batches=3):
+    callback.model = model
+    callback.on_train_begin()
+    for epoch in range(epochs):
+        callback.on_epoch_begin(epoch)
+        for batch in range(batches):
+            model.kernel += 1
+            callback.on_train_batch_end(batch)
+        callback.on_epoch_end(epoch)
+    callback.on_train_end()
+
+
+def test_state_tree_snapshots_are_copies():
+    snapshots = []
+    model = _LiveStateModel()
+    _train(SnapshotCallback(kind="state_tree", every_n_batches=1, every_n_epochs=None, max_pending=16,
+                            policy="block", on_snapshot=snapshots.append), model)
+    kernels = [snapshot.state_tree["trainable_variables"]["dense"]["kernel"] for snapshot in snapshots]
+    assert [float(kernel[0, 0]) for kernel in kernels] == [1, 2, 3, 4, 5, 6]
+    assert all(not np.shares_memory(kernel, model.kernel) for kernel in kernels)
+    assert set(model.formats) == {"numpy_array"}
+
+
+def test_epoch_end_on_a_batch_snapshot_is_not_taken_twice():
+    snapshots = []
+    callback = SnapshotCallback(kind="state_tree", every_n_batches=3, every_n_epochs=1, max_pending=16,
+                                policy="block", on_snapshot=snapshots.append)
+    _train(callback, _LiveStateModel())
+    assert [(snapshot.epoch, snapshot.step) for snapshot in snapshots] == [(0, 3), (1, 6)]
+    assert callback.taken == 2
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        SnapshotCallback(directory="out", kind="weights")
+    with pytest.raises(ValueError):
+        SnapshotCallback(directory="out", policy="wait")
+    with pytest.raises(ValueError):
+        SnapshotCallback()
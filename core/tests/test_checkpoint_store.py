@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from core.src.checkpoint_store import CheckpointStore  # noqa: E402
+
+
+def _tree(seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "dense": {
+            "kernel": tf.Variable(rng.normal(size=(64, 32)).astype(np.float32), name="kernel"),
+            "bias": tf.Variable(np.zeros(32, dtype=np.float32), name="bias"),
+        },
+        "moments": rng.normal(size=(8,)),
+        "step": np.int64(3),
+        "empty": {},
+    }
+
+
+def test_round_trip(tmp_path):
+    store = CheckpointStore(str(tmp_path), chunk_bytes=1000)
+    tree = _tree()
+    name = store.save(tree).name
+    loaded = store.load(name)
+    assert np.array_equal(loaded["dense"]["kernel"].numpy(), tree["dense"]["kernel"].numpy())
+    assert loaded["dense"]["kernel"].name.split(":")[0] == "kernel"
+    assert np.array_equal(loaded["moments"], tree["moments"])
+    assert loaded["step"] == 3
+    assert loaded["empty"] == {}
+
+
+def test_load_selected_paths_as_arrays(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    tree = _tree()
+    store.save(tree, "only")
+    loaded = store.load("only", paths=["dense/"], as_variables=False)
+    assert set(loaded) == {"dense"}
+    assert np.array_equal(loaded["dense"]["bias"], tree["dense"]["bias"].numpy())
+
+
+def test_unchanged_chunks_are_written_once(tmp_path):
+    store = CheckpointStore(str(tmp_path), chunk_bytes=1024)
+    first = store.save(_tree())
+    assert first.chunks_written > 0
+    second = store.save(_tree())
+    assert second.chunks_written == 0
+    assert second.bytes_total == first.bytes_total
+
+
+def test_default_names_after_delete(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    names = [store.save(_tree(seed)).name for seed in range(3)]
+    assert names == ["000000", "000001", "000002"]
+    store.delete("000000")
+    assert store.save(_tree(3)).name == "000003"
+    assert store.snapshots() == ["000001", "000002", "000003"]
+
+
+def test_existing_names_are_not_overwritten(tmp_path):
+    store = CheckpointStore(str(tmp_path))
+    store.save(_tree(0), "best")
+    with pytest.raises(FileExistsError):
+        store.save(_tree(1), "best")
+    assert np.array_equal(store.load("best")["moments"], _tree(0)["moments"])
+
+
+def test_collect_garbage_keeps_referenced_chunks(tmp_path):
+    store = CheckpointStore(str(tmp_path), chunk_bytes=1024)
+    store.save(_tree(0), "a")
+    store.save(_tree(1), "b")
+    store.delete("a")
+    assert store.collect_garbage() > 0
+    assert np.array_equal(store.load("b")["moments"], _tree(1)["moments"])
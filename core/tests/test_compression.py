@@ -0,0 +1,80 @@
+import gzip
+import sys
+
+import pytest
+
+from core.src.compression import codec_for, open_stream
+from core.src.models import Topology
+from core.tests.conftest import build_topology
+
+CODEC_MODULES = {None: None, "gzip": None, "zstd": "zstandard", "lz4": "lz4"}
+SUFFIXES = {None: ".json", "gzip": ".json.gz", "zstd": ".json.zst", "lz4": ".json.lz4"}
+
+
+@pytest.fixture(params=list(CODEC_MODULES))
+def codec(request):
+    if CODEC_MODULES[request.param] is not None:
+        pytest.importorskip(CODEC_MODULES[request.param])
+    return request.param
+
+
+def test_codec_for():
+    assert codec_for("topology.json") is None
+    assert codec_for("topology.JSON.GZ") == "gzip"
+    assert codec_for("state_tree.json.zstd") == "zstd"
+    assert codec_for("state_tree.json.lz4") == "lz4"
+    assert codec_for("topology.json.gz", None) is None
+    assert codec_for("topology.json", "zstd") == "zstd"
+    with pytest.raises(ValueError):
+        codec_for("topology.json", "brotli")
+
+
+def test_binary_round_trip(tmp_path, codec):
+    file_path = str(tmp_path / f"data{SUFFIXES[codec]}")
+    data = bytes(range(256)) * 4096
+    with open_stream(file_path, "wb") as file:
+        file.write(data)
+    with open_stream(file_path, "rb") as file:
+        assert file.read() == data
+    if codec is not None:
+        assert (tmp_path / f"data{SUFFIXES[codec]}").stat().st_size < len(data) // 10
+
+
+def test_text_round_trip_with_explicit_codec(tmp_path, codec):
+    # The codec parameter wins over the extension
+    file_path = str(tmp_path / "data.bin")
+    with open_stream(file_path, "w", codec, level=1) as file:
+        file.write("Ünïcode weights: 0.25\n" * 100)
+    with open_stream(file_path, "r", codec) as file:
+        assert file.read() == "Ünïcode weights: 0.25\n" * 100
+
+
+def test_gzip_files_are_standard(tmp_path):
+    file_path = str(tmp_path / "topology.json.gz")
+    with open_stream(file_path, "w") as file:
+        file.write('{"layers": []}')
+    assert gzip.decompress((tmp_path / "topology.json.gz").read_bytes()) == b'{"layers": []}'
+
+
+def test_topology_round_trip(tmp_path, codec):
+    topology = build_topology()
+    file_path = str(tmp_path / f"topology{SUFFIXES[codec]}")
+    with open_stream(file_path, "wb") as file:
+        topology.write_json(file, compact=True)
+    with open_stream(file_path, "rb") as file:
+        loaded = Topology.from_json(file.read())
+    assert loaded.fingerprint() == topology.fingerprint()
+
+
+def test_invalid_mode(tmp_path):
+    with pytest.raises(ValueError):
+        open_stream(str(tmp_path / "data.gz"), "a")
+
+
+@pytest.mark.parametrize("codec, module", [("zstd", "zstandard"), ("lz4", "lz4")])
+def test_missing_optional_codec(tmp_path, monkeypatch, codec, module):
+    # A None entry makes the import fail as if the package were not installed
+    monkeypatch.setitem(sys.modules, module, None)
+    monkeypatch.setitem(sys.modules, f"{module}.frame", None)
+    with pytest.raises(ImportError, match=f"'{module}' package"):
+        open_stream(str(tmp_path / "data"), "wb", codec)
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("keras")
+
+from core.src.convertor import sparsify  # noqa: E402
+from core.tests.conftest import build_topology  # noqa: E402
+
+
+def test_threshold_alone_selects_the_threshold_strategy():
+    topology = build_topology()
+    sparsify(topology, threshold=1.0)
+    info = topology.metadata["sparsification"]
+    assert info["strategy"] == "threshold"
+    for block in topology.weights:
+        assert np.array_equal(block.mask, np.abs(block.kernel) >= 1.0)
+
+
+def test_budget_defaults_to_topk_and_is_recorded():
+    topology = build_topology()
+    sparsify(topology, edge_budget=7)
+    info = topology.metadata["sparsification"]
+    assert info["strategy"] == "topk"
+    assert info["edges_kept"] == 7
+    assert info["edges_kept"] + info["edges_dropped"] == info["edges_total"]
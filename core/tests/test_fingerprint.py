@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from core.src.layout import get_layout
+from core.src.models import Neuron, Topology
+from core.tests.conftest import build_topology
+
+
+def test_equal_topologies_have_equal_fingerprints():
+    assert build_topology().fingerprint() == build_topology().fingerprint()
+    assert build_topology().fingerprint() != build_topology(seed=1).fingerprint()
+    assert build_topology().differences(build_topology()) == []
+
+
+def test_differences_locate_edited_weights():
+    topology, other = build_topology(), build_topology()
+    other.weights[1].kernel[2, 1] += 1.0
+    # Neuron weights are views of kernel rows here, so the neuron changes too
+    assert topology.differences(other) == ["layers[2].neurons[2]", "weights[1].kernel[2]"]
+
+
+def test_fingerprint_follows_in_place_edits():
+    topology = build_topology()
+    seen = {topology.fingerprint()}
+    edits = [
+        lambda: setattr(topology.layers[1].neurons[0], "bias", 9.0),
+        lambda: topology.layers[2].neurons[1].weight.__setitem__(0, 9.0),
+        lambda: topology.weights[0].bias.__setitem__(0, 9.0),
+        lambda: topology.layers[3].neurons.append(Neuron(id="extra", layer_index=3, weight=None, bias=0.0)),
+        lambda: topology.metadata.update(step=1),
+    ]
+    for edit in edits:
+        edit()
+        seen.add(topology.fingerprint())
+    assert len(seen) == len(edits) + 1
+
+
+def test_structure_fingerprint_ignores_values():
+    topology = build_topology()
+    assert topology.structure_fingerprint() == build_topology(seed=1).structure_fingerprint()
+    assert topology.structure_fingerprint() != build_topology(sizes=(6, 5, 4, 2)).structure_fingerprint()
+    topology.layers[1].neurons[0].id = "renamed"
+    assert topology.structure_fingerprint() != build_topology().structure_fingerprint()
+    before = topology.structure_fingerprint()
+    topology.layers[1].neurons.append(Neuron(id="extra", layer_index=1, weight=None, bias=0.0))
+    assert topology.structure_fingerprint() != before
+
+
+def test_cached_recomputes_only_for_a_new_fingerprint():
+    topology = build_topology()
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+    assert topology.cached("key", "a", compute) == 1
+    assert topology.cached("key", "a", compute) == 1
+    assert topology.cached("key", "b", compute) == 2
+    assert len(calls) == 2
+
+
+def test_index_layout_survives_weight_updates():
+    topology = build_topology()
+    layout = get_layout(topology)
+    for block in topology.weights:
+        block.kernel *= 2
+    assert get_layout(topology) is layout
+
+
+def test_barycenter_layout_follows_weight_updates():
+    topology = build_topology()
+    layout = get_layout(topology, order="barycenter")
+    assert get_layout(topology, order="barycenter") is layout
+    topology.weights[0].kernel[:] = np.flip(topology.weights[0].kernel, axis=1)
+    assert get_layout(topology, order="barycenter") is not layout
+
+
+def test_verify_ignores_blocks_that_json_does_not_carry():
+    for module in ("keras", "sklearn", "tensorflow"):
+        pytest.importorskip(module)
+    from main import verify_topology_structure
+
+    topology = build_topology(with_input_block=True)
+    document = topology.to_json()
+    assert topology.differences(Topology.from_json(document)) == ["weights"]
+    assert verify_topology_structure(document, topology)
+    assert verify_topology_structure(document, Topology.from_json(document))
+
+    edited = Topology.from_json(document)
+    edited.weights[1].kernel[0, 0] += 1.0
+    assert not verify_topology_structure(document, edited)
@@ -0,0 +1,61 @@
+import numpy as np
+import orjson
+import pytest
+
+from core.src.models import Connection, Layer, Neuron, Serializable, Topology, _decoder_plan
+from core.tests.conftest import build_topology
+
+
+def test_decoder_plans_are_built_once_per_class():
+    _decoder_plan(Layer)
+    hits = _decoder_plan.cache_info().hits
+    Layer.from_json(build_topology().layers[1].to_json())
+    assert _decoder_plan.cache_info().hits > hits
+    assert _decoder_plan(Layer) is _decoder_plan(Layer)
+
+
+def test_layer_round_trip_decodes_neurons():
+    layer = build_topology().layers[2]
+    loaded = Layer.from_json(layer.to_json())
+    assert [neuron.id for neuron in loaded.neurons] == [neuron.id for neuron in layer.neurons]
+    assert all(isinstance(neuron, Neuron) for neuron in loaded.neurons)
+    for neuron, original in zip(loaded.neurons, layer.neurons):
+        np.testing.assert_allclose(neuron.weight, original.weight)
+        assert neuron.bias == pytest.approx(original.bias)
+
+
+def test_connections_are_decoded_in_columns():
+    topology = Topology()
+    for i in range(3):
+        topology.add_connection(Connection(start=f"a{i}", end=f"b{i}", weight=i / 4, bias=0.5))
+    loaded = Topology.from_json(topology.to_json())
+    assert isinstance(loaded.connections.columns()["weight"], np.ndarray)
+    assert [(c.start, c.end, c.weight, c.bias) for c in loaded.connections] == [
+        ("a0", "b0", 0.0, 0.5), ("a1", "b1", 0.25, 0.5), ("a2", "b2", 0.5, 0.5)]
+
+
+def test_mixed_records_fall_back_to_item_decoding():
+    document = {"layers": [], "connections": [
+        {"start": "a", "end": "b", "weight": 1.0, "bias": None},
+        {"start": "b", "end": "c", "weight": 2, "bias": 0.5},
+    ]}
+    loaded = Topology.from_json(orjson.dumps(document))
+    assert [(c.start, c.end, c.weight) for c in loaded.connections] == [("a", "b", 1.0), ("b", "c", 2.0)]
+    assert list(loaded.connections)[0].bias is None
+
+
+def test_absent_fields_keep_their_defaults():
+    document = {"index": 1, "type": "Dense", "name": "d", "units": 1, "input_shape": [None, 1],
+                "output_shape": [None, 1], "activation_function": "relu",
+                "neurons": [{"id": "n", "layer_index": 1, "weight": [0.5], "bias": 0.0}]}
+    layer = Layer.from_json(orjson.dumps(document))
+    assert layer.neurons[0].activation_function is None
+    assert layer.neurons[0].stats is None
+
+
+def test_only_dataclasses_can_be_decoded():
+    class Plain(Serializable):
+        pass
+
+    with pytest.raises(TypeError):
+        Plain.from_json("{}")
@@ -0,0 +1,88 @@
+import io
+
+import orjson
+import pytest
+
+from core.src.json_stream import JsonStreamWriter, StreamedObject, write_json_array, write_json_document
+from core.src.models import Connection, NeuronStats
+from core.tests.conftest import build_topology
+
+
+class _Socket:
+    def __init__(self):
+        self.sent = []
+
+    def sendall(self, data):
+        self.sent.append(data)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 64, 1 << 20])
+def test_topology_stream_matches_to_json(chunk_size):
+    topology = build_topology()
+    topology.add_connection(Connection(start="Dense_0_0", end="Dense_3_1", weight=0.5, bias=None))
+    topology.metadata["source"] = "test"
+    target = io.BytesIO()
+    topology.write_json(target, chunk_size=chunk_size)
+    assert target.getvalue().decode() == topology.to_json()
+
+
+def test_compact_and_quantized_streams_decode_like_to_json():
+    topology = build_topology()
+    for precision in (None, "float16"):
+        target = io.BytesIO()
+        topology.write_json(target, compact=True, precision=precision)
+        assert b"\n" not in target.getvalue()
+        assert orjson.loads(target.getvalue()) == orjson.loads(topology.to_json(precision=precision))
+
+
+def test_text_and_socket_targets():
+    topology = build_topology(sizes=(3, 2))
+    text = io.StringIO()
+    topology.write_json(text)
+    assert text.getvalue() == topology.to_json()
+
+    socket = _Socket()
+    topology.write_json(socket, chunk_size=16)
+    assert len(socket.sent) > 1
+    assert b"".join(socket.sent).decode() == topology.to_json()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("items", [[], [1], list(range(10)), [{"a": [1, 2]}, {"b": None}]])
+def test_arrays_match_orjson(items, compact):
+    option = 0 if compact else orjson.OPT_INDENT_2
+    target = io.BytesIO()
+    writer = JsonStreamWriter(target)
+    write_json_document(writer, {"items": iter(items), "meta": {"n": len(items)}}, compact=compact, batch_size=3)
+    assert target.getvalue() == orjson.dumps({"items": items, "meta": {"n": len(items)}}, option=option)
+
+
+def test_writer_flushes_in_chunks():
+    target = io.BytesIO()
+    writer = JsonStreamWriter(target, chunk_size=8)
+    write_json_array(writer, range(100), compact=True, batch_size=7)
+    writer.flush()
+    assert orjson.loads(target.getvalue()) == list(range(100))
+
+
+def test_large_layers_are_written_in_small_pieces():
+    topology = build_topology(sizes=(300, 400))
+    topology.get_layer(1).neurons[5].stats = NeuronStats(count=2, mean=0.5, variance=0.25, sparsity=0.0,
+                                                         min=0.0, max=1.0, histogram=[1, 1], histogram_range=[0, 1])
+    socket = _Socket()
+    topology.write_json(socket, chunk_size=4096)
+    document = b"".join(socket.sent)
+    assert document.decode() == topology.to_json()
+    assert max(map(len, socket.sent)) < len(document) // 50
+
+
+@pytest.mark.parametrize("compact", [False, True])
+@pytest.mark.parametrize("items", [[], [{"x": 1}], [{"x": [1.5, 2]}, {"y": None}] * 3])
+def test_streamed_objects_match_orjson(items, compact):
+    option = 0 if compact else orjson.OPT_INDENT_2
+    head = {"name": "layer", "shape": [None, 3]}
+    records = [{"id": 0}, StreamedObject(head, "items", iter(items)), {"id": 2}, StreamedObject({}, "items", [])]
+    expected = [{"id": 0}, {**head, "items": items}, {"id": 2}, {"items": []}]
+    target = io.BytesIO()
+    write_json_document(JsonStreamWriter(target, chunk_size=8), {"records": records}, compact=compact, batch_size=2)
+    assert target.getvalue() == orjson.dumps({"records": expected}, option=option)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from core.src.layout import compute_layout, get_layout
+from core.src.models import Layer, Neuron
+from core.tests.conftest import build_topology
+
+
+def _crossings(topology, layout, start, end):
+    kernel = np.abs(topology.get_weights(end).kernel)
+    y = dict(zip(layout.ids, layout.y))
+    edges = [(y[f"Dense_{start}_{i}"], y[f"Dense_{end}_{j}"], kernel[i, j])
+             for i in range(kernel.shape[0]) for j in range(kernel.shape[1])]
+    return sum(w1 * w2 for a1, b1, w1 in edges for a2, b2, w2 in edges if (a1 - a2) * (b1 - b2) < 0)
+
+
+def test_index_layout():
+    layout = compute_layout(build_topology(sizes=(3, 2)), layer_spacing=2.0, node_spacing=0.5)
+    assert layout.ids == ["Dense_0_0", "Dense_0_1", "Dense_0_2", "Dense_1_0", "Dense_1_1"]
+    np.testing.assert_array_equal(layout.x, [0, 0, 0, 2, 2])
+    np.testing.assert_array_equal(layout.y, [-0.5, 0, 0.5, -0.25, 0.25])
+    np.testing.assert_array_equal(layout.offsets, [0, 3, 5])
+
+
+def test_barycenter_layout_permutes_each_layer_and_reduces_crossings():
+    topology = build_topology(sizes=(8, 8))
+    kernel = topology.get_weights(1).kernel
+    # Neuron j of layer 1 is fed by neuron 7 - j only
+    kernel[:] = np.fliplr(np.eye(8, dtype=np.float32))
+    index, barycenter = compute_layout(topology), compute_layout(topology, order="barycenter")
+    for k in range(2):
+        positions = slice(barycenter.offsets[k], barycenter.offsets[k + 1])
+        assert sorted(barycenter.y[positions].tolist()) == sorted(index.y[positions].tolist())
+    assert _crossings(topology, barycenter, 0, 1) == 0 < _crossings(topology, index, 0, 1)
+
+
+def test_empty_topology():
+    layout = compute_layout(build_topology(sizes=()))
+    assert (layout.ids, layout.x.size, layout.offsets.tolist()) == ([], 0, [0])
+
+
+def test_unknown_order():
+    with pytest.raises(ValueError):
+        compute_layout(build_topology(), order="random")
+
+
+def test_cached_layout_follows_structure_changes():
+    topology = build_topology(sizes=(3, 2))
+    layout = get_layout(topology)
+    assert get_layout(topology) is layout
+    assert get_layout(topology, node_spacing=2.0) is not layout
+    layer = Layer(index=2, type="Dense", name="dense_2", units=1, input_shape=[None, 2], output_shape=[None, 1],
+                  activation_function="relu", neurons=[Neuron(id="Dense_2_0", layer_index=2, weight=None, bias=0.0)])
+    topology.add_layer(layer)
+    assert get_layout(topology).ids[-1] == "Dense_2_0"
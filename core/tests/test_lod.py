@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from core.src.lod import build_pyramid
+from core.src.models import Topology
+from core.tests.conftest import build_topology
+
+
+def test_levels_until_max_groups():
+    topology = build_topology(sizes=(64, 40, 10))
+    pyramid = build_pyramid(topology, factor=4, max_groups=4)
+    assert topology.pyramid is pyramid
+    assert [level.group_size for level in pyramid.levels] == [16, 4]
+    assert [level.groups for level in pyramid.levels] == [[4, 3, 1], [16, 10, 3]]
+
+
+def test_edges_are_group_means():
+    topology = build_topology(sizes=(8, 6))
+    pyramid = build_pyramid(topology, factor=4, max_groups=2)
+    edges = pyramid.edges(0, 0, 1)
+    kernel = topology.get_weights(1).kernel.astype(np.float64)
+    assert edges.mean_weight.shape == (2, 2)
+    np.testing.assert_allclose(edges.mean_weight[0, 1], kernel[:4, 4:].mean(), rtol=1e-6)
+    np.testing.assert_allclose(edges.mean_abs_weight[1, 0], np.abs(kernel[4:, :4]).mean(), rtol=1e-6)
+    assert pyramid.edges(0, 1, 0) is None
+
+
+def test_groups_nest_and_cover_every_neuron():
+    topology = build_topology(sizes=(16, 32))
+    pyramid = build_pyramid(topology, method="similarity", factor=2, max_groups=4)
+    order = np.asarray(pyramid.layers[1].order)
+    assert sorted(order.tolist()) == list(range(32))
+    finest = len(pyramid.levels) - 1
+    for group in range(pyramid.levels[0].groups[1]):
+        units = [unit for child in pyramid.children(0, 1, group)
+                 for unit in pyramid.members(1, 1, child).tolist()]
+        assert units == pyramid.members(0, 1, group).tolist()
+    assert pyramid.children(finest, 1, 0) == pyramid.members(finest, 1, 0).tolist()
+    with pytest.raises(KeyError):
+        pyramid.members(0, 5, 0)
+
+
+def test_similarity_groups_similar_neurons():
+    topology = build_topology(sizes=(4, 8))
+    kernel = topology.get_weights(1).kernel
+    direction = np.array([1.0, -1.0, 0.5, 2.0], dtype=np.float32)
+    kernel[:] = np.outer(direction, [3, -3, 2, -2, 1, -1, 4, -4])
+    order = build_pyramid(topology, method="similarity", factor=2, max_groups=1).layers[1].order
+    signs = np.sign([3, -3, 2, -2, 1, -1, 4, -4])[order]
+    assert set(signs[:4].tolist()) == {signs[0]} and set(signs[4:].tolist()) == {-signs[0]}
+
+
+def test_pyramid_round_trips(tmp_path):
+    topology = build_topology(sizes=(16, 12))
+    build_pyramid(topology, factor=2, max_groups=3)
+    path = str(tmp_path / "topology.nnvb")
+    topology.save_binary(path)
+    for loaded in (Topology.from_json(topology.to_json()), Topology.load_binary(path)):
+        assert [level.groups for level in loaded.pyramid.levels] == [level.groups for level in topology.pyramid.levels]
+        np.testing.assert_allclose(loaded.pyramid.edges(0, 0, 1).mean_weight, topology.pyramid.edges(0, 0, 1).mean_weight)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        build_pyramid(build_topology(), method="random")
+    with pytest.raises(ValueError):
+        build_pyramid(build_topology(), factor=1)
@@ -0,0 +1,52 @@
+import io
+
+import numpy as np
+import orjson
+
+from core.src.models import NeuronStats, Topology
+from core.tests.conftest import build_topology
+
+
+def _with_stats(topology, layer_index=2):
+    for unit, neuron in enumerate(topology.get_layer(layer_index).neurons):
+        neuron.stats = NeuronStats(count=10, mean=0.1 + unit / 3, variance=1 / 7, sparsity=0.25,
+                                   min=-1 / 3, max=2 / 3, histogram=[3, 7], histogram_range=[-1.0, 1.0])
+    return topology
+
+
+def _neurons(document):
+    return [neuron for layer in document["layers"] for neuron in layer["neurons"]]
+
+
+def test_neurons_without_stats_have_no_stats_key():
+    topology = build_topology()
+    for document in (orjson.loads(topology.to_json()), orjson.loads(topology.to_json(precision="float16"))):
+        assert all("stats" not in neuron for neuron in _neurons(document))
+
+
+def test_stats_json_round_trip_keeps_float64():
+    topology = _with_stats(build_topology())
+    document = orjson.loads(topology.to_json())
+    assert sum("stats" in neuron for neuron in _neurons(document)) == 4
+
+    loaded = Topology.from_json(topology.to_json())
+    for original, neuron in zip(topology.get_layer(2).neurons, loaded.get_layer(2).neurons):
+        assert neuron.stats == original.stats
+        assert isinstance(neuron.stats.mean, np.float64)
+    assert all(neuron.stats is None for neuron in loaded.get_layer(1).neurons)
+
+
+def test_stats_stream_matches_to_json():
+    topology = _with_stats(build_topology())
+    target = io.BytesIO()
+    topology.write_json(target)
+    assert target.getvalue().decode() == topology.to_json()
+
+
+def test_stats_binary_round_trip(tmp_path):
+    topology = _with_stats(build_topology())
+    path = str(tmp_path / "topology.nnvb")
+    topology.save_binary(path)
+    loaded = Topology.load_binary(path)
+    assert [neuron.stats for neuron in loaded.get_layer(2).neurons] == [neuron.stats for neuron in topology.get_layer(2).neurons]
+    assert all(neuron.stats is None for neuron in loaded.get_layer(3).neurons)
@@ -0,0 +1,72 @@
+import numpy as np
+import orjson
+import pytest
+
+from core.src.models import ADJACENCY_SLACK, Connection, Topology
+from core.tests.conftest import build_topology
+
+
+def test_incoming_and_outgoing_see_edges_added_after_a_lookup(topology):
+    topology.add_connection(Connection(start="Dense_1_0", end="Dense_3_0", weight=0.5, bias=None))
+    assert [c.start for c in topology.incoming("Dense_3_0")].count("Dense_1_0") == 1
+
+    topology.add_connection(Connection(start="Dense_1_1", end="Dense_3_0", weight=0.25, bias=None))
+    topology.add_connection(Connection(start="outside", end="Dense_3_0", weight=1.0, bias=0.0))
+    starts = [c.start for c in topology.incoming("Dense_3_0")]
+    assert {"Dense_1_0", "Dense_1_1", "outside"} <= set(starts)
+    assert [c.end for c in topology.outgoing("outside")] == ["Dense_3_0"]
+    assert topology.get_connection("Dense_1_1", "Dense_3_0").weight == 0.25
+
+
+def test_adjacency_is_not_rebuilt_on_every_insert(topology):
+    for number in range(ADJACENCY_SLACK + 1):
+        topology.add_connection(Connection(start=f"a{number}", end="b", weight=1.0, bias=None))
+    index = topology._adjacency["end"]
+    for number in range(10):
+        topology.add_connection(Connection(start=f"s{number}", end="b", weight=1.0, bias=None))
+        assert len(topology.incoming("b")) == ADJACENCY_SLACK + number + 2
+    assert topology._adjacency["end"] is index
+
+
+def test_lookups_across_adjacency_rebuilds(topology):
+    for number in range(3 * ADJACENCY_SLACK):
+        topology.add_connection(Connection(start=f"s{number % 7}", end=f"e{number}", weight=number, bias=None))
+        if number % 97 == 0:
+            assert len(topology.outgoing(f"s{number % 7}")) == number // 7 + 1
+            assert [c.start for c in topology.incoming(f"e{number}")] == [f"s{number % 7}"]
+    assert topology._adjacency
+    assert len(topology.outgoing("s3")) == len(range(3, 3 * ADJACENCY_SLACK, 7))
+    assert sorted(c.weight for c in topology.outgoing("s3")) == list(range(3, 3 * ADJACENCY_SLACK, 7))
+    assert topology.get_connection("s4", f"e{3 * ADJACENCY_SLACK - 1}") is None
+    assert topology.get_connection("s5", "e2000").weight == 2000
+
+
+def test_connection_table_round_trips_through_json(topology):
+    topology.add_connection(Connection(start="Dense_1_0", end="Dense_3_2", weight=0.5, bias=None))
+    loaded = Topology.from_json(topology.to_json())
+    assert list(loaded.connections) == list(topology.connections)
+    assert len(loaded.weights) == len(topology.weights)
+
+
+def test_leading_edge_to_an_unknown_neuron_does_not_stop_folding():
+    topology = build_topology()
+    document = orjson.loads(topology.to_json())
+    document["connections"].insert(0, {"start": "input_x", "end": "Dense_1_0", "weight": 1.0, "bias": None})
+
+    loaded = Topology.from_json(orjson.dumps(document))
+
+    assert [block.end_layer for block in loaded.weights] == [1, 2, 3]
+    assert len(loaded.connections) == 1
+    assert loaded.get_connection("input_x", "Dense_1_0").weight == 1.0
+
+
+def test_duplicates_are_found_in_indexed_and_buffered_connections(topology):
+    for number in range(ADJACENCY_SLACK + 5):
+        topology.add_connection(Connection(start=f"s{number % 3}", end=f"e{number}", weight=1.0, bias=None))
+    assert topology._indexed == ADJACENCY_SLACK + 1
+    assert topology._edge_keys.dtype == np.int64 and len(topology._edge_keys) == ADJACENCY_SLACK + 1
+    for number in (0, ADJACENCY_SLACK, ADJACENCY_SLACK + 4):
+        with pytest.raises(ValueError):
+            topology.add_connection(Connection(start=f"s{number % 3}", end=f"e{number}", weight=2.0, bias=None))
+        assert topology.get_connection(f"s{number % 3}", f"e{number}").weight == 1.0
+    assert len(topology.connections) == ADJACENCY_SLACK + 5
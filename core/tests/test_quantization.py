@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from core.src.quantization import QuantizedArray, quantize
+
+
+def _weights(seed=0):
+    return np.random.default_rng(seed).normal(0.5, 2.0, (32, 16)).astype(np.float32)
+
+
+def test_int8_error_within_half_a_step():
+    weights = _weights()
+    quantized = quantize(weights, "int8")
+    restored = quantized.dequantize()
+    assert quantized.codes.dtype == np.int8 and restored.dtype == np.float32
+    error = np.abs(restored.astype(np.float64) - weights)
+    assert error.max() <= quantized.scale / 2 * (1 + 1e-5)
+    assert quantized.max_error == pytest.approx(error.max(), rel=1e-6)
+
+
+def test_int8_keeps_zero_exact():
+    weights = np.array([0.0, 0.1, 0.7, 3.0], dtype=np.float32)
+    assert quantize(weights, "int8").dequantize()[0] == 0.0
+    # The range is widened to include 0 for one-signed arrays
+    quantized = quantize(-weights[1:], "int8")
+    assert quantized.dequantize(np.float64).max() <= quantized.max_error
+
+
+def test_float16_relative_error():
+    weights = _weights()
+    quantized = quantize(weights, "float16")
+    assert quantized.codes.dtype == np.float16
+    relative = np.abs(quantized.dequantize(np.float64) - weights) / np.abs(weights)
+    assert relative.max() <= 2.0 ** -11
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_encode_decode_round_trip(precision):
+    quantized = quantize(_weights(), precision)
+    decoded = QuantizedArray.decode(quantized.encode(), list(quantized.codes.shape), quantized.params())
+    assert decoded.params() == quantized.params()
+    np.testing.assert_array_equal(decoded.codes, quantized.codes)
+    np.testing.assert_array_equal(decoded.dequantize(), quantized.dequantize())
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_empty_and_constant_arrays(precision):
+    assert quantize(np.empty((0, 3), dtype=np.float32), precision).max_error == 0.0
+    constant = np.full(4, 0.0, dtype=np.float32)
+    np.testing.assert_array_equal(quantize(constant, precision).dequantize(), constant)
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        quantize(_weights(), "int4")
+    with pytest.raises(ValueError):
+        quantize(np.array([1.0, np.nan]), "int8")
+    with pytest.raises(ValueError):
+        quantize(np.array([1e6]), "float16")
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from core.src.layout import compute_layout
+from core.src.render import build_traces
+from core.tests.conftest import build_topology
+
+
+def _edge_weights(traces, topology, layout):
+    """Recovers the weight of every drawn edge from its endpoint coordinates."""
+    kernel = topology.get_weights(1).kernel
+    rows = {y: i for i, y in enumerate(layout.y[layout.offsets[0]:layout.offsets[1]])}
+    columns = {y: j for j, y in enumerate(layout.y[layout.offsets[1]:layout.offsets[2]])}
+    return sorted(float(kernel[rows[start], columns[end]])
+                  for edge in traces.edges for start, end in zip(edge.y[0::3], edge.y[1::3]))
+
+
+def test_edges_are_binned_by_weight():
+    topology = build_topology(sizes=(4, 3))
+    traces = build_traces(topology, bins=4)
+    kernel = topology.get_weights(1).kernel
+    assert traces.edges_total == kernel.size
+    assert sum(edge.count for edge in traces.edges) == kernel.size
+    assert traces.node_ids == [neuron.id for layer in topology.layers for neuron in layer.neurons]
+    for edge in traces.edges:
+        assert edge.x.size == edge.y.size == 3 * edge.count
+        assert np.isnan(edge.x[2::3]).all() and np.isnan(edge.y[2::3]).all()
+        np.testing.assert_array_equal(edge.x[0::3], 0.0)
+        np.testing.assert_array_equal(edge.x[1::3], 1.0)
+    weights = _edge_weights(traces, topology, compute_layout(topology))
+    np.testing.assert_allclose(weights, np.sort(kernel.ravel()))
+    for edge in traces.edges:
+        assert edge.low < edge.high
+
+
+def test_masked_edges_are_skipped():
+    topology = build_topology(sizes=(4, 3))
+    block = topology.get_weights(1)
+    block.mask = np.eye(4, 3, dtype=bool)
+    traces = build_traces(topology)
+    assert traces.edges_total == 3
+
+
+def test_magnitude_decimation_keeps_largest_edges():
+    topology = build_topology(sizes=(6, 5))
+    traces = build_traces(topology, max_edges=7)
+    kernel = topology.get_weights(1).kernel
+    assert traces.edges_total == kernel.size
+    assert sum(edge.count for edge in traces.edges) == 7
+    largest = np.sort(np.abs(kernel.ravel()))[-7:]
+    weights = _edge_weights(traces, topology, compute_layout(topology))
+    np.testing.assert_allclose(np.sort(np.abs(weights)), largest)
+
+
+def test_random_decimation_is_seeded():
+    topology = build_topology(sizes=(6, 5))
+    first = build_traces(topology, max_edges=7, decimate="random", seed=3)
+    second = build_traces(topology, max_edges=7, decimate="random", seed=3)
+    assert sum(edge.count for edge in first.edges) == 7
+    for a, b in zip(first.edges, second.edges, strict=True):
+        np.testing.assert_array_equal(a.y, b.y)
+
+
+def test_input_blocks_are_not_drawn():
+    topology = build_topology(sizes=(4, 3), with_input_block=True)
+    traces = build_traces(topology)
+    assert traces.edges_total == sum(edge.count for edge in traces.edges) == 4 * 3
+    assert traces.edges_total == len(list(topology.iter_connections()))
+
+
+def test_no_edges():
+    traces = build_traces(build_topology(sizes=(3,)))
+    assert traces.edges == [] and traces.edges_total == 0 and len(traces.node_ids) == 3
+
+
+def test_unknown_decimation():
+    with pytest.raises(ValueError):
+        build_traces(build_topology(), decimate="stride")
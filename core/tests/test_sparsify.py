@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from core.src.sparsify import STRATEGIES, select_edges
+
+
+def kernels(seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.standard_normal((8, 6)), rng.standard_normal((6, 4))]
+
+
+@pytest.mark.parametrize("strategy", ["topk", "per_neuron_topk", "sample"])
+@pytest.mark.parametrize("budget", [0, 3, 10, 25, 80])
+def test_budget_is_an_upper_bound(strategy, budget):
+    masks = select_edges(kernels(), strategy=strategy, budget=budget)
+    kept = sum(int(mask.sum()) for mask in masks)
+    assert kept <= budget
+    if strategy == "topk" or budget < 10:
+        assert kept == min(budget, 8 * 6 + 6 * 4)
+
+
+def test_per_neuron_topk_under_budget_keeps_the_strongest_edges():
+    weights = kernels()
+    masks = select_edges(weights, strategy="per_neuron_topk", budget=3)
+    kept = np.sort(np.concatenate([np.abs(w)[m] for w, m in zip(weights, masks)]))
+    strongest_per_neuron = np.sort(np.concatenate([np.abs(w).max(axis=0) for w in weights]))
+    assert np.array_equal(kept, strongest_per_neuron[-3:])
+
+
+def test_per_neuron_topk_keeps_the_same_number_per_neuron():
+    masks = select_edges(kernels(), strategy="per_neuron_topk", budget=20)
+    assert all((mask.sum(axis=0) == 2).all() for mask in masks)
+
+
+def test_threshold_keeps_edges_at_or_above_it():
+    weights = kernels()
+    masks = select_edges(weights, strategy="threshold", threshold=1.0)
+    for weight, mask in zip(weights, masks):
+        assert np.array_equal(mask, np.abs(weight) >= 1.0)
+
+
+def test_sample_is_seeded():
+    first = select_edges(kernels(), strategy="sample", budget=20, seed=3)
+    second = select_edges(kernels(), strategy="sample", budget=20, seed=3)
+    assert all(np.array_equal(a, b) for a, b in zip(first, second))
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        select_edges(kernels(), strategy="nope", budget=1)
+    with pytest.raises(ValueError):
+        select_edges(kernels(), strategy="threshold")
+    for strategy in set(STRATEGIES) - {"threshold"}:
+        with pytest.raises(ValueError):
+            select_edges(kernels(), strategy=strategy)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from core.src.state_tree_serialization import (  # noqa: E402
+    load_state_tree_from_binary,
+    load_state_tree_variable,
+    save_state_tree_binary,
+)
+
+
+def _tree():
+    return {
+        "dense": {
+            "kernel": tf.Variable(np.arange(6, dtype=np.float32).reshape(2, 3), name="kernel"),
+            "bias": tf.Variable(np.ones(3, dtype=np.float32), name="bias"),
+        },
+        "optimizer": {
+            "moments": np.array([[0.5, -1.25], [np.nan, np.inf]]),
+            "counts": np.arange(5, dtype=np.int16),
+            "step": np.int64(7),
+        },
+        "flag": True,
+        "empty": {},
+    }
+
+
+@pytest.fixture
+def path(tmp_path):
+    file_path = str(tmp_path / "state_tree.nnvb")
+    save_state_tree_binary(_tree(), file_path)
+    return file_path
+
+
+def test_round_trip(path):
+    tree = _tree()
+    loaded = load_state_tree_from_binary(path)
+    assert isinstance(loaded["dense"]["kernel"], tf.Variable)
+    assert loaded["dense"]["kernel"].name.startswith("kernel")
+    np.testing.assert_array_equal(loaded["dense"]["kernel"].numpy(), tree["dense"]["kernel"].numpy())
+    np.testing.assert_array_equal(loaded["dense"]["bias"].numpy(), tree["dense"]["bias"].numpy())
+    np.testing.assert_array_equal(loaded["optimizer"]["moments"], tree["optimizer"]["moments"])
+    assert loaded["optimizer"]["counts"].dtype == np.int16
+    np.testing.assert_array_equal(loaded["optimizer"]["counts"], tree["optimizer"]["counts"])
+    assert (loaded["optimizer"]["step"], loaded["flag"], loaded["empty"]) == (7, True, {})
+
+
+def test_arrays_instead_of_variables(path):
+    loaded = load_state_tree_from_binary(path, as_variables=False)
+    kernel = loaded["dense"]["kernel"]
+    assert isinstance(kernel, np.ndarray) and kernel.dtype == np.float32 and kernel.shape == (2, 3)
+    np.testing.assert_array_equal(kernel, np.arange(6).reshape(2, 3))
+    # Memory-mapped read-only, not copied
+    assert not kernel.flags.writeable
+
+
+def test_path_selection(path):
+    loaded = load_state_tree_from_binary(path, paths=["dense/bias", "optimizer/"], as_variables=False)
+    assert set(loaded) == {"dense", "optimizer"}
+    assert set(loaded["dense"]) == {"bias"}
+    assert set(loaded["optimizer"]) == {"moments", "counts", "step"}
+    # A prefix only matches whole path components
+    assert load_state_tree_from_binary(path, paths=["dense/b"]) == {}
+
+
+def test_single_variable(path):
+    np.testing.assert_array_equal(load_state_tree_variable(path, "optimizer/counts"), np.arange(5))
+    variable = load_state_tree_variable(path, "dense/kernel", as_variable=True)
+    assert isinstance(variable, tf.Variable)
+    assert load_state_tree_variable(path, "optimizer/step") == 7
+    with pytest.raises(KeyError):
+        load_state_tree_variable(path, "dense")
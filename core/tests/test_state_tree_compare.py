@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from core.src.state_tree_compare import compare_state_tree_report
+
+
+def _tree(bias):
+    return {"dense": {"kernel": np.arange(6, dtype=np.float32).reshape(2, 3), "bias": np.array(bias, dtype=np.float32)}}
+
+
+def test_self_comparison_with_non_finite_values_is_equal():
+    tree = _tree([np.nan, np.inf, -np.inf, 1.0])
+    report = compare_state_tree_report(tree, tree, equal_nan=True)
+    assert report.equal, report.summary()
+    bias = next(variable for variable in report.variables if variable.path == "dense/bias")
+    assert (bias.mismatches, bias.max_abs_error, bias.max_rel_error) == (0, 0.0, 0.0)
+
+
+def test_nan_differs_without_equal_nan():
+    tree = _tree([np.nan, np.inf, -np.inf, 1.0])
+    report = compare_state_tree_report(tree, tree)
+    bias = next(variable for variable in report.variables if variable.path == "dense/bias")
+    assert bias.status == "values"
+    assert bias.mismatches == 1
+    assert bias.worst_indices == [(0,)]
+
+
+@pytest.mark.parametrize("other", [-np.inf, 1.0, np.nan])
+def test_infinity_differs_from_other_values(other):
+    report = compare_state_tree_report(_tree([np.inf, 0.0]), _tree([other, 0.0]), equal_nan=True)
+    bias = next(variable for variable in report.variables if variable.path == "dense/bias")
+    assert bias.mismatches == 1
+    assert bias.worst_indices == [(0,)]
+
+
+def test_tolerance_and_worst_indices():
+    kernel = np.zeros((4, 5), dtype=np.float64)
+    changed = kernel.copy()
+    changed[1, 2] = 1e-9
+    changed[3, 4] = 0.5
+    changed[0, 1] = 0.25
+    report = compare_state_tree_report({"k": kernel}, {"k": changed}, top_k=2, chunk_elements=3)
+    (diff,) = report.variables
+    assert diff.mismatches == 2
+    assert diff.max_abs_error == pytest.approx(0.5)
+    assert diff.worst_indices == [(3, 4), (0, 1)]
+
+
+def test_structural_differences():
+    tree1 = {"a": np.zeros(3), "b": np.zeros(2), "c": 1}
+    tree2 = {"a": np.zeros(4), "b": np.zeros(2, dtype=np.int32), "d": 1}
+    statuses = {diff.path: diff.status for diff in compare_state_tree_report(tree1, tree2).variables}
+    assert statuses == {"a": "shape", "b": "dtype", "c": "unexpected", "d": "missing"}
@@ -0,0 +1,54 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from core.src.state_tree_serialization import (  # noqa: E402
+    deserialize_variable,
+    serialize_state_tree,
+    write_state_tree_json,
+)
+
+
+def _tree():
+    return {
+        "dense": {
+            "kernel": tf.Variable(np.arange(6, dtype=np.float32).reshape(2, 3), name="kernel"),
+            "bias": tf.Variable(np.zeros(3, dtype=np.float32), name="bias"),
+        },
+        "moments": np.array([0.5, -1.25]),
+        "step": np.int64(7),
+        "scale": np.float32(0.5),
+        "flag": True,
+        "empty": {},
+    }
+
+
+def test_stream_matches_json_dump():
+    tree = _tree()
+    target = io.StringIO()
+    write_state_tree_json(tree, target, chunk_size=32)
+    assert target.getvalue() == json.dumps(serialize_state_tree(tree), indent=4)
+
+
+def test_compact_stream_round_trip():
+    tree = _tree()
+    target = io.BytesIO()
+    write_state_tree_json(tree, target, compact=True)
+    assert b"\n" not in target.getvalue()
+    loaded = deserialize_variable(json.loads(target.getvalue()))
+    np.testing.assert_array_equal(loaded["dense"]["kernel"].numpy(), tree["dense"]["kernel"].numpy())
+    np.testing.assert_array_equal(loaded["moments"], tree["moments"])
+    assert (loaded["step"], loaded["scale"], loaded["flag"], loaded["empty"]) == (7, 0.5, True, {})
+
+
+def test_quantized_stream():
+    tree = {"weights": np.linspace(-1, 1, 64, dtype=np.float32).reshape(8, 8)}
+    target = io.StringIO()
+    write_state_tree_json(tree, target, precision="int8")
+    loaded = deserialize_variable(json.loads(target.getvalue()))
+    assert loaded["weights"].dtype == np.float32
+    np.testing.assert_allclose(loaded["weights"], tree["weights"], atol=1 / 127)
@@ -0,0 +1,74 @@
+import gzip
+import io
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from core.src.state_tree_serialization import write_state_tree_json  # noqa: E402
+from core.src.state_tree_stream import load_state_tree_from_json_stream  # noqa: E402
+
+
+def _tree():
+    return {
+        "dense": {
+            "kernel": tf.Variable(np.linspace(-1, 1, 600, dtype=np.float32).reshape(20, 30), name="kernel"),
+            "bias": tf.Variable(np.arange(30, dtype=np.float32), name="bias"),
+        },
+        "optimizer": {
+            "moments": np.array([[1e-30, -2.5e12], [np.nan, -np.inf]]),
+            "counts": np.arange(-3, 4, dtype=np.int32),
+            "step": np.int64(7),
+        },
+        "flag": True,
+        "empty": {},
+    }
+
+
+def _document(tree, **options):
+    target = io.StringIO()
+    write_state_tree_json(tree, target, **options)
+    return target.getvalue()
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_round_trip_with_small_windows(compact):
+    tree = _tree()
+    loaded = load_state_tree_from_json_stream(io.StringIO(_document(tree, compact=compact)), chunk_size=7)
+    np.testing.assert_array_equal(loaded["dense"]["kernel"].numpy(), tree["dense"]["kernel"].numpy())
+    np.testing.assert_array_equal(loaded["dense"]["bias"].numpy(), tree["dense"]["bias"].numpy())
+    np.testing.assert_array_equal(loaded["optimizer"]["moments"], tree["optimizer"]["moments"])
+    assert loaded["optimizer"]["counts"].dtype == np.int32
+    np.testing.assert_array_equal(loaded["optimizer"]["counts"], tree["optimizer"]["counts"])
+    assert (loaded["optimizer"]["step"], loaded["flag"], loaded["empty"]) == (7, True, {})
+
+
+def test_path_selection():
+    document = _document(_tree())
+    loaded = load_state_tree_from_json_stream(io.StringIO(document), paths=["dense/bias", "optimizer/step"])
+    assert set(loaded) == {"dense", "optimizer"}
+    assert set(loaded["dense"]) == {"bias"} and set(loaded["optimizer"]) == {"step"}
+    assert load_state_tree_from_json_stream(io.StringIO(document), paths=["missing"]) == {}
+
+
+def test_compressed_file(tmp_path):
+    tree = _tree()
+    file_path = tmp_path / "state_tree.json.gz"
+    file_path.write_bytes(gzip.compress(_document(tree).encode()))
+    loaded = load_state_tree_from_json_stream(str(file_path), paths=["dense"], chunk_size=64)
+    np.testing.assert_array_equal(loaded["dense"]["kernel"].numpy(), tree["dense"]["kernel"].numpy())
+    assert set(loaded) == {"dense"}
+
+
+def test_quantized_arrays():
+    weights = np.linspace(-1, 1, 64, dtype=np.float32).reshape(8, 8)
+    loaded = load_state_tree_from_json_stream(io.StringIO(_document({"weights": weights}, precision="float16")))
+    assert loaded["weights"].dtype == np.float32
+    np.testing.assert_allclose(loaded["weights"], weights, atol=1e-3)
+
+
+def test_truncated_document():
+    document = _document(_tree())
+    with pytest.raises(ValueError):
+        load_state_tree_from_json_stream(io.StringIO(document[:len(document) // 2]), chunk_size=16)
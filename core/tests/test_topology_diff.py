@@ -0,0 +1,86 @@
+import json
+
+import numpy as np
+import pytest
+
+from core.src.models import Connection
+from core.src.topology_diff import diff_topologies
+from core.tests.conftest import build_topology
+
+
+def test_identical_topologies():
+    diff = diff_topologies(build_topology(), build_topology())
+    assert [layer.status for layer in diff.layers] == ["unchanged"] * 3
+    assert (diff.edges, diff.neurons) == ([], [])
+
+
+def test_layer_statistics_and_top_changes():
+    before, after = build_topology(), build_topology()
+    kernel = after.get_weights(2).kernel
+    original = kernel.copy()
+    kernel[1, 2] += 3.0
+    kernel[4, 0] -= 0.5
+    after.get_weights(3).bias[1] += 0.25
+
+    diff = diff_topologies(before, after, top_k=2)
+    layers = {layer.end_layer: layer for layer in diff.layers}
+    assert layers[1].status == "unchanged"
+    assert layers[3].status == "changed" and layers[3].edges_changed == 0
+    assert layers[3].bias_max_abs_delta == pytest.approx(0.25)
+
+    changed = layers[2]
+    assert (changed.status, changed.edges, changed.edges_changed) == ("changed", 20, 2)
+    assert changed.max_abs_delta == pytest.approx(3.0)
+    assert changed.mean_abs_delta == pytest.approx(3.5 / 20)
+    assert changed.rms_delta == pytest.approx(np.sqrt((9 + 0.25) / 20))
+    assert changed.relative_change == pytest.approx(np.sqrt(9.25) / np.linalg.norm(original.astype(np.float64)))
+
+    assert [(edge.start, edge.end) for edge in diff.edges] == [("Dense_1_1", "Dense_2_2"), ("Dense_1_4", "Dense_2_0")]
+    assert diff.edges[0].delta == pytest.approx(3.0)
+    assert diff.edges[0].before == pytest.approx(float(original[1, 2]))
+    assert [neuron.id for neuron in diff.neurons] == ["Dense_2_2", "Dense_2_0"]
+    assert diff.neurons[0].score == pytest.approx(3.0)
+
+
+def test_tolerance_hides_small_changes():
+    before, after = build_topology(), build_topology()
+    after.get_weights(1).kernel[0, 0] += 1e-4
+    diff = diff_topologies(before, after, tolerance=1e-3)
+    assert all(layer.status == "unchanged" for layer in diff.layers)
+    assert diff.edges == []
+
+
+def test_masks_shapes_and_missing_blocks():
+    before, after = build_topology(), build_topology(sizes=(6, 5, 4, 2))
+    mask = np.ones_like(after.get_weights(1).kernel, dtype=bool)
+    mask[0, :2] = False
+    after.get_weights(1).mask = mask
+    layers = {layer.end_layer: layer for layer in diff_topologies(before, after).layers}
+    assert layers[1].mask_flips == 2 and layers[1].edges == 28 and layers[1].edges_changed == 2
+    assert layers[3].status == "shape"
+
+    smaller = build_topology(sizes=(6, 5))
+    assert [layer.status for layer in diff_topologies(before, smaller).layers] == ["unchanged", "removed", "removed"]
+    assert [layer.status for layer in diff_topologies(smaller, before).layers] == ["unchanged", "added", "added"]
+
+
+def test_connections_are_matched_by_id():
+    before, after = build_topology(sizes=(3,)), build_topology(sizes=(3,))
+    before.add_connection(Connection(start="a", end="b", weight=np.float32(1.0), bias=0.0))
+    before.add_connection(Connection(start="b", end="c", weight=np.float32(2.0), bias=0.0))
+    after.add_connection(Connection(start="b", end="c", weight=np.float32(2.5), bias=0.0))
+    after.add_connection(Connection(start="c", end="d", weight=np.float32(1.0), bias=0.0))
+    diff = diff_topologies(before, after)
+    assert (diff.connections_added, diff.connections_removed, diff.connections_changed) == (1, 1, 1)
+    assert [(edge.start, edge.end, edge.delta) for edge in diff.edges] == [("b", "c", 0.5)]
+
+
+def test_overlay_is_column_oriented():
+    before, after = build_topology(), build_topology()
+    after.get_weights(1).kernel[2, 3] += 1.0
+    overlay = diff_topologies(before, after, top_k=1).to_overlay()
+    json.dumps(overlay)
+    assert overlay["layers"]["end_layer"] == [1, 2, 3]
+    assert overlay["layers"]["status"] == ["changed", "unchanged", "unchanged"]
+    assert overlay["edges"]["start"] == ["Dense_0_2"] and overlay["edges"]["end"] == ["Dense_1_3"]
+    assert overlay["neurons"]["id"] == ["Dense_1_3"]
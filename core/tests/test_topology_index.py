@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from core.src.models import Connection, Layer
+from core.tests.conftest import build_topology
+
+
+def test_layers_and_blocks_by_index(topology):
+    assert topology.get_layer(2) is topology.layers[2]
+    assert topology.get_layer(9) is None
+    assert topology.get_weights(2) is topology.weights[1]
+    assert topology.get_weights(0) is None
+
+
+def test_block_edges_are_looked_up_without_materializing(topology):
+    block = topology.get_weights(2)
+    connection = topology.get_connection("Dense_1_3", "Dense_2_1")
+    assert connection.weight == float(block.kernel[3, 1])
+    assert connection.bias == float(block.bias[1])
+    assert topology.has_connection("Dense_1_3", "Dense_2_1")
+    assert not topology.has_connection("Dense_2_1", "Dense_1_3")
+    assert not topology.has_connection("Dense_0_0", "Dense_2_0")
+    assert not topology.has_connection("Dense_1_3", "unknown")
+
+
+def test_incoming_and_outgoing_block_edges(topology):
+    incoming = topology.incoming("Dense_2_1")
+    assert [c.start for c in incoming] == [f"Dense_1_{i}" for i in range(5)]
+    assert [c.weight for c in incoming] == topology.get_weights(2).kernel[:, 1].tolist()
+    assert [c.end for c in topology.outgoing("Dense_2_1")] == [f"Dense_3_{j}" for j in range(3)]
+    assert topology.incoming("Dense_0_0") == []
+    assert topology.outgoing("Dense_3_0") == []
+    assert topology.incoming("unknown") == []
+
+
+def test_masked_block_edges_are_hidden(topology):
+    block = topology.get_weights(2)
+    block.mask = np.ones_like(block.kernel, dtype=bool)
+    block.mask[3, 1] = False
+    assert not topology.has_connection("Dense_1_3", "Dense_2_1")
+    assert "Dense_1_3" not in [c.start for c in topology.incoming("Dense_2_1")]
+    assert "Dense_2_1" not in [c.end for c in topology.outgoing("Dense_1_3")]
+
+
+def test_explicit_connections_are_indexed(topology):
+    topology.add_connection(Connection(start="Dense_0_1", end="Dense_3_2", weight=0.5, bias=None))
+    assert topology.get_connection("Dense_0_1", "Dense_3_2").weight == 0.5
+    assert "Dense_3_2" in [c.end for c in topology.outgoing("Dense_0_1")]
+    assert "Dense_0_1" in [c.start for c in topology.incoming("Dense_3_2")]
+
+
+def test_duplicates_are_rejected(topology):
+    with pytest.raises(ValueError):
+        topology.add_layer(Layer(index=1, type="Dense", name="again", units=0, input_shape=[], output_shape=[],
+                                 activation_function="relu"))
+    with pytest.raises(ValueError):
+        topology.add_connection(Connection(start="Dense_1_0", end="Dense_2_0", weight=1.0, bias=None))
+    topology.add_connection(Connection(start="a", end="b", weight=1.0, bias=None))
+    with pytest.raises(ValueError):
+        topology.add_connection(Connection(start="a", end="b", weight=2.0, bias=None))
+
+
+def test_index_after_json_round_trip():
+    topology = build_topology()
+    loaded = type(topology).from_json(topology.to_json())
+    assert [c.start for c in loaded.incoming("Dense_3_0")] == [f"Dense_2_{i}" for i in range(4)]
+    assert loaded.get_connection("Dense_0_5", "Dense_1_4").weight == float(topology.get_weights(1).kernel[5, 4])
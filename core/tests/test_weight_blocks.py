@@ -0,0 +1,72 @@
+import numpy as np
+import orjson
+import pytest
+
+from core.src.models import Topology, WeightBlock
+from core.tests.conftest import build_topology
+
+
+def test_json_lists_one_connection_per_block_edge():
+    topology = build_topology()
+    connections = orjson.loads(topology.to_json())["connections"]
+    assert len(connections) == sum(block.edge_count() for block in topology.weights) == 6 * 5 + 5 * 4 + 4 * 3
+    block = topology.get_weights(2)
+    first = connections[6 * 5]
+    assert (first["start"], first["end"]) == ("Dense_1_0", "Dense_2_0")
+    assert first["weight"] == float(block.kernel[0, 0])
+    assert first["bias"] == float(block.bias[0])
+
+
+def test_json_round_trip_restores_blocks():
+    topology = build_topology()
+    loaded = Topology.from_json(topology.to_json())
+    assert len(loaded.connections) == 0
+    for block, other in zip(topology.weights, loaded.weights):
+        assert (other.start_layer, other.end_layer) == (block.start_layer, block.end_layer)
+        np.testing.assert_array_equal(other.kernel, block.kernel)
+        np.testing.assert_array_equal(other.bias, block.bias)
+    assert loaded.fingerprint() == topology.fingerprint()
+
+
+def test_masked_edges_are_left_out():
+    topology = build_topology()
+    block = topology.get_weights(3)
+    block.mask = np.abs(block.kernel) > 0.5
+    connections = list(topology.iter_connections())
+    assert len(connections) == 6 * 5 + 5 * 4 + int(block.mask.sum())
+    assert block.edge_count() == int(block.mask.sum())
+    assert all(abs(c.weight) > 0.5 for c in connections[6 * 5 + 5 * 4:])
+
+
+def test_block_without_bias():
+    topology = build_topology(sizes=(3, 2))
+    topology.get_weights(1).bias = None
+    loaded = Topology.from_json(topology.to_json())
+    assert loaded.get_weights(1).bias is None
+    np.testing.assert_array_equal(loaded.get_weights(1).kernel, topology.get_weights(1).kernel)
+
+
+def test_block_from_a_layer_outside_the_topology_has_no_edges():
+    topology = build_topology(sizes=(3, 2), with_input_block=True)
+    assert topology.get_weights(0).start_layer is None
+    assert len(list(topology.iter_connections())) == 3 * 2
+
+
+def test_duplicate_blocks_are_rejected():
+    topology = build_topology(sizes=(3, 2))
+    with pytest.raises(ValueError):
+        topology.add_weights(WeightBlock(start_layer=0, end_layer=1, kernel=np.zeros((3, 2))))
+
+
+def test_equality_compares_arrays_by_value():
+    topology = build_topology()
+    document = topology.to_json()
+    first, second = Topology.from_json(document), Topology.from_json(document)
+    assert first == second == topology
+    assert first.weights[1] == second.weights[1]
+    assert first.connections == list(second.connections)
+
+    second.get_weights(2).kernel[0, 0] += 1.0
+    assert first != second
+    assert first.weights[1] != second.weights[1]
+    assert topology != build_topology(seed=1)
@@ -1,75 +1,59 @@
-import json
+from core.src.compression import open_stream
 from core.src.convertor import convert
 from sample.src.mnist import create_mnist_model
 from core.src.models import Topology
 
-# yes yes it's GPT generated
-def verify_topology_structure(original_json: str, deserialized_topology: Topology) -> bool: 
-    # Convert the deserialized topology back to JSON for direct comparison
+def verify_topology_structure(original_json: str, deserialized_topology: Topology) -> bool:
+    """Checks that a topology serializes back to `original_json`.
+
+    The JSON comparison decides: weight blocks fed from outside the topology
+    (e.g. by a Flatten input) are not written to JSON, so they must not take
+    part in it. When the documents differ, the Merkle fingerprints of both
+    parsed documents locate the layers, neurons and weight rows that differ."""
     deserialized_json = deserialized_topology.to_json()
-    
-    # Compare JSON strings directly
     if original_json == deserialized_json:
         print("Direct JSON comparison passed: The structures are identical.")
         return True
-    else:
-        print("Direct JSON comparison failed: The structures differ.")
-    
-    # Convert JSON strings to dictionaries for a deeper comparison
-    original_data = json.loads(original_json)
-    deserialized_data = json.loads(deserialized_json)
-    
-    def deep_compare(d1, d2, path=""):
-        """Recursively compare two dictionaries to find any differences."""
-        if isinstance(d1, dict) and isinstance(d2, dict):
-            for key in d1:
-                if key not in d2:
-                    print(f"Key '{path + key}' missing in deserialized data.")
-                    return False
-                if not deep_compare(d1[key], d2[key], path + key + "."):
-                    return False
-            for key in d2:
-                if key not in d1:
-                    print(f"Unexpected key '{path + key}' in deserialized data.")
-                    return False
-        elif isinstance(d1, list) and isinstance(d2, list):
-            if len(d1) != len(d2):
-                print(f"List length mismatch at '{path}'")
-                return False
-            for index, (item1, item2) in enumerate(zip(d1, d2)):
-                if not deep_compare(item1, item2, f"{path}[{index}]."):
-                    return False
-        else:
-            if d1 != d2:
-                print(f"Mismatch at '{path}': {d1} != {d2}")
-                return False
-        return True
-    
-    # Run a deep comparison to identify any nested discrepancies
-    if deep_compare(original_data, deserialized_data):
-        print("Deep structure comparison passed: All nested structures match.")
-        return True
-    else:
-        print("Deep structure comparison failed: Discrepancies found in nested structures.")
-        return False
 
+    print("Direct JSON comparison failed: The structures differ.")
+    differences = Topology.from_json(original_json).differences(Topology.from_json(deserialized_json))
+    for path in differences:
+        print(f"Mismatch at '{path}'")
+    if not differences:
+        print("Structure comparison passed: Only the formatting differs.")
+    return not differences
 
-def get_json_topology(model, file_path = "topology.json", save = False):
+
+def get_json_topology(model, file_path = "topology.json", save = False, compression = "auto"):
     topology = convert(model)
     topology_json = topology.to_json()
     if save:
-        with open(file_path, "w") as file:
+        with open_stream(file_path, "w", compression) as file:
             file.write(topology_json)
 
     return topology_json
 
-def load_topology(file_path = "topology.json"):
-    with open(file_path, "r") as file:
+def save_json_topology(model, file_path = "topology.json", compact = False, precision = None, compression = "auto"):
+    topology = convert(model)
+    with open_stream(file_path, "wb", compression) as file:
+        topology.write_json(file, compact=compact, precision=precision)
+    return topology
+
+def load_topology(file_path = "topology.json", compression = "auto"):
+    with open_stream(file_path, "rb", compression) as file:
         loaded_json = file.read()
     deserialized_topology = Topology.from_json(loaded_json)
 
     return deserialized_topology
 
+def save_binary_topology(model, file_path = "topology.nnvb", precision = None):
+    topology = convert(model)
+    topology.save_binary(file_path, precision=precision)
+    return topology
+
+def load_binary_topology(file_path = "topology.nnvb", mmap_mode = "r"):
+    return Topology.load_binary(file_path, mmap_mode=mmap_mode)
+
 if __name__ == "__main__":
     model = create_mnist_model()
 
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MAX_ENTRY_BYTES = 32 * 1024 * 1024
+DEFAULT_LATEST_TTL = 5.0
+
+
+class ResponseCache:
+    """
+    Rendered response bodies of model documents, keyed by (id, version, variant).
+    - A given (id, version) never changes, so entries only need to be dropped when
+      a document is updated or deleted (`invalidate`) or to make room.
+    - Entries live in an in-process LRU holding at most `max_bytes` bytes of bodies.
+    - With a Django cache `backend`, bodies are also stored there and the latest
+      version of each document is tracked there only, so invalidations reach
+      every process sharing that backend.
+    - The latest version is only trusted for `latest_ttl` seconds, after which it is
+      looked up again; without a backend, this bounds how long a process can serve
+      a version that another process has replaced.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entry_bytes=DEFAULT_MAX_ENTRY_BYTES, backend=None,
+                 latest_ttl=DEFAULT_LATEST_TTL):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.backend = backend
+        self.latest_ttl = latest_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size = 0
+        self._entries = OrderedDict()
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Builds the cache from the `MODEL_RESPONSE_CACHE` setting.
+        """
+        options = getattr(settings, "MODEL_RESPONSE_CACHE", {})
+        backend = None
+        if options.get("BACKEND"):
+            from django.core.cache import caches
+            backend = caches[options["BACKEND"]]
+        return cls(max_bytes=options.get("MAX_BYTES", DEFAULT_MAX_BYTES),
+                   max_entry_bytes=options.get("MAX_ENTRY_BYTES", DEFAULT_MAX_ENTRY_BYTES),
+                   backend=backend,
+                   latest_ttl=options.get("LATEST_TTL", DEFAULT_LATEST_TTL))
+
+    def latest_version(self, pk):
+        """
+        The version last stored for `pk`, or None when unknown or older than `latest_ttl`.
+        """
+        if self.backend is not None:
+            return self.backend.get(self._latest_key(pk))
+        with self._lock:
+            version, expires = self._latest.get(pk, (None, 0.0))
+            if version is not None and expires <= time.monotonic():
+                del self._latest[pk]
+                return None
+            return version
+
+    def get(self, pk, version, variant):
+        key = (pk, version, variant)
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body
+        if self.backend is not None:
+            body = self.backend.get(self._backend_key(key))
+            if body is not None:
+                with self._lock:
+                    self.hits += 1
+                    self._store(key, body)
+                return body
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, pk, version, variant, body, latest=True):
+        """
+        Stores a body; bodies over `max_entry_bytes` are skipped.
+        - With `latest`, `version` becomes the latest of `pk` unless a newer one is already
+          known, so a slow request that read an old version cannot hide an update.
+        """
+        key = (pk, version, variant)
+        if self.backend is not None:
+            known = self.backend.get(self._latest_key(pk)) if latest else None
+            if latest and (known is None or known <= version):
+                self.backend.set(self._latest_key(pk), version, self.latest_ttl)
+            if len(body) <= self.max_entry_bytes:
+                self.backend.set(self._backend_key(key), body)
+        with self._lock:
+            if latest and self._latest.get(pk, (version,))[0] <= version:
+                self._set_latest(pk, version)
+            if len(body) <= self.max_entry_bytes:
+                self._store(key, body)
+
+    def tee(self, pk, version, variant, chunks, latest=True):
+        """
+        Passes a stream of byte chunks through, storing the body once it was sent completely.
+        """
+        parts, size = [], 0
+        for chunk in chunks:
+            if parts is not None:
+                size += len(chunk)
+                if size <= self.max_entry_bytes:
+                    parts.append(chunk)
+                else:
+                    parts = None
+            yield chunk
+        if parts is not None:
+            self.set(pk, version, variant, b"".join(parts), latest)
+
+    def invalidate(self, pk, version=None):
+        """
+        Drops every entry of `pk`, whatever its version.
+        - `version` is the document's new version after an update; None after a delete.
+        """
+        if self.backend is not None:
+            # Bodies of older versions are never looked up again and expire on their own
+            if version is None:
+                self.backend.delete(self._latest_key(pk))
+            else:
+                self.backend.set(self._latest_key(pk), version, self.latest_ttl)
+        with self._lock:
+            if version is None:
+                self._latest.pop(pk, None)
+            else:
+                self._set_latest(pk, version)
+            for key in [key for key in self._entries if key[0] == pk]:
+                self.size -= len(self._entries.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "shared_backend": self.backend is not None,
+            }
+
+    def _set_latest(self, pk, version):
+        # Caller holds the lock
+        self._latest[pk] = (version, time.monotonic() + self.latest_ttl)
+
+    def _store(self, key, body):
+        # Caller holds the lock
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    @staticmethod
+    def _latest_key(pk):
+        return f"models:{pk}:latest"
+
+    @staticmethod
+    def _backend_key(key):
+        pk, version, variant = key
+        return f"models:{pk}:{version}:{variant}"
+
+
+response_cache = ResponseCache.from_settings()
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from db import ensure_indexes, migrate_versions
+
+
+class Command(BaseCommand):
+    help = "Create the MongoDB indexes the API relies on and migrate models stored before version history."
+
+    def handle(self, *args, **options):
+        ensure_indexes()
+        self.stdout.write("Indexes created")
+        migrated = migrate_versions()
+        self.stdout.write(f"{migrated} model(s) migrated to version records")
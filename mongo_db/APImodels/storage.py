@@ -0,0 +1,135 @@
+import json
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from bson.binary import Binary
+from db import collection_model_chunks as mongo_chunks
+
+# Well below MongoDB's 16 MB document limit
+CHUNK_BYTES = 4 * 1024 * 1024
+WORKERS = 4
+# Per-edge JSON compresses about 4x even at level 1, which is several times faster than the default
+COMPRESSION_LEVEL = 1
+META_PART = "meta"
+OTHER_PART = "connections"
+
+
+def is_chunkable(json_data):
+    """
+    Whether a document is a topology that can be stored in per-layer chunks.
+    """
+    return (isinstance(json_data, dict) and isinstance(json_data.get("layers"), list)
+            and isinstance(json_data.get("connections", []), list))
+
+
+def split_topology(json_data):
+    """
+    Split a topology document into parts that can be stored and read independently.
+    - `meta` holds every top-level field except `layers` and `connections`.
+    - `layer:<n>` holds the n-th layer and the connections ending in its neurons.
+    - `connections` holds the connections ending in neurons of no layer.
+    Connections are kept as runs tagged with their position in the document,
+    so merging any set of parts restores the original order.
+    """
+    layers = json_data.get("layers") or []
+    connections = json_data.get("connections") or []
+    owner = {}
+    for position, layer in enumerate(layers):
+        for neuron in layer.get("neurons") or []:
+            owner[neuron.get("id")] = position
+
+    runs = {}
+    start = 0
+    owners = [owner.get(connection.get("end")) for connection in connections]
+    for end in range(1, len(connections) + 1):
+        if end == len(connections) or owners[end] != owners[start]:
+            runs.setdefault(owners[start], []).append([start, connections[start:end]])
+            start = end
+
+    parts = [(META_PART, None, {key: value for key, value in json_data.items()
+                                if key not in ("layers", "connections")})]
+    for position, layer in enumerate(layers):
+        parts.append((f"layer:{position}", layer.get("index"),
+                      {"layer": layer, "connections": runs.get(position, [])}))
+    if None in runs:
+        parts.append((OTHER_PART, None, {"connections": runs[None]}))
+    return parts
+
+
+def write_chunked(model_id, json_data):
+    """
+    Store a topology document as compressed per-part chunks, writing parts in parallel.
+    - Returns the `storage` descriptor to keep in the version record instead of `json_data`.
+    """
+    upload = str(uuid.uuid4())
+    parts = split_topology(json_data)
+
+    def write_part(part):
+        key, layer_index, payload = part
+        data = zlib.compress(json.dumps(payload, separators=(",", ":")).encode(), COMPRESSION_LEVEL)
+        chunks = [
+            {"model_id": model_id, "upload": upload, "part": key, "seq": seq,
+             "data": Binary(data[offset:offset + CHUNK_BYTES])}
+            for seq, offset in enumerate(range(0, max(len(data), 1), CHUNK_BYTES))
+        ]
+        mongo_chunks.insert_many(chunks, ordered=False)
+        return {"key": key, "layer_index": layer_index, "chunks": len(chunks), "bytes": len(data)}
+
+    try:
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            descriptors = list(executor.map(write_part, parts))
+    except Exception:
+        delete_upload(upload)
+        raise
+    return {"format": "chunked", "upload": upload, "parts": descriptors}
+
+
+def read_chunked(storage, layers=None):
+    """
+    Rebuild a topology document from its chunks, reading parts in parallel.
+    - `layers` is a collection of layer indices (the layers' `index` field); when given, only
+      those layers and the connections ending in them are read.
+    """
+    selected = [part for part in storage["parts"] if _selected(part["key"], part["layer_index"], layers)]
+
+    def read_part(part):
+        cursor = mongo_chunks.find(
+            {"upload": storage["upload"], "part": part["key"]}, {"_id": 0, "data": 1}
+        ).sort("seq", 1)
+        return json.loads(zlib.decompress(b"".join(chunk["data"] for chunk in cursor)))
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        return merge_parts(list(zip((part["key"] for part in selected), executor.map(read_part, selected))))
+
+
+def select_layers(json_data, layers):
+    """
+    The subset of a topology document that read_chunked returns for `layers`.
+    """
+    return merge_parts([(key, payload) for key, layer_index, payload in split_topology(json_data)
+                        if _selected(key, layer_index, layers)])
+
+
+def merge_parts(parts):
+    """
+    Inverse of split_topology for any subset of its parts that includes `meta`, in their original order.
+    """
+    payloads = dict(parts)
+    json_data = dict(payloads.pop(META_PART))
+    json_data["layers"] = [payload["layer"] for key, payload in payloads.items() if key != OTHER_PART]
+    runs = sorted((run for payload in payloads.values() for run in payload["connections"]),
+                  key=lambda run: run[0])
+    json_data["connections"] = [connection for _, connections in runs for connection in connections]
+    return json_data
+
+
+def _selected(key, layer_index, layers):
+    return layers is None or key == META_PART or (key != OTHER_PART and layer_index in layers)
+
+
+def delete_upload(upload):
+    mongo_chunks.delete_many({"upload": upload})
+
+
+def delete_model_chunks(model_id):
+    mongo_chunks.delete_many({"model_id": model_id})
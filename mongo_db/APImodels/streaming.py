@@ -0,0 +1,102 @@
+import json
+import zlib
+from django.utils.http import parse_etags
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK_SIZE = 64 * 1024
+
+
+def available_encodings():
+    """
+    Content codings the server can produce, most preferred first.
+    - zstd needs the optional `zstandard` package (see requirements.txt); without it,
+      zstd is never negotiated and clients that accept gzip get gzip.
+    """
+    return ("zstd", "gzip") if zstandard is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Picks the content coding for a response from an `Accept-Encoding` header.
+    - Returns the most preferred available coding the client accepts with q > 0.
+    - Returns None when the body should be sent uncompressed.
+    """
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+
+    for coding in available_encodings():
+        if weights.get(coding, weights.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def make_etag(pk, version, encoding=None, layers=None):
+    """
+    Strong ETag of one version of a document; each content coding and layer selection gets its own tag.
+    """
+    suffix = f"-{encoding}" if encoding else ""
+    if layers is not None:
+        suffix += "-layers" + ".".join(map(str, sorted(layers)))
+    return f'"{pk}-{version}{suffix}"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Whether an `If-None-Match` header matches `etag`, using weak comparison as RFC 9110 requires.
+    """
+    if not if_none_match:
+        return False
+    tags = parse_etags(if_none_match)
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def iter_json(data, chunk_size=CHUNK_SIZE):
+    """
+    Encodes `data` as compact JSON, yielding UTF-8 chunks of about `chunk_size` bytes.
+    """
+    pieces, size = [], 0
+    for piece in json.JSONEncoder(separators=(",", ":")).iterencode(data):
+        pieces.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(pieces).encode()
+            pieces, size = [], 0
+    if pieces:
+        yield "".join(pieces).encode()
+
+
+def compress_stream(chunks, encoding=None):
+    """
+    Compresses a stream of byte chunks with the given content coding (None passes them through).
+    """
+    if encoding is None:
+        yield from chunks
+        return
+    if encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    elif encoding == "zstd" and zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    else:
+        raise ValueError(f"Unsupported content coding '{encoding}'")
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
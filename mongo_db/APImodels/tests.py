@@ -1,3 +1,456 @@
-from django.test import TestCase
+import json
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from unittest import SkipTest, mock
+from django.test import SimpleTestCase, override_settings
+from pymongo.errors import PyMongoError
+import db
+from .cache import ResponseCache, response_cache
+from .storage import CHUNK_BYTES, merge_parts, select_layers, split_topology
+from .streaming import compress_stream, etag_matches, iter_json, make_etag, negotiate_encoding
+from .views import decode_cursor, encode_cursor
 
-# Create your tests here.
+
+class MongoTestCase(SimpleTestCase):
+    """
+    Runs the API against a throwaway database on the configured MongoDB server.
+    - The collections used by `db`, the views and the chunk storage are swapped for ones in
+      that database; tests are skipped when the server cannot be reached.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        try:
+            db.client.admin.command("ping")
+        except PyMongoError as e:
+            raise SkipTest(f"MongoDB is not reachable: {e}")
+        super().setUpClass()
+        cls.database = db.client[f"test_{uuid.uuid4().hex}"]
+        cls.models = cls.database["models"]
+        cls.versions = cls.database["model_versions"]
+        cls.chunks = cls.database["model_chunks"]
+        cls.patches = [
+            mock.patch.multiple("db", collection_models=cls.models, collection_model_versions=cls.versions,
+                                collection_model_chunks=cls.chunks),
+            mock.patch.multiple("APImodels.views", mongo_models=cls.models, mongo_versions=cls.versions),
+            mock.patch("APImodels.storage.mongo_chunks", cls.chunks),
+        ]
+        for patch in cls.patches:
+            patch.start()
+        db.ensure_indexes()
+
+    @classmethod
+    def tearDownClass(cls):
+        for patch in reversed(cls.patches):
+            patch.stop()
+        db.client.drop_database(cls.database.name)
+        super().tearDownClass()
+
+    def setUp(self):
+        for collection in (self.models, self.versions, self.chunks):
+            collection.delete_many({})
+        response_cache.clear()
+
+    def insert_model(self, pk, updated, json_data=None, version=1):
+        self.versions.insert_one(db.version_record(pk, version, json_data or {"name": pk}, updated, updated))
+        self.models.insert_one({"_id": pk, "version": version, "created": updated, "updated": updated})
+
+
+class CursorTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        updated = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+        self.assertEqual(decode_cursor(encode_cursor({"updated": updated, "_id": "abc"})), (updated, "abc"))
+
+    def test_malformed_tokens(self):
+        for token in ("", "not base64!", "WzFd", "eyJhIjogMX0="):
+            with self.assertRaises(ValueError):
+                decode_cursor(token)
+
+
+class ResponseCacheTests(SimpleTestCase):
+
+    def test_get_and_set(self):
+        cache = ResponseCache(max_bytes=100)
+        self.assertIsNone(cache.get("a", 1, "detail"))
+        cache.set("a", 1, "detail", b"body")
+        self.assertEqual(cache.get("a", 1, "detail"), b"body")
+        self.assertIsNone(cache.get("a", 1, "download-gzip"))
+        self.assertEqual(cache.latest_version("a"), 1)
+        self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (1, 2))
+
+    def test_least_recently_used_bodies_are_evicted(self):
+        cache = ResponseCache(max_bytes=10)
+        cache.set("a", 1, "detail", b"x" * 4)
+        cache.set("b", 1, "detail", b"x" * 4)
+        cache.get("a", 1, "detail")
+        cache.set("c", 1, "detail", b"x" * 4)
+        self.assertIsNone(cache.get("b", 1, "detail"))
+        self.assertIsNotNone(cache.get("a", 1, "detail"))
+        self.assertEqual(cache.stats()["bytes"], 8)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_oversized_bodies_are_not_stored(self):
+        cache = ResponseCache(max_bytes=100, max_entry_bytes=4)
+        cache.set("a", 1, "detail", b"x" * 5)
+        self.assertIsNone(cache.get("a", 1, "detail"))
+        self.assertEqual(cache.latest_version("a"), 1)
+
+    def test_tee_stores_complete_bodies_only(self):
+        cache = ResponseCache(max_bytes=100)
+        self.assertEqual(list(cache.tee("a", 1, "v", iter([b"ab", b"cd"]))), [b"ab", b"cd"])
+        self.assertEqual(cache.get("a", 1, "v"), b"abcd")
+        stream = cache.tee("b", 1, "v", iter([b"ab", b"cd"]))
+        next(stream)
+        self.assertIsNone(cache.get("b", 1, "v"))
+
+    def test_latest_version_never_goes_back(self):
+        cache = ResponseCache()
+        cache.invalidate("a", 3)
+        cache.set("a", 2, "detail", b"old")
+        self.assertEqual(cache.latest_version("a"), 3)
+        cache.set("a", 2, "detail", b"old", latest=False)
+        self.assertEqual(cache.latest_version("a"), 3)
+
+    def test_invalidate(self):
+        cache = ResponseCache()
+        cache.set("a", 1, "detail", b"body")
+        cache.set("b", 1, "detail", b"body")
+        cache.invalidate("a", 2)
+        self.assertIsNone(cache.get("a", 1, "detail"))
+        self.assertEqual(cache.latest_version("a"), 2)
+        cache.invalidate("a")
+        self.assertIsNone(cache.latest_version("a"))
+        self.assertEqual(cache.get("b", 1, "detail"), b"body")
+
+    def test_latest_version_expires(self):
+        cache = ResponseCache(latest_ttl=5.0)
+        with mock.patch("APImodels.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1, "detail", b"body")
+        with mock.patch("APImodels.cache.time.monotonic", return_value=104.0):
+            self.assertEqual(cache.latest_version("a"), 1)
+        with mock.patch("APImodels.cache.time.monotonic", return_value=105.0):
+            self.assertIsNone(cache.latest_version("a"))
+        # The body itself stays valid for its version
+        self.assertEqual(cache.get("a", 1, "detail"), b"body")
+
+
+class ModelListingTests(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        # Two models share each timestamp so pages have to break ties on _id
+        self.expected = []
+        for i in range(7):
+            updated = start + timedelta(minutes=i // 2)
+            self.insert_model(f"model-{i}", updated)
+            self.expected.append((updated, f"model-{i}"))
+        self.expected = [pk for _, pk in sorted(self.expected, reverse=True)]
+
+    def list_all(self, limit):
+        pks, after = [], None
+        while True:
+            url = f"/api/models/?limit={limit}" + (f"&after={after}" if after else "")
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertLessEqual(len(page["results"]), limit)
+            pks.extend(doc["_id"] for doc in page["results"])
+            after = page["next"]
+            if after is None:
+                return pks
+
+    def test_pages_cover_every_model_once_newest_first(self):
+        for limit in (1, 2, 3, 7, 50):
+            self.assertEqual(self.list_all(limit), self.expected)
+
+    def test_page_fields(self):
+        result = self.client.get("/api/models/?limit=1").json()["results"][0]
+        self.assertEqual(set(result), {"_id", "latest_version", "updated", "created"})
+        self.assertEqual(result["latest_version"], 1)
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get("/api/models/?limit=0").status_code, 400)
+        self.assertEqual(self.client.get("/api/models/?limit=x").status_code, 400)
+        self.assertEqual(self.client.get("/api/models/?after=garbage").status_code, 400)
+
+    def test_listing_without_the_index(self):
+        self.models.drop_index("models_listing")
+        try:
+            self.assertEqual(self.list_all(3), self.expected)
+        finally:
+            db.ensure_indexes()
+
+
+def gunzip(body):
+    return zlib.decompress(body, zlib.MAX_WBITS | 16)
+
+
+class StreamingTests(SimpleTestCase):
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(negotiate_encoding("gzip, deflate"), "gzip")
+        self.assertEqual(negotiate_encoding("gzip;q=0"), None)
+        self.assertEqual(negotiate_encoding("*"), negotiate_encoding("gzip"))
+        self.assertEqual(negotiate_encoding("br"), None)
+        self.assertEqual(negotiate_encoding(None), None)
+
+    def test_zstd_is_not_negotiated_without_zstandard(self):
+        with mock.patch("APImodels.streaming.zstandard", None):
+            self.assertEqual(negotiate_encoding("zstd, gzip"), "gzip")
+            self.assertEqual(negotiate_encoding("zstd"), None)
+            with self.assertRaises(ValueError):
+                list(compress_stream(iter([b"{}"]), "zstd"))
+
+    def test_etags_differ_per_variant(self):
+        tags = {make_etag("a", 1), make_etag("a", 2), make_etag("a", 1, "gzip"),
+                make_etag("a", 1, layers={2, 1}), make_etag("a", 1, "gzip", {1, 2})}
+        self.assertEqual(len(tags), 5)
+        self.assertEqual(make_etag("a", 1, layers={2, 1}), make_etag("a", 1, layers=[1, 2]))
+
+    def test_etag_matches(self):
+        etag = make_etag("a", 1, "gzip")
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(f'"other", W/{etag}', etag))
+        self.assertTrue(etag_matches("*", etag))
+        self.assertFalse(etag_matches(make_etag("a", 2, "gzip"), etag))
+        self.assertFalse(etag_matches(None, etag))
+
+    def test_compressed_stream_round_trip(self):
+        data = {"layers": [{"index": i, "neurons": list(range(100))} for i in range(50)]}
+        chunks = list(iter_json(data, chunk_size=256))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads(b"".join(chunks)), data)
+        self.assertEqual(json.loads(gunzip(b"".join(compress_stream(iter(chunks), "gzip")))), data)
+        self.assertEqual(b"".join(compress_stream(iter(chunks))), b"".join(chunks))
+        with self.assertRaises(ValueError):
+            list(compress_stream(iter(chunks), "br"))
+
+
+class ModelDownloadTests(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.json_data = {
+            "layers": [{"index": 0, "neurons": [{"id": "a"}]}, {"index": 1, "neurons": [{"id": "b"}]}],
+            "connections": [{"start": "a", "end": "b", "weight": 0.5}],
+        }
+        self.insert_model("model", datetime(2024, 1, 1, tzinfo=timezone.utc), self.json_data)
+
+    def download(self, query="", **headers):
+        return self.client.get(f"/api/models/d/model/{query}", **headers)
+
+    def test_body_and_etag(self):
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), self.json_data)
+        self.assertEqual(response["ETag"], make_etag("model", 1))
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_gzip(self):
+        response = self.download(HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gunzip(b"".join(response.streaming_content))), self.json_data)
+
+    def test_not_modified(self):
+        etag = self.download()["ETag"]
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=f"W/{etag}").status_code, 304)
+        # Another content coding is another representation
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT_ENCODING="gzip").status_code, 200)
+
+    def test_new_version_changes_the_etag(self):
+        etag = self.download()["ETag"]
+        self.assertEqual(self.client.put("/api/models/model/", {"name": "v2"}, content_type="application/json").status_code, 200)
+        response = self.download(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], make_etag("model", 2))
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), {"name": "v2"})
+
+    def test_cached_body_is_reused(self):
+        first = b"".join(self.download().streaming_content)
+        self.versions.delete_many({})
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, first)
+
+    def test_layers(self):
+        response = self.download("?layers=1")
+        self.assertEqual(response["ETag"], make_etag("model", 1, layers={1}))
+        body = json.loads(b"".join(response.streaming_content))
+        self.assertEqual([layer["index"] for layer in body["layers"]], [1])
+        self.assertEqual(body["connections"], self.json_data["connections"])
+        self.assertEqual(self.download("?layers=x").status_code, 400)
+
+    def test_missing_model(self):
+        self.assertEqual(self.client.get("/api/models/d/missing/").status_code, 404)
+
+
+class ModelDetailCacheTests(MongoTestCase):
+
+    def test_update_from_another_process_is_seen_after_the_ttl(self):
+        self.insert_model("model", datetime(2024, 1, 1, tzinfo=timezone.utc), {"name": "v1"})
+        self.assertEqual(self.client.get("/api/models/model/").json()[0]["version"], 1)
+        # Written by another process, which cannot invalidate this one's cache
+        now = datetime(2024, 1, 2, tzinfo=timezone.utc)
+        self.versions.insert_one(db.version_record("model", 2, {"name": "v2"}, now, now))
+        self.models.update_one({"_id": "model"}, {"$set": {"version": 2, "updated": now}})
+        self.assertEqual(self.client.get("/api/models/model/").json()[0]["version"], 1)
+        with mock.patch("APImodels.cache.time.monotonic", return_value=time.monotonic() + response_cache.latest_ttl):
+            self.assertEqual(self.client.get("/api/models/model/").json()[0]["json_data"], {"name": "v2"})
+
+
+def make_topology(layers, units, seed=0):
+    """A topology document shaped like the ones convert produces, with dense connections."""
+    neurons = [[{"id": f"n{index}_{unit}", "layer_index": index, "bias": 0.0} for unit in range(units)]
+               for index in range(layers)]
+    return {
+        "metadata": {"seed": seed},
+        "layers": [{"index": index, "name": f"dense_{index}", "neurons": neurons[index]} for index in range(layers)],
+        "connections": [
+            {"start": start["id"], "end": end["id"], "weight": (i * 7919 + seed) % 1000 / 1000, "bias": 0.5}
+            for index in range(1, layers)
+            for i, (end, start) in enumerate((end, start) for end in neurons[index] for start in neurons[index - 1])
+        ],
+    }
+
+
+class ChunkSplitTests(SimpleTestCase):
+
+    def test_split_and_merge_round_trip(self):
+        document = make_topology(4, 5)
+        # A connection ending outside every layer keeps its place in the document
+        document["connections"].insert(3, {"start": "n0_0", "end": "elsewhere", "weight": 1.0, "bias": None})
+        parts = split_topology(document)
+        self.assertEqual([key for key, _, _ in parts], ["meta", "layer:0", "layer:1", "layer:2", "layer:3", "connections"])
+        self.assertEqual(merge_parts([(key, payload) for key, _, payload in parts]), document)
+
+    def test_select_layers(self):
+        document = make_topology(3, 2)
+        selected = select_layers(document, {2})
+        self.assertEqual([layer["index"] for layer in selected["layers"]], [2])
+        self.assertEqual(selected["connections"], [c for c in document["connections"] if c["end"].startswith("n2_")])
+        self.assertEqual(selected["metadata"], document["metadata"])
+
+
+class LargeUploadTests(MongoTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # About 20 MB of JSON, above both MongoDB's 16 MB document limit and Django's 2.5 MB request limit
+        self.document = make_topology(3, 400)
+        self.body = json.dumps(self.document).encode()
+        self.assertGreater(len(self.body), 16 * 1024 * 1024)
+
+    def test_upload_over_16_mb_is_stored_in_chunks(self):
+        response = self.client.post("/api/models/", self.body, content_type="application/json")
+        self.assertEqual(response.status_code, 201, response.content)
+        pk = response.json()["id"]
+
+        record = self.versions.find_one({"model_id": pk})
+        self.assertNotIn("json_data", record)
+        self.assertEqual(record["storage"]["format"], "chunked")
+        self.assertGreater(self.chunks.count_documents({"model_id": pk}), len(self.document["layers"]))
+        self.assertTrue(all(len(chunk["data"]) <= CHUNK_BYTES for chunk in self.chunks.find({"model_id": pk})))
+
+        download = self.client.get(f"/api/models/d/{pk}/")
+        self.assertEqual(json.loads(b"".join(download.streaming_content)), self.document)
+        layer = json.loads(b"".join(self.client.get(f"/api/models/d/{pk}/?layers=1").streaming_content))
+        self.assertEqual([entry["index"] for entry in layer["layers"]], [1])
+        self.assertEqual(len(layer["connections"]), 400 * 400)
+
+    def test_update_over_16_mb(self):
+        pk = self.client.post("/api/models/", {"name": "small"}, content_type="application/json").json()["id"]
+        response = self.client.put(f"/api/models/{pk}/", self.body, content_type="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+        detail = self.client.get(f"/api/models/{pk}/").json()[0]
+        self.assertEqual((detail["version"], detail["json_data"]), (2, self.document))
+
+    def test_delete_removes_chunks(self):
+        pk = self.client.post("/api/models/", self.body, content_type="application/json").json()["id"]
+        self.assertEqual(self.client.delete(f"/api/models/{pk}/").status_code, 200)
+        self.assertEqual(self.chunks.count_documents({"model_id": pk}), 0)
+
+    @override_settings(MODEL_UPLOAD_MAX_BYTES=1024)
+    def test_upload_limit(self):
+        response = self.client.post("/api/models/", self.body, content_type="application/json")
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.versions.count_documents({}), 0)
+        self.assertEqual(self.client.post("/api/models/", {"name": "small"}, content_type="application/json").status_code, 201)
+
+    def test_empty_and_invalid_bodies(self):
+        self.assertEqual(self.client.post("/api/models/", b"", content_type="application/json").status_code, 400)
+        self.assertEqual(self.client.post("/api/models/", b"{", content_type="application/json").status_code, 400)
+
+
+class ModelVersionTests(MongoTestCase):
+
+    def create(self, json_data):
+        response = self.client.post("/api/models/", json_data, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        return response.json()["id"]
+
+    def update(self, pk, json_data):
+        return self.client.put(f"/api/models/{pk}/", json_data, content_type="application/json")
+
+    def test_updates_keep_every_version(self):
+        pk = self.create({"name": "v1"})
+        for version in (2, 3):
+            response = self.update(pk, {"name": f"v{version}"})
+            self.assertEqual(response.json()["version"], version)
+        self.assertEqual(self.client.get(f"/api/models/{pk}/").json()[0]["json_data"], {"name": "v3"})
+        for version in (1, 2, 3):
+            detail = self.client.get(f"/api/models/{pk}/versions/{version}/").json()[0]
+            self.assertEqual((detail["version"], detail["json_data"]), (version, {"name": f"v{version}"}))
+        self.assertEqual(self.client.get(f"/api/models/{pk}/versions/4/").status_code, 404)
+
+    def test_version_listing_pages(self):
+        pk = self.create({"name": "v1"})
+        for version in range(2, 6):
+            self.update(pk, {"name": f"v{version}"})
+        versions, after = [], None
+        while True:
+            page = self.client.get(f"/api/models/{pk}/versions/?limit=2" + (f"&after={after}" if after else "")).json()
+            versions.extend(record["version"] for record in page["results"])
+            self.assertTrue(all(set(record) == {"version", "created", "updated"} for record in page["results"]))
+            after = page["next"]
+            if after is None:
+                break
+        self.assertEqual(versions, [5, 4, 3, 2, 1])
+        self.assertEqual(self.client.get("/api/models/missing/versions/").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/models/{pk}/versions/?after=x").status_code, 400)
+
+    def test_update_of_a_missing_model(self):
+        self.assertEqual(self.update("missing", {"name": "v2"}).status_code, 404)
+
+    def test_concurrent_update_conflicts(self):
+        pk = self.create({"name": "v1"})
+        # Another request stored version 2 but has not moved the pointer yet
+        now = datetime.now(timezone.utc)
+        self.versions.insert_one(db.version_record(pk, 2, {"name": "other"}, now, now))
+        self.assertEqual(self.update(pk, {"name": "v2"}).status_code, 409)
+
+    def test_delete_removes_every_version(self):
+        pk = self.create({"name": "v1"})
+        self.update(pk, {"name": "v2"})
+        response = self.client.delete(f"/api/models/{pk}/")
+        self.assertEqual(response.json()["message"], "2 versions deleted")
+        self.assertEqual(self.versions.count_documents({"model_id": pk}), 0)
+        self.assertEqual(self.client.get(f"/api/models/{pk}/").status_code, 404)
+        self.assertEqual(self.client.delete(f"/api/models/{pk}/").status_code, 404)
+
+    def test_migrate_versions(self):
+        now = datetime(2024, 1, 1)
+        self.models.insert_one({"_id": "old", "latest_version": 3, "json_data": {"name": "old"},
+                                "created": now, "updated": now})
+        self.assertEqual(db.migrate_versions(), 1)
+        self.assertEqual(db.migrate_versions(), 0)
+        self.assertEqual(self.models.find_one({"_id": "old"}), {"_id": "old", "version": 3, "created": now, "updated": now})
+        detail = self.client.get("/api/models/old/").json()[0]
+        self.assertEqual((detail["version"], detail["json_data"]), (3, {"name": "old"}))
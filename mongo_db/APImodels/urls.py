@@ -1,9 +1,12 @@
 from django.urls import path
-from .views import ModelsView, ModelDownloadView
+from .views import ModelsView, ModelDownloadView, ModelCacheView, ModelVersionsView
 
 urlpatterns = [
     path('models/', ModelsView.as_view(), name='models'),
+    path('models/cache/', ModelCacheView.as_view(), name='model-cache'),
     path('models/<str:pk>/', ModelsView.as_view(), name='model-detail'),
+    path('models/<str:pk>/versions/', ModelVersionsView.as_view(), name='model-versions'),
+    path('models/<str:pk>/versions/<int:version>/', ModelVersionsView.as_view(), name='model-version-detail'),
     path('models/d/<str:pk>/', ModelDownloadView.as_view(), name='json-data-download'),
     
 ]
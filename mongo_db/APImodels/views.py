@@ -1,11 +1,135 @@
+import base64
 import uuid
 import json
 from datetime import datetime, timezone
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from rest_framework.views import APIView
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
+from pymongo.errors import DuplicateKeyError
 from db import collection_models as mongo_models
+from db import collection_model_versions as mongo_versions
+from db import version_record
+from .cache import response_cache
+from .storage import delete_model_chunks, delete_upload, is_chunkable, read_chunked, select_layers, write_chunked
+from .streaming import compress_stream, etag_matches, iter_json, make_etag, negotiate_encoding
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+LISTING_FIELDS = {"_id": 1, "version": 1, "created": 1, "updated": 1}
+VERSION_FIELDS = {"_id": 0, "model_id": 1, "version": 1, "json_data": 1, "storage": 1, "created": 1, "updated": 1}
+VERSION_LISTING_FIELDS = {"_id": 0, "version": 1, "created": 1, "updated": 1}
+DEFAULT_UPLOAD_MAX_BYTES = 1024 * 1024 * 1024
+UPLOAD_READ_BYTES = 1024 * 1024
+
+
+def encode_cursor(doc):
+    """
+    Opaque `after` token pointing just past a listed document.
+    """
+    position = json.dumps([doc["updated"].isoformat(), doc["_id"]])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(token):
+    """
+    Inverse of `encode_cursor`; raises ValueError for malformed tokens.
+    """
+    try:
+        updated, pk = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return datetime.fromisoformat(updated), str(pk)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def read_upload(request):
+    """
+    The body of a model upload.
+    - Read from the request stream, so uploads are bound by the `MODEL_UPLOAD_MAX_BYTES` setting
+      rather than by DATA_UPLOAD_MAX_MEMORY_SIZE, which is far below the size of large topologies.
+    - Raises RequestDataTooBig for larger bodies.
+    """
+    max_bytes = getattr(settings, "MODEL_UPLOAD_MAX_BYTES", DEFAULT_UPLOAD_MAX_BYTES)
+    message = f"Upload exceeds {max_bytes} bytes"
+    try:
+        declared = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        declared = 0
+    if max_bytes is not None and declared > max_bytes:
+        raise RequestDataTooBig(message)
+    stream = request.stream
+    chunks, size = [], 0
+    while stream is not None and (chunk := stream.read(UPLOAD_READ_BYTES)):
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            raise RequestDataTooBig(message)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def find_version(pk, version=None, fields=VERSION_FIELDS):
+    """
+    Fetch one version record of a model, the latest one when `version` is None.
+    - Either way a single lookup on the (model_id, version) index.
+    """
+    if version is None:
+        return mongo_versions.find_one({"model_id": pk}, fields, sort=[("version", -1)])
+    return mongo_versions.find_one({"model_id": pk, "version": version}, fields)
+
+
+def load_json_data(record, layers=None):
+    """
+    The `json_data` of a version record, read from its chunks when it is stored in chunks.
+    - `layers` restricts a topology to the layers with those indices and the connections ending in them.
+    """
+    if "storage" in record:
+        return read_chunked(record["storage"], layers)
+    json_data = record.get("json_data")
+    if layers is not None and is_chunkable(json_data):
+        return select_layers(json_data, layers)
+    return json_data
+
+
+def store_version(pk, version, json_content, created, updated):
+    """
+    Insert a version record; topologies go to per-layer chunks so they are not bound by
+    MongoDB's 16 MB document limit. Raises DuplicateKeyError if the version exists.
+    """
+    storage = write_chunked(pk, json_content) if is_chunkable(json_content) else None
+    try:
+        mongo_versions.insert_one(version_record(pk, version, json_content, created, updated, storage))
+    except Exception:
+        if storage is not None:
+            delete_upload(storage["upload"])
+        raise
+
+
+def parse_layers(value):
+    """
+    Layer indices from a comma-separated `layers` query parameter; None when absent.
+    """
+    if not value:
+        return None
+    try:
+        return frozenset(int(index) for index in value.split(","))
+    except ValueError as e:
+        raise ValueError("layers must be comma-separated layer indices") from e
+
+
+def render_version(record):
+    """
+    Response body for a version record, shaped like the model documents were before version history.
+    """
+    return JSONRenderer().render([{
+        "_id": record["model_id"],
+        "version": record["version"],
+        "json_data": load_json_data(record),
+        "created": record["created"],
+        "updated": record["updated"]
+    }])
 
 
 class ModelsView(APIView):
@@ -14,41 +138,71 @@ class ModelsView(APIView):
     def get(self, request, pk=None):
         """
         Retrieve documents.
-        - If `pk` is provided, returns a specific document with its details.
-        - If `pk` is not provided, returns a list of documents with their latest versions and update timestamps.
+        - If `pk` is provided, returns the latest version of a specific document with its details,
+          from the response cache when that version was served before.
+        - If `pk` is not provided, returns a page of documents with their latest versions and timestamps,
+          most recently updated first. `limit` sets the page size and `after` takes the `next` token of
+          the previous page. The listing never reads `json_data`.
         """
         if pk:
-            result = list(mongo_models.find(
-                {"_id": pk}, 
-                {"_id": 1, "version": 1, "json_data": 1, "created": 1, "updated": 1}
-            ))
-            if not result:
-                return Response({"error": "Document not found"}, status=status.HTTP_404_NOT_FOUND)
-            return Response(result, status=status.HTTP_200_OK)
+            version = response_cache.latest_version(pk)
+            body = response_cache.get(pk, version, "detail") if version is not None else None
+            if body is None:
+                record = find_version(pk)
+                if not record:
+                    return Response({"error": "Document not found"}, status=status.HTTP_404_NOT_FOUND)
+                body = render_version(record)
+                response_cache.set(pk, record["version"], "detail", body)
+            return HttpResponse(body, content_type="application/json", status=status.HTTP_200_OK)
         else:
-            result = list(mongo_models.aggregate([
-                {"$sort": {"version": -1}},
-                {"$group": {
-                    "_id": "$_id",
-                    "latest_version": {"$first": "$version"},
-                    "updated": {"$first": "$updated"},
-                    "created": {"$first": "$updated"}
-                }}
-            ]))
-            return Response(result, status=status.HTTP_200_OK)
+            try:
+                limit = int(request.query_params.get("limit", DEFAULT_PAGE_SIZE))
+                if limit < 1:
+                    raise ValueError("limit must be positive")
+                after = request.query_params.get("after")
+                query = {}
+                if after:
+                    # Keyset pagination: continue below the last (updated, _id) seen
+                    updated, last_id = decode_cursor(after)
+                    query = {"$or": [
+                        {"updated": {"$lt": updated}},
+                        {"updated": updated, "_id": {"$lt": last_id}},
+                    ]}
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            limit = min(limit, MAX_PAGE_SIZE)
+            docs = list(mongo_models.find(query, LISTING_FIELDS)
+                        .sort([("updated", -1), ("_id", -1)])
+                        .limit(limit + 1))
+            result = [
+                {
+                    "_id": doc["_id"],
+                    "latest_version": doc.get("version"),
+                    "updated": doc.get("updated"),
+                    "created": doc.get("created")
+                }
+                for doc in docs[:limit]
+            ]
+            next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+            return Response({"results": result, "next": next_cursor}, status=status.HTTP_200_OK)
 
     def post(self, request):
         """
         Create a new document.
-        - Expects a JSON payload in the request body.
+        - Expects a JSON payload in the request body, of at most `MODEL_UPLOAD_MAX_BYTES` (413 otherwise).
         - Generates a new document ID and version number.
-        - Stores the document along with creation and update timestamps.
+        - Stores the data as version 1 and the document, pointing at it, with creation and update timestamps.
         """
-        if not request.body:
+        try:
+            body = read_upload(request)
+        except RequestDataTooBig as e:
+            return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if not body:
             return Response({"error": "No JSON string provided"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            json_content = json.loads(request.body)
+            json_content = json.loads(body)
 
             doc_id = str(uuid.uuid4())
 
@@ -56,11 +210,12 @@ class ModelsView(APIView):
             model = {
                 "_id": doc_id,
                 "version": 1,
-                "json_data": json_content,
                 "created": now,
                 "updated": now
             }
 
+            # The version goes first so listed documents always have data
+            store_version(doc_id, 1, json_content, now, now)
             mongo_models.insert_one(model)
             return Response({"message": "JSON uploaded successfully", "id": doc_id, "version": 1}, status=status.HTTP_201_CREATED)
         except json.JSONDecodeError:
@@ -71,30 +226,38 @@ class ModelsView(APIView):
     def put(self, request, pk):
         """
         Update an existing document by creating a new version.
-        - Expects a JSON payload in the request body.
+        - Expects a JSON payload in the request body, of at most `MODEL_UPLOAD_MAX_BYTES` (413 otherwise).
         - Retrieves the latest version of the document using its ID (`pk`).
-        - Creates a new version with updated data and a new timestamp.
+        - Stores a new version record with the data and a new timestamp, keeping earlier versions,
+          and moves the document's `version` pointer to it.
+        - Returns 409 when another update created the same version first.
         """
-        if not request.body:
+        try:
+            body = read_upload(request)
+        except RequestDataTooBig as e:
+            return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if not body:
             return Response({"error": "No JSON string provided"}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            json_content = json.loads(request.body)
+            json_content = json.loads(body)
 
-            last_doc = mongo_models.find_one({"_id": pk}, sort=[("version", -1)])
+            last_doc = mongo_models.find_one({"_id": pk}, {"version": 1, "created": 1})
             if not last_doc:
                 return Response({"error": "Document not found"}, status=status.HTTP_404_NOT_FOUND)
 
             now = datetime.now(timezone.utc)
             new_version = last_doc["version"] + 1
-            document = {
-                "version": new_version,
-                "json_data": json_content,
-                "created": last_doc["created"],
-                "updated": now
-            }
+            try:
+                store_version(pk, new_version, json_content, last_doc["created"], now)
+            except DuplicateKeyError:
+                return Response({"error": "Document was updated concurrently, retry"}, status=status.HTTP_409_CONFLICT)
 
-            mongo_models.update_one({"_id": pk}, {"$set": document})
+            mongo_models.update_one(
+                {"_id": pk, "version": {"$lt": new_version}},
+                {"$set": {"version": new_version, "updated": now}}
+            )
+            response_cache.invalidate(pk, new_version)
             return Response({"message": "Document updated", "id": pk, "version": new_version}, status=status.HTTP_200_OK)
         except json.JSONDecodeError:
             return Response({"error": "Invalid JSON string"}, status=status.HTTP_400_BAD_REQUEST)
@@ -104,10 +267,13 @@ class ModelsView(APIView):
     def delete(self, request, pk):
         """
         Delete all versions of a document by its ID (`pk`).
-        - Deletes all documents with the same ID (`_id`) regardless of version.
+        - Deletes the document and all of its version records.
         """
-        result = mongo_models.delete_many({"_id": pk})
-        if result.deleted_count > 0:
+        result = mongo_versions.delete_many({"model_id": pk})
+        document = mongo_models.delete_one({"_id": pk})
+        delete_model_chunks(pk)
+        response_cache.invalidate(pk)
+        if document.deleted_count > 0:
             return Response({"message": f"{result.deleted_count} versions deleted"}, status=status.HTTP_200_OK)
         return Response({"error": "Document not found"}, status=status.HTTP_404_NOT_FOUND)
 
@@ -117,20 +283,111 @@ class ModelDownloadView(APIView):
 
     def get(self, request, pk):
         """
-        Retrieve the JSON data of a specific document by its ID (`pk`).
-        - Returns the `json_data` field of the document if it exists.
+        Stream the JSON data of a specific document by its ID (`pk`).
+        - The response body is the `json_data` field itself, compressed with zstd or gzip
+          when the client's `Accept-Encoding` allows it. Versions are stored parsed (inline or
+          as per-layer chunks), so the body is encoded from the document while it is streamed;
+          the response cache and ETags keep that to once per version and variant.
+        - Sends a strong ETag built from the ID and version; a matching `If-None-Match`
+          gets `304 Not Modified` without loading `json_data`.
+        - `layers` (comma-separated layer indices) limits a topology to those layers and the
+          connections ending in them; for chunked versions only their chunks are read.
+        - Bodies of the latest version are kept in the response cache, one per content coding
+          and layer selection.
         """
         try:
-            document = mongo_models.find_one({"_id": pk})
-            if not document:
-                return Response({"error": "Document not found"}, status=status.HTTP_404_NOT_FOUND)
+            try:
+                layers = parse_layers(request.query_params.get("layers"))
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING"))
+            variant = f"download-{encoding or 'identity'}"
+            if layers is not None:
+                variant += "-layers" + ".".join(map(str, sorted(layers)))
+            version = response_cache.latest_version(pk)
+            if version is None:
+                header = mongo_models.find_one({"_id": pk}, {"version": 1})
+                if not header:
+                    return Response({"error": "Document not found"}, status=status.HTTP_404_NOT_FOUND)
+                version = header["version"]
 
-            json_data = document.get("json_data")
-            if not json_data:
-                return Response({"error": "No JSON data in the document"}, status=status.HTTP_404_NOT_FOUND)
+            etag = make_etag(pk, version, encoding, layers)
+            not_modified = etag_matches(request.META.get("HTTP_IF_NONE_MATCH"), etag)
+            body = None if not_modified else response_cache.get(pk, version, variant)
+            if not_modified:
+                response = HttpResponseNotModified()
+            elif body is not None:
+                response = HttpResponse(body, content_type="application/json")
+            else:
+                document = find_version(pk, fields={"_id": 0, "version": 1, "json_data": 1, "storage": 1})
+                if not document:
+                    return Response({"error": "Document not found"}, status=status.HTTP_404_NOT_FOUND)
+                json_data = load_json_data(document, layers)
+                if not json_data:
+                    return Response({"error": "No JSON data in the document"}, status=status.HTTP_404_NOT_FOUND)
 
-            json_string = json.dumps(json_data, indent=4)
+                # The document may have been updated since its version was looked up
+                version = document["version"]
+                etag = make_etag(pk, version, encoding, layers)
+                chunks = compress_stream(iter_json(json_data), encoding)
+                response = StreamingHttpResponse(response_cache.tee(pk, version, variant, chunks),
+                                                 content_type="application/json")
 
-            return Response({"json_data": json_string}, status=status.HTTP_200_OK)
+            response["ETag"] = etag
+            response["Vary"] = "Accept-Encoding"
+            if encoding and response.status_code == status.HTTP_200_OK:
+                response["Content-Encoding"] = encoding
+            return response
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ModelVersionsView(APIView):
+    """API View for the version history of a model."""
+
+    def get(self, request, pk, version=None):
+        """
+        Retrieve versions of a document by its ID (`pk`).
+        - If `version` is provided, returns that version with its details, like the document detail view.
+        - If `version` is not provided, returns a page of version numbers and timestamps, newest first,
+          without reading `json_data`. `limit` sets the page size and `after` takes the `next` value
+          of the previous page.
+        """
+        if version is not None:
+            body = response_cache.get(pk, version, "detail")
+            if body is None:
+                record = find_version(pk, version)
+                if not record:
+                    return Response({"error": "Version not found"}, status=status.HTTP_404_NOT_FOUND)
+                body = render_version(record)
+                response_cache.set(pk, version, "detail", body, latest=False)
+            return HttpResponse(body, content_type="application/json", status=status.HTTP_200_OK)
+
+        try:
+            limit = min(int(request.query_params.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            if limit < 1:
+                raise ValueError("limit must be positive")
+            query = {"model_id": pk}
+            after = request.query_params.get("after")
+            if after:
+                query["version"] = {"$lt": int(after)}
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        records = list(mongo_versions.find(query, VERSION_LISTING_FIELDS)
+                       .sort("version", -1)
+                       .limit(limit + 1))
+        if not records and not after:
+            return Response({"error": "Document not found"}, status=status.HTTP_404_NOT_FOUND)
+        next_cursor = str(records[limit - 1]["version"]) if len(records) > limit else None
+        return Response({"results": records[:limit], "next": next_cursor}, status=status.HTTP_200_OK)
+
+
+class ModelCacheView(APIView):
+    """API View exposing the response cache counters."""
+
+    def get(self, request):
+        """
+        Return hit and miss counters and the size of the response cache.
+        """
+        return Response(response_cache.stats(), status=status.HTTP_200_OK)
@@ -122,6 +122,20 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Largest model upload in bytes (None for no limit). Model uploads are read by
+# the views themselves, so DATA_UPLOAD_MAX_MEMORY_SIZE does not apply to them.
+MODEL_UPLOAD_MAX_BYTES = 1024 * 1024 * 1024
+
+# Rendered model responses kept in memory, see APImodels/cache.py. Set BACKEND
+# to an alias from CACHES to share entries and invalidations between processes.
+MODEL_RESPONSE_CACHE = {
+    'MAX_BYTES': 256 * 1024 * 1024,
+    'MAX_ENTRY_BYTES': 32 * 1024 * 1024,
+    'BACKEND': None,
+    # Seconds a process trusts its record of a model's latest version
+    'LATEST_TTL': 5.0,
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 